@@ -0,0 +1,229 @@
+"""
+打包流程热点的基准测试。
+
+用法:
+    python benchmarks/bench_pipeline.py --out bench.json
+    python benchmarks/bench_pipeline.py --bin-mb 500 --py-files 3000 --compare bench.json
+
+在临时目录中生成合成项目（见 synthetic.py），分别测量
+build_zipapp.make_package、build_steps.copy_to_release_dir、make_zip（冷/热）、
+copy_dir_to_share（以本地目录代替共享目录，冷/热）和 clean_old_releases，
+结果以 JSON 输出，可与之前的结果比较。
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+import synthetic  # noqa: E402
+
+SCHEMA_VERSION = 1
+
+
+def _timed(fn: Callable[[], None], setup: Optional[Callable[[], None]], repeat: int):
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {
+        "runs": runs,
+        "min": min(runs),
+        "median": statistics.median(runs),
+    }
+
+
+def run_benchmarks(project: Path, share: Path, repeat: int) -> Dict[str, dict]:
+    """在合成项目目录中执行各项测量。"""
+    os.chdir(project)
+    from phis_build import config, workspace
+
+    config.use(None)
+    config.RELEASE_DIR.mkdir(parents=True, exist_ok=True)
+    # 与完整构建一样在工作区中暂存
+    with workspace.create():
+        return _run(project, share, repeat)
+
+
+def _run(project: Path, share: Path, repeat: int) -> Dict[str, dict]:
+    from phis_build import build_steps, build_zipapp, config, workspace
+
+    version = "2000.1.1.0"
+    results: Dict[str, dict] = {}
+
+    def reset_release():
+        # 保留当前的工作区
+        for p in config.RELEASE_DIR.iterdir():
+            if p.name == workspace.WORK_DIR_NAME:
+                continue
+            if p.is_dir():
+                shutil.rmtree(p)
+            else:
+                p.unlink()
+        if config.CACHE_DIR.exists():
+            shutil.rmtree(config.CACHE_DIR)
+        build_steps.copy_dirs()
+
+    results["make_package"] = _timed(
+        lambda: build_zipapp.make_package(use_cache=False), None, repeat
+    )
+
+    def setup_release_dir():
+        reset_release()
+
+    results["copy_to_release_dir"] = _timed(
+        lambda: build_steps.copy_to_release_dir(version), setup_release_dir, repeat
+    )
+
+    target_dir = config.RELEASE_DIR / f"{config.APP_NAME}-{version}"
+    zip_path = config.RELEASE_DIR / f"{config.PROJECT_NAME}_v{version}.zip"
+
+    def setup_cold_zip():
+        reset_release()
+        build_steps.copy_to_release_dir(version)
+
+    results["make_zip_cold"] = _timed(
+        lambda: build_steps.make_zip(target_dir, version), setup_cold_zip, repeat
+    )
+
+    # 热: 预压缩层和上一个发布包都已存在
+    def setup_warm_zip():
+        previous = zip_path.with_name(f"{config.PROJECT_NAME}_v1999.1.1.0.zip")
+        if zip_path.exists():
+            os.replace(zip_path, previous)
+
+    build_steps.make_zip(target_dir, version)
+    results["make_zip_warm"] = _timed(
+        lambda: build_steps.make_zip(target_dir, version), setup_warm_zip, repeat
+    )
+
+    def setup_cold_share():
+        if share.exists():
+            shutil.rmtree(share)
+        share.mkdir(parents=True)
+
+    results["copy_dir_to_share_cold"] = _timed(
+        lambda: build_steps.copy_dir_to_share(target_dir, share, cleanup=False),
+        setup_cold_share,
+        repeat,
+    )
+    results["copy_dir_to_share_warm"] = _timed(
+        lambda: build_steps.copy_dir_to_share(target_dir, share, cleanup=False),
+        None,
+        repeat,
+    )
+
+    # clean_old_releases 会删除发布目录，先把模板移出 releases/
+    template = project.parent / "release_template"
+    if template.exists():
+        shutil.rmtree(template)
+    shutil.copytree(target_dir, template)
+
+    def setup_old_releases():
+        for i in range(10):
+            d = config.RELEASE_DIR / f"{config.PROJECT_NAME}-old{i}"
+            if not d.exists():
+                shutil.copytree(template, d)
+            (config.RELEASE_DIR / f"{config.PROJECT_NAME}_vold{i}.zip").touch()
+
+    results["clean_old_releases"] = _timed(
+        lambda: build_steps.clean_old_releases(keep=2), setup_old_releases, repeat
+    )
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """返回相对基线变慢超过 threshold 的项目说明。"""
+    regressions = []
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        change = result["min"] / old["min"] - 1 if old["min"] else 0.0
+        print(f"{name:<26}{old['min']:>10.3f}s -> {result['min']:>8.3f}s  {change:+.1%}")
+        if change > threshold:
+            regressions.append(f"{name}: {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="phis_build 打包流程基准测试。")
+    parser.add_argument("--py-files", type=int, default=500)
+    parser.add_argument("--py-size", type=int, default=4 * 1024)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--bin-files", type=int, default=200)
+    parser.add_argument("--bin-mb", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=None, help="结果 JSON 输出路径。")
+    parser.add_argument("--compare", type=Path, default=None, help="基线结果 JSON。")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="判定为退化的变慢比例。"
+    )
+    parser.add_argument("--keep", action="store_true", help="保留生成的临时项目。")
+    opts = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    shape = synthetic.Shape(
+        py_files=opts.py_files,
+        py_size=opts.py_size,
+        depth=opts.depth,
+        bin_files=opts.bin_files,
+        bin_mb=opts.bin_mb,
+    )
+
+    workdir = Path(tempfile.mkdtemp(prefix="phis_bench_"))
+    cwd = os.getcwd()
+    try:
+        share = workdir / "share"
+        project = synthetic.generate(workdir / "project", shape, share)
+        results = run_benchmarks(project, share, opts.repeat)
+    finally:
+        os.chdir(cwd)
+        if opts.keep:
+            print(f"合成项目保留在 {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "shape": shape.to_dict(),
+        "repeat": opts.repeat,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if opts.out:
+        opts.out.write_text(text, encoding="utf-8")
+    for name, result in results.items():
+        print(f"{name:<26}min {result['min']:.3f}s  median {result['median']:.3f}s")
+
+    if opts.compare:
+        baseline = json.loads(opts.compare.read_text(encoding="utf-8"))
+        if baseline.get("shape") != report["shape"]:
+            print("警告: 基线的项目形状不同，结果不可直接比较。")
+        regressions = compare(report, baseline, opts.threshold)
+        if regressions:
+            print("性能退化: " + "; ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+生成用于基准测试的合成项目。
+
+项目结构与真实的 phis_build 项目一致: pyproject.toml、phis_build.toml、
+包目录（大量小 .py 文件，可指定嵌套深度）、顶层 .py 文件、__main__.py，
+以及类似浏览器目录的 BIN（大体积二进制文件）。
+"""
+
+import random
+from pathlib import Path
+
+PYPROJECT = """[project]
+name = "synthetic"
+version = "0.1"
+
+[tool.hatch.build.targets.sdist]
+packages = ["{package}"]
+exclude = ["__pycache__", "*.pyc"]
+"""
+
+PHIS_BUILD_TOML = """project_name = "Synthetic"
+share_path = "{share}"
+linux_share_path = "{share}"
+"""
+
+
+class Shape:
+    """合成项目的形状参数。"""
+
+    def __init__(
+        self,
+        py_files: int = 500,
+        py_size: int = 4 * 1024,
+        depth: int = 4,
+        bin_files: int = 200,
+        bin_mb: int = 100,
+        top_level_files: int = 5,
+        seed: int = 0,
+    ):
+        self.py_files = py_files
+        self.py_size = py_size
+        self.depth = depth
+        self.bin_files = bin_files
+        self.bin_mb = bin_mb
+        self.top_level_files = top_level_files
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+def _python_source(rng: random.Random, size: int) -> bytes:
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = f"def func_{i}(x):\n    return x * {rng.randint(0, 1000)} + {i}\n\n"
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "".join(lines).encode("utf-8")
+
+
+def _binary_payload(rng: random.Random, size: int) -> bytes:
+    # 一半随机数据、一半重复数据，压缩率接近真实的浏览器目录
+    n = size // 2
+    random_part = rng.getrandbits(n * 8).to_bytes(n, "little") if n else b""
+    return random_part + bytes(size - n)
+
+
+def generate(root: Path, shape: Shape, share: Path) -> Path:
+    """在 root 下生成合成项目，返回项目目录。"""
+    rng = random.Random(shape.seed)
+    root.mkdir(parents=True, exist_ok=True)
+    package = "synthetic_app"
+
+    (root / "pyproject.toml").write_text(
+        PYPROJECT.format(package=package), encoding="utf-8"
+    )
+    (root / "phis_build.toml").write_text(
+        PHIS_BUILD_TOML.format(share=share.as_posix()), encoding="utf-8"
+    )
+    (root / "__main__.py").write_text(
+        f"import {package}\nprint('synthetic')\n", encoding="utf-8"
+    )
+    for i in range(shape.top_level_files):
+        (root / f"module_{i}.py").write_bytes(_python_source(rng, shape.py_size))
+
+    # 包目录: 文件平均分布在 depth 层嵌套目录中
+    for i in range(shape.py_files):
+        level = i % max(1, shape.depth)
+        d = root / package
+        for j in range(level):
+            d = d / f"sub{j}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "__init__.py").touch()
+        (d / f"mod_{i}.py").write_bytes(_python_source(rng, shape.py_size))
+
+    # BIN: 总大小 bin_mb，分布在若干子目录中
+    bin_dir = root / "BIN"
+    per_file = max(1, shape.bin_mb * 1024 * 1024 // max(1, shape.bin_files))
+    for i in range(shape.bin_files):
+        d = bin_dir / f"part{i % 8}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"blob_{i}.dll").write_bytes(_binary_payload(rng, per_file))
+
+    (root / "配置文件").mkdir(exist_ok=True)
+    (root / "配置文件" / "settings.json").write_text("{}", encoding="utf-8")
+    return root
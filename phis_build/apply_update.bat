@@ -0,0 +1,15 @@
+@echo off
+chcp 65001 > nul
+setlocal
+
+:: 把差分更新包 (*_delta_*.zip) 拖到本文件上即可更新当前目录
+IF "%~1"=="" (
+    echo 用法: 把差分更新包拖到本文件上。
+    pause
+    exit /b 1
+)
+
+powershell -NoProfile -ExecutionPolicy Bypass -File "%~dp0apply_update.ps1" -Delta "%~1"
+set "RESULT=%ERRORLEVEL%"
+pause
+exit /b %RESULT%
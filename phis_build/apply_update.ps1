@@ -0,0 +1,118 @@
+# 应用 phis_build 生成的差分更新包 (<PROJECT>_delta_<旧版本>_to_<新版本>.zip)
+# 用法: 把差分包拖到同目录的 应用更新.bat 上，或
+#   powershell -NoProfile -ExecutionPolicy Bypass -File apply_update.ps1 -Delta <差分包> [-Force]
+# 步骤: 解压到临时目录 -> 校验差分包内容和当前目录的版本 -> 备份将被修改的文件 -> 应用
+#       -> 校验结果；任何一步失败都会恢复备份。
+
+param(
+    [Parameter(Mandatory = $true)][string]$Delta,
+    [string]$Root = $PSScriptRoot,
+    [switch]$Force
+)
+
+$ErrorActionPreference = 'Stop'
+Add-Type -AssemblyName System.IO.Compression.FileSystem
+
+$MarkerName = '.phis_release'
+
+function Get-Sha256([string]$Path) {
+    $stream = [IO.File]::OpenRead($Path)
+    try {
+        $hash = [Security.Cryptography.SHA256]::Create().ComputeHash($stream)
+    } finally {
+        $stream.Close()
+    }
+    return -join ($hash | ForEach-Object { $_.ToString('x2') })
+}
+
+function Get-LocalPath([string]$Base, [string]$Rel) {
+    return Join-Path $Base ($Rel -replace '/', '\')
+}
+
+$Delta = (Resolve-Path $Delta).Path
+$Root = (Resolve-Path $Root).Path
+$Work = Join-Path ([IO.Path]::GetTempPath()) ('phis_delta_' + [guid]::NewGuid().ToString('N'))
+$Backup = Join-Path $Work 'backup'
+$Applied = New-Object System.Collections.ArrayList
+
+try {
+    [IO.Compression.ZipFile]::ExtractToDirectory($Delta, $Work)
+    $Manifest = [IO.File]::ReadAllText((Join-Path $Work 'delta.json'), [Text.Encoding]::UTF8) | ConvertFrom-Json
+    Write-Host "差分更新: $($Manifest.from) -> $($Manifest.to)"
+
+    # 1. 当前目录必须是差分包的基础版本
+    $Marker = Join-Path $Root $MarkerName
+    if (Test-Path $Marker) {
+        $Current = ([IO.File]::ReadAllText($Marker)).Trim()
+        if ($Current -eq $Manifest.to) {
+            Write-Host "当前已是版本 $Current，无需更新。"
+            exit 0
+        }
+        if ($Current -ne $Manifest.from -and -not $Force) {
+            throw "当前版本为 $Current，此差分包只能用于 $($Manifest.from)。"
+        }
+    }
+    foreach ($item in @($Manifest.changed) + @($Manifest.deleted)) {
+        if (-not $item.base_sha256) { continue }
+        $target = Get-LocalPath $Root $item.path
+        if (-not (Test-Path -LiteralPath $target)) {
+            if (-not $Force) { throw "缺少文件 $($item.path)，与基础版本不一致。" }
+            continue
+        }
+        if ((Get-Sha256 $target) -ne $item.base_sha256 -and -not $Force) {
+            throw "文件 $($item.path) 已被修改，与基础版本不一致。可使用 -Force 强制更新。"
+        }
+    }
+
+    # 2. 差分包内的文件必须完整
+    foreach ($item in @($Manifest.changed)) {
+        $source = Get-LocalPath (Join-Path $Work 'files') $item.path
+        if ((Get-Sha256 $source) -ne $item.sha256) {
+            throw "差分包中的 $($item.path) 已损坏。"
+        }
+    }
+
+    # 3. 备份并应用
+    foreach ($item in @($Manifest.changed) + @($Manifest.deleted)) {
+        $target = Get-LocalPath $Root $item.path
+        if (Test-Path -LiteralPath $target) {
+            $saved = Get-LocalPath $Backup $item.path
+            New-Item -ItemType Directory -Force -Path (Split-Path $saved) | Out-Null
+            Copy-Item -LiteralPath $target -Destination $saved -Force
+        }
+        [void]$Applied.Add($item.path)
+    }
+    foreach ($item in @($Manifest.changed)) {
+        $target = Get-LocalPath $Root $item.path
+        New-Item -ItemType Directory -Force -Path (Split-Path $target) | Out-Null
+        Copy-Item -LiteralPath (Get-LocalPath (Join-Path $Work 'files') $item.path) -Destination $target -Force
+    }
+    foreach ($item in @($Manifest.deleted)) {
+        $target = Get-LocalPath $Root $item.path
+        if (Test-Path -LiteralPath $target) { Remove-Item -LiteralPath $target -Force }
+    }
+
+    # 4. 校验结果
+    foreach ($item in @($Manifest.changed)) {
+        if ((Get-Sha256 (Get-LocalPath $Root $item.path)) -ne $item.sha256) {
+            throw "更新后 $($item.path) 的内容不正确。"
+        }
+    }
+    [IO.File]::WriteAllText($Marker, $Manifest.to)
+    Write-Host "已更新到版本 $($Manifest.to): 更新 $(@($Manifest.changed).Count) 个文件，删除 $(@($Manifest.deleted).Count) 个文件。"
+} catch {
+    Write-Host "更新失败: $($_.Exception.Message)" -ForegroundColor Red
+    foreach ($rel in $Applied) {
+        $saved = Get-LocalPath $Backup $rel
+        $target = Get-LocalPath $Root $rel
+        if (Test-Path -LiteralPath $saved) {
+            Copy-Item -LiteralPath $saved -Destination $target -Force
+        } elseif (Test-Path -LiteralPath $target) {
+            Remove-Item -LiteralPath $target -Force
+        }
+    }
+    if ($Applied.Count) { Write-Host '已恢复更新前的文件。' }
+    exit 1
+} finally {
+    if (Test-Path $Work) { Remove-Item -Recurse -Force $Work }
+}
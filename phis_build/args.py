@@ -1,25 +1,55 @@
-from enum import Enum
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from .build_type import BuildType
 
 
-class BuildType(str, Enum):
-    EXE = "exe"
-    PYZ = "pyz"
+@dataclass
+class Args:
+    """
+    构建脚本的命令行参数模型。
+    使用 dataclass 而不是 pydantic：每次运行都要创建，导入 pydantic 本身就要 100 ms 以上，
+    参数的类型和取值范围已由 argparse 转换，这里只做范围检查。
+    """
 
+    build: Optional[BuildType] = None
+    """构建类型: 'exe' (PyInstaller) 或 'pyz' (zipapp)。如果未提供，则不执行构建。"""
+    copy_: bool = False
+    """将构建产物复制到目标位置（共享目录或beta目录）。"""
+    beta: bool = False
+    """执行beta构建，将产物复制到本地Windows目录并附加'b'到版本号。"""
+    pipeline: bool = False
+    """压缩发布包的同时上传到目标目录。"""
+    no_cache: bool = False
+    """忽略构建缓存，强制重新打包。"""
+    clean: bool = False
+    """不复用 PyInstaller 的工作目录和分析缓存，完整重新构建。"""
+    zip_workers: Optional[int] = None
+    """压缩发布包的线程数，默认使用 CPU 核数。"""
+    zip_level: Optional[int] = None
+    """发布包的压缩级别 (0-9)。"""
+    onedir: bool = False
+    """exe 构建输出为目录 (onedir)，覆盖 [exe] mode。"""
+    bench_launch: bool = False
+    """测量发布目录中程序的冷启动和热启动时间。"""
+    stats: Optional[int] = None
+    """输出最近 N 次构建的指标和趋势，不构建。"""
+    watch: bool = False
+    """常驻运行，源码变化时增量重新构建 app.pyz。"""
+    analyze: bool = False
+    """只分析导入图，列出不可达的模块，不构建。"""
+    batch: Optional[Path] = None
+    """并行构建该目录下所有包含 phis_build.toml 的项目。"""
+    jobs: Optional[int] = None
+    """批量构建时同时构建的项目数。"""
 
-class Args(BaseModel):
-    """构建脚本的命令行参数模型"""
-
-    build: Optional[BuildType] = Field(
-        default=None,
-        description="构建类型: 'exe' (PyInstaller) 或 'pyz' (zipapp)。如果未提供，则不执行构建。",
-    )
-    copy_: bool = Field(
-        default=False, description="将构建产物复制到目标位置（共享目录或beta目录）。"
-    )
-    beta: bool = Field(
-        default=False,
-        description="执行beta构建，将产物复制到本地Windows目录并附加'b'到版本号。",
-    )
+    def __post_init__(self):
+        if self.batch is not None:
+            self.batch = Path(self.batch)
+        if self.zip_level is not None and not 0 <= self.zip_level <= 9:
+            raise ValueError(f"zip_level 应在 0-9 之间: {self.zip_level}")
+        for name in ("stats", "jobs"):
+            value = getattr(self, name)
+            if value is not None and value < 1:
+                raise ValueError(f"{name} 应大于等于 1: {value}")
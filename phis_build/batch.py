@@ -0,0 +1,147 @@
+"""
+批量构建：找出目录下所有包含 phis_build.toml 的项目，在进程池中并行构建。
+
+每个项目在独立的进程中切换到自己的目录、加载自己的配置；
+预压缩层和 PyInstaller 缓存放在共用的缓存目录中，项目之间可以互相复用。
+"""
+
+import dataclasses
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+from . import config, tracing
+
+if TYPE_CHECKING:
+    from .args import Args
+
+SKIP_DIRS = {
+    ".git",
+    ".venv",
+    "venv",
+    "node_modules",
+    "__pycache__",
+    ".phis_cache",
+    "releases",
+    "build",
+    "dist",
+}
+"""查找项目时不进入的目录"""
+
+
+def discover_projects(root: Path) -> List[Path]:
+    """返回 root 下（含 root 本身）所有包含 phis_build.toml 的目录，按路径排序。"""
+    projects = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        if "phis_build.toml" in filenames:
+            projects.append(Path(dirpath))
+    return sorted(projects)
+
+
+def default_jobs(project_count: int) -> int:
+    """默认并行数：CPU 核数的一半，且不超过项目数。"""
+    return max(1, min(project_count, (os.cpu_count() or 2) // 2))
+
+
+def _build_project(project_root: Path, args: "Args") -> dict:
+    """在工作进程中构建单个项目，返回结果和各步骤耗时。"""
+    from .main import finish_run, run_full_build, setup_logging
+
+    os.chdir(project_root)
+    setup_logging()
+    # 控制台输出来自多个进程，加上项目名区分
+    for handler in logging.getLogger().handlers:
+        if not isinstance(handler, logging.FileHandler):
+            handler.setFormatter(logging.Formatter(f"[{project_root.name}] %(message)s"))
+    tracing.reset()
+
+    result = {"project": str(project_root), "ok": False, "error": None, "steps": []}
+    start = time.perf_counter()
+    try:
+        config.use(config.Config.load(project_root))
+        result["name"] = config.PROJECT_NAME
+        run_full_build(args)
+        result["ok"] = True
+        result["version"] = config.VERSION_FILE.read_text(encoding="utf-8").strip()
+    except KeyboardInterrupt:
+        raise
+    except SystemExit as e:
+        result["error"] = f"退出码 {e.code}"
+    except BaseException as e:
+        logging.exception(f"构建失败: {e}")
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["wall"] = time.perf_counter() - start
+        result["steps"] = [(s.name, s.wall) for s in tracing.tracer.spans]
+        finish_run(args, result["ok"])
+        config.use(None)
+    return result
+
+
+def summary(results: List[dict], elapsed: float) -> str:
+    """生成批量构建的汇总表。"""
+    rows = [f"{'项目':<28}{'结果':<8}{'版本':<16}{'耗时(s)':>9}  最慢步骤"]
+    for r in sorted(results, key=lambda r: r["project"]):
+        name = r.get("name") or Path(r["project"]).name
+        status = "成功" if r["ok"] else "失败"
+        slowest = max(r["steps"], key=lambda s: s[1], default=None)
+        extra = f"{slowest[0]} {slowest[1]:.2f}s" if slowest else ""
+        if r["error"]:
+            extra = f"{r['error']}" + (f"; {extra}" if extra else "")
+        rows.append(
+            f"{name:<28}{status:<8}{r.get('version', '-'):<16}{r['wall']:>9.2f}  {extra}"
+        )
+    serial = sum(r["wall"] for r in results)
+    rows.append(f"总耗时 {elapsed:.2f}s，逐个构建合计 {serial:.2f}s")
+    return "\n".join(rows)
+
+
+def run_batch(root: Path, args: "Args", jobs: Optional[int] = None) -> bool:
+    """并行构建 root 下的所有项目，全部成功时返回 True。"""
+    root = root.resolve()
+    projects = discover_projects(root)
+    if not projects:
+        logging.error(f"错误: 在 {root} 下没有找到包含 phis_build.toml 的项目。")
+        return False
+
+    jobs = jobs or default_jobs(len(projects))
+    # 各项目的压缩线程数按并行数分摊，避免线程数成倍超出 CPU 核数
+    if args.zip_workers is None:
+        args = dataclasses.replace(
+            args, zip_workers=max(1, (os.cpu_count() or 1) // jobs)
+        )
+    # 工作进程继承此环境变量，各项目共用同一个缓存目录
+    os.environ.setdefault(config.SHARED_CACHE_ENV, str(root / ".phis_cache" / "shared"))
+    logging.info(
+        f"批量构建 {len(projects)} 个项目 (并行数 {jobs})，"
+        f"共享缓存目录 {os.environ[config.SHARED_CACHE_ENV]}"
+    )
+    for p in projects:
+        logging.info(f"  {p.relative_to(root) if p != root else '.'}")
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(_build_project, p, args): p for p in projects}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # 工作进程异常退出等情况
+                results.append(
+                    {
+                        "project": str(futures[future]),
+                        "ok": False,
+                        "error": f"{type(e).__name__}: {e}",
+                        "steps": [],
+                        "wall": 0.0,
+                    }
+                )
+
+    logging.info("批量构建汇总:\n" + summary(results, time.perf_counter() - start))
+    return all(r["ok"] for r in results)
+
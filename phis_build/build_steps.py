@@ -1,35 +1,137 @@
+import os
 import subprocess
 import shutil
 import zipfile
 import sys
+import time
 from pathlib import Path
-from tqdm import tqdm
-from . import config
+from functools import partial
+# 其余模块只在用到的函数中导入，仅复制 (--copy) 时不必加载打包相关的模块
+from . import cache, config, sync, zip_tools
+from .cache import sha256_file
+from .filelock import FileLock
+from .fileutil import STAGE_MODES, StageStats, link_or_copy, stage_tree
 import logging
-from typing import Optional
+from typing import List, Optional
 
 
-def build():
-    """使用 PyInstaller 进行打包。"""
+def _pyinstaller_cache_key(spec_file: Path) -> dict:
+    """PyInstaller 工作目录能否复用取决于 spec 文件、解释器和依赖锁文件。"""
+    uv_lock = config.PROJECT_ROOT / "uv.lock"
+    return {
+        "spec": sha256_file(spec_file),
+        "python": f"{sys.executable} {sys.version}",
+        "uv.lock": sha256_file(uv_lock) if uv_lock.exists() else None,
+    }
+
+
+def build(force_clean: bool = False, mode: str = "onefile"):
+    """
+    使用 PyInstaller 进行打包。
+    spec 文件、解释器和 uv.lock 都未变化时复用上次的工作目录和分析缓存，
+    否则加 --clean 完整重建。
+    mode 为 onedir 时根据 spec 生成 onedir 的 spec 并输出为目录，见 onedir 模块。
+    """
+    from . import import_graph, onedir
+
     logging.info("1. 使用 PyInstaller 打包...")
-    subprocess.run(
-        [
-            sys.executable,
-            "-m",
-            "PyInstaller",
-            "--clean",
-            "--distpath",
-            str(config.TEMP_DIR),
-            "--workpath",
-            str(config.BUILD_DIR),
-            str(config.SPEC_FILE),
-        ],
-        check=True,
-    )
+    config.ensure_spec_file()
+
+    spec_file = config.SPEC_FILE
+    if config.SHAKE_EXE:
+        excludes, graph, unreachable = import_graph.exe_excludes()
+        if graph is not None and unreachable:
+            logging.info("从 spec 入口不可达的本地模块，" + graph.report(unreachable))
+        spec_file = import_graph.write_shaken_spec(excludes)
+        logging.info(f"已生成带 excludes 的 spec: {spec_file.name} ({len(excludes)} 个模块)")
+    if mode == "onedir":
+        spec_file = onedir.write_onedir_spec(spec_file)
+        logging.info(f"已生成 onedir 的 spec: {spec_file.name}")
+
+    key = _pyinstaller_cache_key(spec_file)
+    if force_clean:
+        reasons = ["命令行要求重新构建"]
+    else:
+        reasons = _seed_workpath(spec_file.stem, key)
+
+    command = [sys.executable, "-m", "PyInstaller"]
+    if reasons:
+        logging.info(f"PyInstaller 缓存失效 ({'，'.join(reasons)})，使用 --clean 重新构建。")
+        command.append("--clean")
+    else:
+        logging.info(f"PyInstaller 缓存有效，复用工作目录 {config.BUILD_CACHE_DIR}")
+    command += [
+        "--noconfirm",
+        "--distpath",
+        str(config.TEMP_DIR),
+        "--workpath",
+        str(config.BUILD_DIR),
+        str(spec_file),
+    ]
+    env = None
+    if config.SHARED_CACHE_DIR:
+        # PyInstaller 的二进制缓存（bincache 等）放在共享目录，多个项目共用
+        env = dict(os.environ)
+        env["PYINSTALLER_CONFIG_DIR"] = str(config.SHARED_CACHE_DIR / "pyinstaller")
+    subprocess.run(command, check=True, env=env)
+    _promote_workpath(spec_file.stem, key)
+
+
+def _seed_workpath(name: str, key: dict) -> List[str]:
+    """
+    把共用缓存中的 PyInstaller 工作目录 build/<name> 复制到本次构建的工作目录。
+    返回不能复用的原因，可以复用时返回空列表。
+    PyInstaller 会原地改写工作目录中的文件，因此复制出的文件不能是缓存的硬链接：
+    持锁期间只创建硬链接快照，释放锁后再逐个 reflink 或复制。
+    """
+    from . import workspace
+
+    cached = config.BUILD_CACHE_DIR / name
+    target = config.BUILD_DIR / name
+    if config.BUILD_DIR == config.BUILD_CACHE_DIR:
+        snapshot = None
+    else:
+        snapshot = config.WORK_DIR / f"build-cache-{name}"
+    with workspace.build_cache_lock():
+        previous = cache.load_entry("pyinstaller")
+        if previous is None or not cached.is_dir():
+            return ["没有可复用的工作目录"]
+        reasons = [f"{k} 已变化" for k in key if previous.get(k) != key[k]]
+        if reasons or snapshot is None:
+            return reasons
+        stage_tree(cached, snapshot, "hardlink")
+    # 缓存被替换时整个目录换成新的，快照中的文件不会再被改动
+    stage_tree(snapshot, target, "reflink")
+    shutil.rmtree(snapshot, ignore_errors=True)
+    return []
+
+
+def _promote_workpath(name: str, key: dict):
+    """
+    构建成功后用本次的工作目录替换共用缓存中的 build/<name>。
+    持锁期间只做重命名，被替换的旧目录留在工作区中，随工作区一起删除。
+    """
+    from . import workspace
 
+    cached = config.BUILD_CACHE_DIR / name
+    with workspace.build_cache_lock():
+        if config.BUILD_DIR != config.BUILD_CACHE_DIR:
+            config.BUILD_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            if cached.exists():
+                os.replace(cached, config.WORK_DIR / f"replaced-{name}")
+            os.replace(config.BUILD_DIR / name, cached)
+        cache.save_entry("pyinstaller", key)
+
+
+def rename_executable(version: str, mode: str = "onefile"):
+    """
+    将打包好的 exe 重命名以包含版本号。
+    mode 为 onedir 时先把输出目录的内容移到暂存目录顶层，失败时抛出异常（发布目录会缺少程序文件）。
+    """
+    from . import onedir
 
-def rename_executable(version: str):
-    """将打包好的 exe 重命名以包含版本号。"""
+    if mode == "onedir":
+        onedir.flatten_output(config.TEMP_DIR)
     try:
         original_exe = config.TEMP_DIR / f"{config.PROJECT_NAME}.exe"
         if original_exe.exists():
@@ -60,32 +162,63 @@ def rename_pyz(version: str):
     target_dir = config.TEMP_DIR
     target_dir.mkdir(parents=True, exist_ok=True)
     logging.info(f"将 {pyz_file} 复制为 {target_name} ...")
-    shutil.copy(pyz_file, target_dir / target_name)
+    link_or_copy(pyz_file, target_dir / target_name)
 
     if no_rename_pyz:
         pass
 
 
+def _stage_mode() -> str:
+    """读取暂存方式，配置无效时退回到复制。"""
+    mode = config.STAGE_MODE
+    if mode not in STAGE_MODES:
+        logging.warning(f"未知的暂存方式 {mode!r}，改为 copy。可选: {STAGE_MODES}")
+        return "copy"
+    return mode
+
+
+def _release_stage_mode() -> str:
+    """
+    发布目录的生成方式。暂存目录中的文件可能是项目目录的硬链接，
+    发布目录再用硬链接就会与项目中的 BIN、配置文件共用同一份数据，
+    因此这里只用 reflink（不支持时复制）。
+    """
+    return "copy" if _stage_mode() == "copy" else "reflink"
+
+
 def copy_dirs(use_pyz: bool = False):
     """复制必要的目录（浏览器、配置文件、文档）到临时构建目录。"""
+    from . import tracing
+
     logging.info("2. 复制目录到 release...")
     if not use_pyz:
+        stats = StageStats()
         for d in [config.浏览器, config.浏览器配置文件]:
             if d.exists():
-                shutil.copytree(d, config.TEMP_DIR / d.name, dirs_exist_ok=True)
+                stage_tree(d, config.TEMP_DIR / d.name, _stage_mode(), stats)
+        logging.info(f"已暂存 {stats.summary()}")
+        tracing.annotate(files=stats.files, copied_bytes=stats.copied_bytes)
 
 
 def _create_batch_files(target_dir: Path, version: str):
-    """在目标目录中根据模板创建 .bat 启动脚本。"""
+    """
+    在目标目录中根据模板创建 .bat 启动脚本。
+    exe 构建（包括 onedir）的脚本启动目录中的 exe，pyz 构建的脚本用平台的 Python 运行 app.pyz。
+    """
     logging.info("正在创建启动脚本...")
     try:
-        template_path = Path(__file__).parent / "run_template.bat"
+        exe_name = f"{config.PROJECT_NAME}_v{version}.exe"
+        if (target_dir / exe_name).exists():
+            template_path = Path(__file__).parent / "run_exe_template.bat"
+        else:
+            template_path = Path(__file__).parent / "run_template.bat"
         if not template_path.exists():
             logging.error(f"启动脚本模板未找到: {template_path}")
             return
 
         template_content = template_path.read_text(encoding="utf-8")
         template_content = template_content.replace("{VERSION}", version)
+        template_content = template_content.replace("{EXE}", exe_name)
 
         # 1. 创建 GUI / 配置工具启动脚本 (无参数)
         gui_content = template_content.replace("{ARGS}", "")
@@ -104,118 +237,276 @@ def _create_batch_files(target_dir: Path, version: str):
 
 
 def copy_to_release_dir(version: str) -> Path:
-    """将构建好的文件复制到 release 目录，并创建 .bat 文件"""
+    """
+    将构建好的文件复制到 release 目录，并创建 .bat 文件。
+    版本目录先在工作区中生成，完成后整体重命名到 releases/。
+    """
+    from . import delta, release_store, tracing, workspace
+
     source_dir = config.TEMP_DIR
     target_dir = config.RELEASE_DIR / f"{config.APP_NAME}-{version}"
-
-    if target_dir.exists():
-        logging.info(f"目标目录 {target_dir} 已存在，正在删除...")
-
-        shutil.rmtree(target_dir)
+    staging_dir = config.WORK_DIR / target_dir.name
 
     logging.info(f"正在从 {source_dir} 复制到 {target_dir}...")
-    shutil.copytree(source_dir, target_dir)
+    if config.RELEASE_STORE:
+        # 文件保存在 releases/.store 中，版本目录只是硬链接
+        stats = release_store.open_store().materialize(
+            source_dir, staging_dir, config.RELEASE_COPY_DIRS
+        )
+    else:
+        stats = stage_tree(source_dir, staging_dir, _release_stage_mode())
+    logging.info(f"已暂存 {stats.summary()}")
+    tracing.annotate(files=stats.files, copied_bytes=stats.copied_bytes)
 
     # 在目标目录中创建 .bat 文件
-    _create_batch_files(target_dir, version)
+    _create_batch_files(staging_dir, version)
+    if config.DELTA_ENABLED:
+        delta.prepare_release_dir(staging_dir, version)
 
+    if target_dir.exists():
+        logging.info(f"目标目录 {target_dir} 已存在，将被替换。")
+    workspace.promote(staging_dir, target_dir)
     return target_dir
 
 
-def make_zip(target_dir: Path, version: str) -> Path:
-    """将发布目录压缩成 zip 文件。"""
+def make_zip(
+    target_dir: Path,
+    version: str,
+    workers: Optional[int] = None,
+    level: Optional[int] = None,
+    share_path: Optional[Path] = None,
+) -> Path:
+    """
+    将发布目录压缩成 zip 文件。
+    各文件在线程池中并行压缩，再按路径顺序写入归档。
+    与上一个发布包相比未变化的文件直接复制其压缩数据；
+    浏览器和配置文件目录的压缩结果会被缓存，内容不变时直接复用。
+    每个文件的压缩方式由压缩策略决定（见 compress_policy），已压缩的数据原样保存。
+    指定 share_path 时边压缩边上传到共享目录，之后的 copy_to_share 会直接跳过。
+    压缩包先写入工作区，完成后再重命名到 releases/。
+    """
+    from . import compress_policy, tracing, transfer, workspace, zip_layer
+
     zip_path = target_dir.parent / f"{config.PROJECT_NAME}_v{version}.zip"
-    logging.info(f"3. 压缩为 {zip_path} ...")
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        for file in target_dir.rglob("*"):
-            zf.write(file, file.relative_to(target_dir.parent))
+    staging_zip = config.WORK_DIR / zip_path.name
+    workers = workers or config.ZIP_WORKERS or zip_tools.default_workers()
+    level = config.ZIP_LEVEL if level is None else level
+    logging.info(f"3. 压缩为 {zip_path} (线程数 {workers}, 压缩级别 {level}) ...")
+
+    policy = compress_policy.load_policy(level)
+    static_dirs = {d.name for d in [config.浏览器, config.浏览器配置文件]}
+    layer = zip_layer.open_layer(level) if config.ZIP_STATIC_LAYER else None
+    previous = (
+        zip_layer.find_previous_archive(exclude=zip_path)
+        if config.ZIP_INCREMENTAL
+        else None
+    )
+
+    def member(file: Path, arcname: str, rel: Path):
+        if not file.is_file():
+            return zip_tools.compress_file(file, arcname, level)
+        rule = policy.rule_for(rel.as_posix())
+        file_level = policy.level_for(rule)
+        # auto 规则的文件沿用上一个发布包中的压缩方式，不必重新采样；
+        # 压缩级别与上一个发布包不同时重新压缩
+        result = previous.member(
+            file, arcname, rel.as_posix(), policy.fixed_type(rule), file_level
+        ) if previous else None
+        if not result:
+            compress_type, file_level, rule = policy.decide(file, rel.as_posix())
+            if layer and rel.parts[0] in static_dirs:
+                result = layer.member(
+                    file, arcname, rel.as_posix(), compress_type, file_level
+                )
+            else:
+                result = zip_tools.compress_file(
+                    file, arcname, file_level, compress_type
+                )
+            zip_layer.tag_level(result[0], file_level)
+        policy.record(rule, result[0])
+        return result
+
+    jobs = [
+        partial(
+            member,
+            file,
+            file.relative_to(target_dir.parent).as_posix(),
+            file.relative_to(target_dir),
+        )
+        for file in sorted(target_dir.rglob("*"))
+    ]
+
+    if share_path:
+        logging.info(f"边压缩边上传到 {share_path} ...")
+        share_path.mkdir(parents=True, exist_ok=True)
+        writer = transfer.TeeWriter(staging_zip, share_path / zip_path.name)
+        try:
+            with zipfile.ZipFile(writer, "w", zipfile.ZIP_DEFLATED) as zf:
+                zip_tools.write_members(zf, jobs, workers)
+        except BaseException:
+            writer.abort()
+            raise
+        uploaded = writer.finish()
+        workspace.promote(staging_zip, zip_path)
+        if uploaded:
+            sync.record_file(zip_path, share_path, writer.hash.hexdigest())
+            logging.info(f"已同时上传到: {share_path / zip_path.name}")
+    else:
+        with zipfile.ZipFile(staging_zip, "w", zipfile.ZIP_DEFLATED) as zf:
+            zip_tools.write_members(zf, jobs, workers)
+        workspace.promote(staging_zip, zip_path)
+    if previous:
+        previous.finish()
+    if layer:
+        layer.finish()
+    logging.info("各压缩规则的压缩率:\n" + policy.report())
+    tracing.annotate(
+        files=len(jobs),
+        zip_bytes=zip_path.stat().st_size,
+        ratio=round(_compression_ratio(zip_path), 3),
+    )
     logging.info(f"已创建压缩包: {zip_path}")
     return zip_path
 
 
-def get_available_share_path() -> Optional[Path]:
+def _compression_ratio(zip_path: Path) -> float:
+    """压缩后大小 / 原始大小。"""
+    with zipfile.ZipFile(zip_path) as zf:
+        infos = zf.infolist()
+    raw = sum(i.file_size for i in infos)
+    return sum(i.compress_size for i in infos) / raw if raw else 1.0
+
+
+def get_available_share_path(use_cache: bool = True) -> Optional[Path]:
     """
     检查并返回第一个可访问的网络共享路径。
+    各路径同时检测且有超时，结果会缓存一段时间，见 share_probe。
     """
-    if sys.platform == "linux" and config.LINUX_SHARE_PATH:
-        paths_to_check = [config.LINUX_SHARE_PATH]
-    else:
-        paths_to_check = [p for p in [config.SHARE_PATH, config.SHARE_PATH2] if p]
+    from . import share_probe
 
-    for path in paths_to_check:
-        if sys.platform == "win32":
-            if not str(path).startswith("\\"):
-                logging.info(f"路径 {path} 不是一个有效的 UNC 路径，跳过检查。")
-                continue
-        try:
-            logging.info(f"正在检查网络共享路径 {path} ...")
-            if path.is_dir():
-                logging.info(f"网络共享路径 {path} 可访问。")
-                return path
-            else:
-                logging.info(f"警告: 共享路径 {path} 存在但不是一个目录。")
-        except Exception as e:
-            logging.exception(f"警告: 无法访问网络共享路径 {path}。错误: {e}")
-
-    logging.info("所有配置的共享路径均不可用。")
-    return None
+    return share_probe.start(use_cache=use_cache).result()
 
 
 def copy_to_share(file: Path, share_path: Path):
-    """尝试将文件复制到指定的网络共享位置。"""
+    """
+    尝试将文件复制到指定的网络共享位置。
+    复制支持断点续传，完成后校验哈希再重命名到位。
+    """
+    from . import tracing, transfer
+
     try:
         destination_file = share_path / file.name
         logging.info(f"4. 尝试复制到共享目录 {destination_file} ...")
 
         share_path.mkdir(parents=True, exist_ok=True)
+        file_hash = sha256_file(file)
+        if sync.file_is_current(file, share_path, file_hash):
+            logging.info(f"共享目录中已有相同的 {file.name}（大小和哈希一致），跳过复制。")
+            tracing.annotate(skipped=True)
+            return
         file_size = file.stat().st_size
 
-        with open(file, "rb") as fsrc, open(destination_file, "wb") as fdst, tqdm(
+        from tqdm import tqdm
+
+        started = time.perf_counter()
+        with tqdm(
             total=file_size, unit="B", unit_scale=True, desc=f"复制 {file.name}"
         ) as pbar:
-            while True:
-                chunk = fsrc.read(4096 * 1024)  # 4MB chunks
-                if not chunk:
-                    break
-                fdst.write(chunk)
-                pbar.update(len(chunk))
-
+            transfer.copy_large_file(
+                file, destination_file, progress=pbar.update, src_hash=file_hash
+            )
+
+        sync.record_file(file, share_path, file_hash)
+        elapsed = time.perf_counter() - started
+        tracing.annotate(
+            bytes=file_size, mb_per_s=round(file_size / 1024 / 1024 / elapsed, 1)
+        )
         logging.info(f"\n成功复制到: {destination_file}")
     except Exception as e:
         logging.exception(f"\n警告: 复制到共享目录失败，已忽略。错误: {e}")
 
 
-def copy_dir_to_share(source_dir: Path, share_path: Path, cleanup=True):
-    """尝试将整个目录复制到指定的网络共享位置，并显示进度条。"""
-    try:
-        destination_dir = share_path / source_dir.name
-        logging.info(f"4. 尝试将目录复制到共享位置 {destination_dir} ...")
+def _sync_dir_to_share(
+    source_dir: Path, destination_dir: Path, workers: Optional[int] = None
+):
+    """按清单增量同步目录：只复制新增或变化的文件，删除多余的文件。"""
+    from . import transfer
 
-        if destination_dir.exists():
-            logging.info(f"警告: 目标目录 {destination_dir} 已存在。正在删除旧目录...")
-            shutil.rmtree(destination_dir)
+    source_manifest = sync.build_manifest(source_dir)
+    recorded = sync.load_manifest(destination_dir)
+    actual = sync.scan_dir(destination_dir)
+    to_copy, to_delete = sync.plan_sync(source_manifest, recorded, actual)
 
-        # 1. 获取所有文件列表和总大小
-        files_to_copy = [p for p in source_dir.rglob("*") if p.is_file()]
-        total_size = sum(p.stat().st_size for p in files_to_copy)
+    if not to_copy and not to_delete:
+        logging.info(f"共享目录 {destination_dir} 已是最新，跳过复制。")
+        return
 
-        # 2. 创建进度条
-        with tqdm(
-            total=total_size, unit="B", unit_scale=True, desc=f"复制 {source_dir.name}"
-        ) as pbar:
-            # 3. 遍历并复制文件
-            for src_file in files_to_copy:
-                relative_path = src_file.relative_to(source_dir)
-                dest_file = destination_dir / relative_path
+    logging.info(
+        f"增量同步: 复制 {len(to_copy)} 个文件，删除 {len(to_delete)} 个文件，"
+        f"{len(source_manifest) - len(to_copy)} 个文件无需传输。"
+    )
+    for rel in to_delete:
+        (destination_dir / rel).unlink()
+    sync.remove_empty_dirs(destination_dir)
+
+    result = transfer.copy_files(
+        [(source_dir / rel, destination_dir / rel) for rel in to_copy],
+        workers=workers,
+        desc=f"同步 {source_dir.name}",
+    )
+
+    # 记录目标端的实际大小和时间，下次据此判断文件是否被改动
+    new_manifest = {}
+    for rel, src in source_manifest.items():
+        st = result.dest_stats.get(destination_dir / rel)
+        if st is not None:
+            new_manifest[rel] = {**src, "size": st.st_size, "mtime": st.st_mtime}
+        else:
+            size, mtime = actual[rel]
+            new_manifest[rel] = {**src, "size": size, "mtime": mtime}
+    sync.save_manifest(destination_dir, new_manifest)
+
+
+def _copy_dir_full(
+    source_dir: Path, destination_dir: Path, workers: Optional[int] = None
+):
+    """删除目标目录后完整复制所有文件。"""
+    from . import transfer
+
+    if destination_dir.exists():
+        logging.info(f"警告: 目标目录 {destination_dir} 已存在。正在删除旧目录...")
+        shutil.rmtree(destination_dir)
+
+    files_to_copy = [p for p in source_dir.rglob("*") if p.is_file()]
+    transfer.copy_files(
+        [(p, destination_dir / p.relative_to(source_dir)) for p in files_to_copy],
+        workers=workers,
+        desc=f"复制 {source_dir.name}",
+    )
 
-                # 确保目标目录存在
-                dest_file.parent.mkdir(parents=True, exist_ok=True)
 
-                # 复制文件
-                shutil.copy2(src_file, dest_file)
+def copy_dir_to_share(
+    source_dir: Path,
+    share_path: Path,
+    cleanup=True,
+    incremental=True,
+    workers: Optional[int] = None,
+):
+    """
+    尝试将整个目录复制到指定的网络共享位置，并显示进度条。
+    incremental 为 True 时按清单增量同步，否则删除目标目录后完整复制。
+    workers 为并发复制数，默认读取 [copy] workers。
+    """
+    workers = workers or config.COPY_WORKERS
+    try:
+        destination_dir = share_path / source_dir.name
+        logging.info(f"4. 尝试将目录复制到共享位置 {destination_dir} ...")
 
-                # 更新进度条
-                pbar.update(src_file.stat().st_size)
+        if incremental:
+            destination_dir.mkdir(parents=True, exist_ok=True)
+            _sync_dir_to_share(source_dir, destination_dir, workers)
+        else:
+            _copy_dir_full(source_dir, destination_dir, workers)
 
         logging.info(f"\n成功将目录复制到: {destination_dir}")
     except Exception as e:
@@ -234,47 +525,72 @@ def copy_dir_to_share(source_dir: Path, share_path: Path, cleanup=True):
                     logging.info(f"已删除旧版本: {old_release.name}")
 
 
-def clean_temp_dir():
-    """清理临时构建目录。"""
-    if config.TEMP_DIR.exists():
-        shutil.rmtree(config.TEMP_DIR)
+def clean_old_releases(keep: Optional[int] = None, zip_and_folder=True):
+    """
+    清理旧的发布目录，只保留指定数量（默认读取 [release] keep）的最新版本。
+    之后删除 releases/.store 中不再被任何版本引用的文件。
+    其他正在进行的构建开始之后生成的发布目录和压缩包不会被删除。
+    """
+    keep = config.RELEASE_KEEP if keep is None else keep
+    try:
+        with FileLock(config.CACHE_DIR / "releases.lock"):
+            _clean_old_releases(keep, zip_and_folder)
+    except Exception as e:
+        logging.exception(f"警告: 清理旧的构建结果失败: {e}")
 
 
-def clean_old_releases(keep: int = 2, zip_and_folder=True):
-    """清理旧的发布目录，只保留指定数量的最新版本。"""
-    try:
-        logging.info(f"5. 清理旧的发布目录，保留最新的 {keep} 个版本...")
+def _clean_old_releases(keep: int, zip_and_folder: bool):
+    from . import release_store, workspace
 
-        # 获取所有符合命名规则的发布目录
-        release_dirs = [
-            d
-            for d in config.RELEASE_DIR.iterdir()
-            if d.is_dir() and d.name.startswith(f"{config.PROJECT_NAME}")
-        ]
+    logging.info(f"5. 清理旧的发布目录，保留最新的 {keep} 个版本...")
+    active_since = workspace.active_since()
 
-        # 按修改时间降序排序（最新的在前）
-        release_dirs.sort(key=lambda d: d.stat().st_mtime, reverse=True)
+    def removable(paths, keep: int):
+        """按修改时间降序排列，保留前 keep 个之外应删除的部分。"""
+        paths.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+        return [
+            p
+            for p in paths[keep:]
+            if active_since is None or p.stat().st_mtime < active_since
+        ]
 
-        # 如果目录数量超过要保留的数量，则删除多余的
-        if len(release_dirs) > keep:
-            dirs_to_delete = release_dirs[keep:]
-            logging.info(f"将删除以下旧目录: {[str(d.name) for d in dirs_to_delete]}")
-            for d in dirs_to_delete:
-                shutil.rmtree(d)
-            logging.info("旧目录清理完毕。")
+    # 获取所有符合命名规则的发布目录
+    release_dirs = [
+        d
+        for d in config.RELEASE_DIR.iterdir()
+        if d.is_dir() and d.name.startswith(f"{config.PROJECT_NAME}")
+    ]
+    dirs_to_delete = removable(release_dirs, keep)
+    if dirs_to_delete:
+        logging.info(f"将删除以下旧目录: {[str(d.name) for d in dirs_to_delete]}")
+        for d in dirs_to_delete:
+            shutil.rmtree(d)
+        logging.info("旧目录清理完毕。")
+    else:
+        logging.info("没有需要清理的旧目录。")
+
+    if config.RELEASE_STORE:
+        removed, freed = release_store.open_store().gc()
+        if removed:
+            logging.info(
+                f"已从发布仓库删除 {removed} 个不再引用的文件 ({freed / 1024 / 1024:.1f} MB)。"
+            )
+
+    if zip_and_folder:
+        # 清理旧的 ZIP 文件
+        keep_zips = min(keep, config.RELEASE_KEEP_ZIPS)
+        zip_files = removable(
+            list(config.RELEASE_DIR.glob(f"{config.PROJECT_NAME}_v*.zip")), keep_zips
+        )
+        for f in zip_files:
+            f.unlink()
+        if zip_files:
+            logging.info("旧的 ZIP 文件清理完毕。")
         else:
-            logging.info("没有需要清理的旧目录。")
-
-        if zip_and_folder:
-            # 清理旧的 ZIP 文件
-            zip_files = list(config.RELEASE_DIR.glob(f"{config.PROJECT_NAME}_v*.zip"))
-            if len(zip_files) > keep:
-                zip_files.sort(key=lambda f: f.stat().st_mtime, reverse=True)
-                for f in zip_files[keep:]:
-                    f.unlink()
-                logging.info("旧的 ZIP 文件清理完毕。")
-            else:
-                logging.info("没有需要清理的旧 ZIP 文件。")
+            logging.info("没有需要清理的旧 ZIP 文件。")
 
-    except Exception as e:
-        logging.exception(f"警告: 清理旧的构建结果失败: {e}")
+        for f in removable(
+            list(config.RELEASE_DIR.glob(f"{config.PROJECT_NAME}_delta_*.zip")),
+            keep_zips,
+        ):
+            f.unlink()
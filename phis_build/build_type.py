@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class BuildType(str, Enum):
+    EXE = "exe"
+    PYZ = "pyz"
@@ -1,34 +1,48 @@
 from pathlib import Path
 import tomli as tomllib
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+import fnmatch
+import json
+import os
 import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import zipfile
+import zlib
 import logging
-from . import config
+from . import cache, config, import_graph, pyz_compile, workspace, zip_tools
+from .fileutil import link_or_copy
 
-SRC_ROOT = Path.cwd()
+# zip 格式允许的最早时间，用于生成可复现的归档
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
 
-# pyproject.toml 路径
-PYPROJECT = SRC_ROOT / "pyproject.toml"
 
-
-def get_packages() -> List[Path]:
+def get_sdist_config() -> dict:
     """
-    从 pyproject.toml 中获取 packages 列表。
-    :return: 包含所有包名的列表。
+    读取 pyproject.toml 中 sdist 的打包配置。
     """
-    global PYPROJECT
-    with open(PYPROJECT, "rb") as f:
+    with open(config.PROJECT_ROOT / "pyproject.toml", "rb") as f:
         data = tomllib.load(f)
 
-    # 读取 sdist 下的 packages 配置
+    # 读取 sdist 下的配置
     def get_var(data, s: str):
         attrs = s.split(".")
         for attr in attrs:
             data = data.get(attr, {})
         return data
 
-    packages = get_var(data, "tool.hatch.build.targets.sdist").get("packages", [])
-    packages = list(map(SRC_ROOT.joinpath, packages))
+    return get_var(data, "tool.hatch.build.targets.sdist")
+
+
+def get_packages() -> List[Path]:
+    """
+    从 pyproject.toml 中获取 packages 列表。
+    :return: 包含所有包名的列表。
+    """
+    packages = get_sdist_config().get("packages", [])
+    packages = list(map(config.PROJECT_ROOT.joinpath, packages))
     return packages
 
 
@@ -37,20 +51,20 @@ def get_sources() -> Tuple[List[Path], List[Path], Path]:
     获取需要打包的目录和文件。
     返回: (目录列表, 其他py文件列表, 主py文件)
     """
-    cwd = Path.cwd()
+    root = config.PROJECT_ROOT
     # 需要包含的新目录
     required_dirs = []
 
     # 检查旧的目录（为了向后兼容）
-    if cwd.joinpath("comment").exists():
-        required_dirs.append(cwd.joinpath("comment"))
-    if cwd.joinpath("compements").exists():
-        required_dirs.append(cwd.joinpath("compements"))
+    if root.joinpath("comment").exists():
+        required_dirs.append(root.joinpath("comment"))
+    if root.joinpath("compements").exists():
+        required_dirs.append(root.joinpath("compements"))
 
     # 查找所有 .py 文件
-    python_files = list(cwd.glob("*.py"))
+    python_files = list(root.glob("*.py"))
 
-    main_py = cwd / "__main__.py"
+    main_py = root / "__main__.py"
     if not main_py.exists():
         raise ValueError("未找到主脚本 __main__.py")
 
@@ -60,48 +74,315 @@ def get_sources() -> Tuple[List[Path], List[Path], Path]:
     return required_dirs, other_python_files, main_py
 
 
-def make_package():
+def _is_excluded(path: Path, root: Path, patterns: List[str]) -> bool:
+    """判断 root 下的 path 是否命中 sdist 的 exclude 规则。"""
+    parts = path.relative_to(root).parts
+    return any(fnmatch.fnmatch(part, pat) for part in parts for pat in patterns)
+
+
+def get_entries() -> List[Tuple[str, Path]]:
     """
-    构建 pyz 包。
+    列出将被打入 pyz 的全部文件。
+    返回: [(归档内路径, 源文件路径)]，按归档内路径排序。
     """
-    build_dir = Path.cwd() / "build"
-    src_dir = build_dir / "src"
-    if src_dir.exists():
-        shutil.rmtree(src_dir)
-    src_dir.mkdir(parents=True, exist_ok=True)
+    entries = {}
+    exclude = get_sdist_config().get("exclude", [])
 
-    # 复制 packages
-    packages = get_packages()
-    for p in packages:
-        shutil.copytree(p, src_dir / p.name, dirs_exist_ok=True)
+    def add_tree(root: Path):
+        for p in root.rglob("*"):
+            if p.is_file() and not _is_excluded(p, root, exclude):
+                entries[f"{root.name}/{p.relative_to(root).as_posix()}"] = p
+
+    for p in get_packages():
+        add_tree(p)
 
     version_file = config.VERSION_FILE
-    if Path(src_dir / "phis_build").exists():
-        shutil.copy(version_file, src_dir / "phis_build" / version_file.name)
+    if any(p.name == "phis_build" for p in get_packages()) and version_file.exists():
+        entries[f"phis_build/{version_file.name}"] = version_file
 
-    # 复制需要的目录和文件
     dirs, files, main_py = get_sources()
     for d in dirs:
-        shutil.copytree(d, src_dir / d.name, dirs_exist_ok=True)
+        add_tree(d)
     for f in files:
-        shutil.copy(f, src_dir / f.name)
-    shutil.copy(main_py, src_dir / main_py.name)
-
-    # 创建 pyz 文件
-    pyz_file = build_dir / "app.pyz"
-    zip_file = pyz_file.with_suffix(".zip")
-    if zip_file.exists():
-        zip_file.unlink()
-    shutil.make_archive(str(zip_file.with_suffix("")), "zip", src_dir)
-    if pyz_file.exists():
-        pyz_file.unlink()
-    # 将 zip 重命名为 pyz
-    zip_file.rename(pyz_file)
-    shutil.copy(pyz_file, Path.cwd() / "app.pyz")
-    if src_dir.exists():
-        shutil.rmtree(src_dir)
+        entries[f.name] = f
+    entries[main_py.name] = main_py
+    return sorted(entries.items())
+
+
+def get_cache_key() -> str:
+    """根据包目录、顶层 py 文件、__main__.py、sdist、预编译和裁剪配置计算 pyz 的缓存键。"""
+    sdist = json.dumps(get_sdist_config(), sort_keys=True, ensure_ascii=False)
+    extra = f"{sdist}\0{config.PYZ_INTERPRETER or ''}"
+    if config.PYZ_COMPILE:
+        extra += (
+            f"\0compile {_target_version()} -O{config.PYZ_OPTIMIZE}"
+            f" strip={config.PYZ_STRIP_SOURCES}"
+        )
+    if config.SHAKE_PYZ:
+        extra += f"\0shake keep={sorted(config.SHAKE_KEEP)}"
+    return cache.hash_inputs(get_entries(), extra=extra)
+
+
+def _target_version() -> str:
+    return config.PYZ_PYTHON or "%d.%d" % sys.version_info[:2]
+
+
+def _find_interpreter(version: str) -> Optional[List[str]]:
+    """找到指定版本的 Python 解释器命令，找不到时返回 None。"""
+    if sys.platform == "win32":
+        candidates = [["py", f"-{version}"]]
+    else:
+        candidates = [[f"python{version}"]]
+    for command in candidates:
+        if not shutil.which(command[0]):
+            continue
+        proc = subprocess.run(
+            [*command, "-c", "import sys; print('%d.%d' % sys.version_info[:2])"],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode == 0 and proc.stdout.strip() == version:
+            return command
+    return None
+
+
+def compile_entries(entries: List[Tuple[str, Path]]) -> Dict[str, bytes]:
+    """
+    把 entries 中的 .py 编译为 .pyc，返回 {pyc 归档名: 内容}。
+    目标版本与当前解释器不同时，交给目标版本的解释器编译；找不到时报错退出。
+    有语法错误的模块不生成 pyc，仍然只放源码。
+    """
+    sources = [(a, p) for a, p in entries if a.endswith(".py")]
+    version = _target_version()
+    optimize = config.PYZ_OPTIMIZE
+    logging.info(f"预编译 {len(sources)} 个模块 (Python {version}, -O{optimize}) ...")
+    if config.PYZ_STRIP_SOURCES and not config.PYZ_PYTHON:
+        logging.warning(
+            "警告: 未设置 [pyz] python，pyc 按当前解释器编译；"
+            "运行 pyz 的 Python 版本不同时，去掉源码的模块将无法导入。"
+        )
+
+    with tempfile.TemporaryDirectory(prefix="phis_pyc_") as tmp:
+        jobs = [
+            {"src": str(path), "dfile": arcname, "dst": str(Path(tmp) / f"{i}.pyc")}
+            for i, (arcname, path) in enumerate(sources)
+        ]
+        if version == "%d.%d" % sys.version_info[:2]:
+            errors = pyz_compile.compile_files(jobs, optimize)
+        else:
+            command = _find_interpreter(version)
+            if command is None:
+                logging.error(
+                    f"错误: [pyz] python = {version!r}，但未找到该版本的解释器，"
+                    f"当前解释器为 {sys.version_info[0]}.{sys.version_info[1]}。"
+                )
+                sys.exit(1)
+            proc = subprocess.run(
+                [*command, pyz_compile.__file__],
+                input=json.dumps({"jobs": jobs, "optimize": optimize}),
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            result = json.loads(proc.stdout)
+            if result["version"] != version:
+                logging.error(f"错误: 编译使用的解释器版本为 {result['version']}，与目标 {version} 不一致。")
+                sys.exit(1)
+            errors = result["errors"]
+
+        for src, error in errors.items():
+            logging.warning(f"警告: {src} 编译失败，只打包源码: {error}")
+        return {
+            arcname[:-3] + ".pyc": Path(job["dst"]).read_bytes()
+            for (arcname, path), job in zip(sources, jobs)
+            if str(path) not in errors
+        }
+
+
+def write_pyz(
+    entries: List[Tuple[str, Path]],
+    pyz_file: Path,
+    interpreter: Optional[str] = None,
+    pycs: Optional[Dict[str, bytes]] = None,
+    strip_sources: bool = False,
+    previous: Optional[Path] = None,
+):
+    """
+    将文件直接写入 pyz，不经过中间目录。
+    条目按路径排序、时间戳固定，相同输入得到字节一致的结果。
+    pycs 为预编译的 {归档名: pyc 内容}；strip_sources 时已有 pyc 的模块不再放源码。
+    指定 previous 时，内容（大小和 CRC）未变化的条目直接复制其中的压缩数据。
+    """
+    pycs = pycs or {}
+    files: List[Tuple[str, Optional[Path]]] = []
+    for arcname, path in entries:
+        pyc_name = arcname[:-3] + ".pyc"
+        if arcname in pycs:
+            continue
+        if strip_sources and pyc_name in pycs and arcname != "__main__.py":
+            continue
+        files.append((arcname, path))
+    files += [(name, None) for name in pycs]
+    files.sort(key=lambda f: f[0])
+
+    tmp_file = pyz_file.with_name(f"{pyz_file.name}.{os.getpid()}.tmp")
+    pyz_file.parent.mkdir(parents=True, exist_ok=True)
+
+    dir_names = set()
+    for arcname, _ in files:
+        parts = arcname.split("/")[:-1]
+        for i in range(1, len(parts) + 1):
+            dir_names.add("/".join(parts[:i]) + "/")
+
+    old: Dict[str, zipfile.ZipInfo] = {}
+    if previous and previous.exists():
+        try:
+            with zipfile.ZipFile(previous) as zf:
+                old = {i.filename: i for i in zf.infolist()}
+        except (OSError, zipfile.BadZipFile) as e:
+            logging.info(f"警告: 无法读取 {previous}，将完整重新压缩: {e}")
+
+    with open(tmp_file, "wb") as fd:
+        if interpreter:
+            # 与 zipapp.create_archive 相同的文件头
+            fd.write(b"#!" + interpreter.encode(sys.getfilesystemencoding()) + b"\n")
+        with zipfile.ZipFile(fd, "w") as zf:
+            for name in sorted(dir_names):
+                info = zipfile.ZipInfo(name, date_time=ZIP_EPOCH)
+                info.create_system = 3
+                info.external_attr = (0o40755 << 16) | 0x10
+                zf.writestr(info, b"")
+            for arcname, path in files:
+                data = path.read_bytes() if path else pycs[arcname]
+                info = zipfile.ZipInfo(arcname, date_time=ZIP_EPOCH)
+                info.create_system = 3
+                info.external_attr = 0o100644 << 16
+                info.compress_type = zipfile.ZIP_DEFLATED
+                prev = old.get(arcname)
+                if (
+                    prev is not None
+                    and prev.compress_type == zipfile.ZIP_DEFLATED
+                    and prev.file_size == len(data)
+                    and prev.CRC == zlib.crc32(data)
+                ):
+                    info.CRC = prev.CRC
+                    info.file_size = prev.file_size
+                    info.compress_size = prev.compress_size
+                    zip_tools.write_raw(zf, info, zip_tools.read_raw(previous, prev))
+                else:
+                    zf.writestr(info, data)
+
+    if interpreter:
+        tmp_file.chmod(tmp_file.stat().st_mode | stat.S_IEXEC)
+    os.replace(tmp_file, pyz_file)
+
+
+def make_package(use_cache: bool = True):
+    """
+    构建 pyz 包，结果写入 config.BUILD_DIR/app.pyz（完整构建期间位于工作区中）。
+    如果输入内容与上次构建相同，则直接复用共用缓存 build/app.pyz。
+    """
+    pyz_file = config.BUILD_DIR / "app.pyz"
+    cached_pyz = config.BUILD_CACHE_DIR / "app.pyz"
+
+    key = get_cache_key() if use_cache else None
+    if key:
+        with workspace.build_cache_lock():
+            entry = cache.load_entry("pyz")
+            hit = (
+                entry
+                and entry.get("key") == key
+                and cached_pyz.exists()
+                and cached_pyz.stat().st_size == entry.get("size")
+            )
+            if hit:
+                logging.info(f"pyz 构建缓存命中，复用 {cached_pyz}")
+                if pyz_file != cached_pyz:
+                    link_or_copy(cached_pyz, pyz_file)
+                link_or_copy(cached_pyz, config.PROJECT_ROOT / "app.pyz")
+                return
+        logging.info("pyz 构建缓存未命中，重新打包...")
+
+    entries = get_entries()
+    if config.SHAKE_PYZ:
+        entries = import_graph.shake_entries(entries)
+    pycs = compile_entries(entries) if config.PYZ_COMPILE else None
+    write_pyz(
+        entries,
+        pyz_file,
+        interpreter=config.PYZ_INTERPRETER,
+        pycs=pycs,
+        strip_sources=config.PYZ_STRIP_SOURCES,
+    )
+    _promote_pyz(pyz_file, key)
     logging.info(f"打包完成: {pyz_file}")
 
 
+def _promote_pyz(pyz_file: Path, key: Optional[str]):
+    """把新的 app.pyz 放入共用缓存和项目根目录。write_pyz 总是写新文件再替换，硬链接是安全的。"""
+    cached_pyz = config.BUILD_CACHE_DIR / "app.pyz"
+    with workspace.build_cache_lock():
+        if pyz_file != cached_pyz:
+            tmp = cached_pyz.with_name(f"{cached_pyz.name}.{os.getpid()}.tmp")
+            link_or_copy(pyz_file, tmp)
+            os.replace(tmp, cached_pyz)
+        link_or_copy(pyz_file, config.PROJECT_ROOT / "app.pyz")
+        # 不使用缓存时清空记录，缓存中的 app.pyz 已不再对应原来的输入
+        cache.save_entry(
+            "pyz", {"key": key, "size": pyz_file.stat().st_size} if key else {}
+        )
+
+
+def rebuild_package(pyc_cache: Dict[str, Tuple[Tuple[int, int], bytes]]):
+    """
+    监视模式下重新构建 pyz：未变化的条目复用 build/app.pyz 中的压缩数据，
+    需要预编译时只编译 pyc_cache 中没有或已过期的模块。
+    结果刷新到 build/、项目目录和 releases/temp 中的 app.pyz。
+    pyc_cache 为 {源码归档名: ((mtime_ns, 大小), pyc 内容)}，由调用方在多次构建间保留。
+    """
+    pyz_file = config.BUILD_DIR / "app.pyz"
+    entries = get_entries()
+    if config.SHAKE_PYZ:
+        entries = import_graph.shake_entries(entries)
+
+    pycs = None
+    if config.PYZ_COMPILE:
+
+        def stat_key(path: Path) -> Tuple[int, int]:
+            st = path.stat()
+            return st.st_mtime_ns, st.st_size
+
+        sources = [(a, p) for a, p in entries if a.endswith(".py")]
+        stale = [
+            (a, p)
+            for a, p in sources
+            if a not in pyc_cache or pyc_cache[a][0] != stat_key(p)
+        ]
+        if stale:
+            compiled = compile_entries(stale)
+            for arcname, path in stale:
+                data = compiled.get(arcname[:-3] + ".pyc")
+                if data is None:
+                    pyc_cache.pop(arcname, None)
+                else:
+                    pyc_cache[arcname] = (stat_key(path), data)
+        pycs = {a[:-3] + ".pyc": pyc_cache[a][1] for a, _ in sources if a in pyc_cache}
+
+    # 监视模式不在工作区中，build/app.pyz 就是共用缓存，写入和发布期间持锁
+    with workspace.build_cache_lock():
+        write_pyz(
+            entries,
+            pyz_file,
+            interpreter=config.PYZ_INTERPRETER,
+            pycs=pycs,
+            strip_sources=config.PYZ_STRIP_SOURCES,
+            previous=pyz_file,
+        )
+        link_or_copy(pyz_file, config.PROJECT_ROOT / "app.pyz")
+        link_or_copy(pyz_file, config.TEMP_DIR / "app.pyz")
+        # 缓存记录与这次的 app.pyz 不再对应，让下一次普通构建重新打包
+        cache.save_entry("pyz", {})
+
+
 if __name__ == "__main__":
     make_package()
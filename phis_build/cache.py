@@ -0,0 +1,58 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from . import config
+
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """计算单个文件内容的 sha256。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_inputs(entries: Iterable[Tuple[str, Path]], extra: str = "") -> str:
+    """
+    根据 (归档名, 文件路径) 列表计算整体内容哈希。
+    归档名和文件内容都会参与计算，因此重命名或移动文件也会改变哈希。
+    """
+    h = hashlib.sha256()
+    h.update(extra.encode("utf-8"))
+    for arcname, path in sorted(entries, key=lambda e: e[0]):
+        h.update(b"\0" + arcname.encode("utf-8") + b"\0")
+        h.update(sha256_file(path).encode("ascii"))
+    return h.hexdigest()
+
+
+def _entry_path(name: str) -> Path:
+    return config.CACHE_DIR / f"{name}.json"
+
+
+def load_entry(name: str) -> Optional[dict]:
+    """读取缓存记录，不存在或损坏时返回 None。"""
+    path = _entry_path(name)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.info(f"警告: 缓存记录 {path} 无法读取，已忽略: {e}")
+        return None
+
+
+def save_entry(name: str, data: dict):
+    """原子地写入缓存记录。"""
+    path = _entry_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,212 @@
+"""
+发布包的压缩策略。
+
+按规则（文件名或相对路径的通配符）决定每个文件的压缩方式:
+  stored   不压缩（图片、压缩包等已压缩的数据）
+  deflated 按指定级别压缩
+  auto     先试压文件的采样块，压缩收益太小时不压缩
+规则按顺序匹配，phis_build.toml 中 [[zip.rules]] 的规则优先于内置规则。
+"""
+
+import fnmatch
+import logging
+import threading
+import unicodedata
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import config
+
+METHODS = ("stored", "deflated", "auto")
+
+DEFAULT_RULES = [
+    {
+        "name": "已压缩格式",
+        "patterns": [
+            "*.zip", "*.7z", "*.rar", "*.gz", "*.bz2", "*.xz", "*.jar", "*.pyz",
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp",
+            "*.mp3", "*.mp4", "*.webm", "*.woff", "*.woff2",
+        ],
+        "method": "stored",
+    },
+    {
+        "name": "脚本和文本",
+        "patterns": [
+            "*.py", "*.bat", "*.txt", "*.json", "*.toml", "*.ini", "*.md",
+            "*.html", "*.js", "*.css", "*.xml",
+        ],
+        "method": "deflated",
+    },
+]  # fmt: skip
+"""内置规则；其余文件（exe、dll、pak 等）使用 auto"""
+
+SAMPLE_SIZE = 64 * 1024
+
+
+class Rule:
+    def __init__(
+        self,
+        name: str,
+        patterns: List[str],
+        method: str,
+        level: Optional[int] = None,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"压缩规则 {name!r} 的方式 {method!r} 无效，可选: {METHODS}")
+        self.name = name
+        self.patterns = patterns
+        self.method = method
+        self.level = level
+
+    def matches(self, rel: str) -> bool:
+        """不含 / 的模式匹配文件名，否则匹配发布目录内的相对路径。"""
+        name = rel.rsplit("/", 1)[-1]
+        return any(
+            fnmatch.fnmatch(rel if "/" in pat else name, pat) for pat in self.patterns
+        )
+
+
+class RuleStats:
+    def __init__(self):
+        self.files = 0
+        self.stored = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+
+class CompressionPolicy:
+    """决定每个文件的压缩方式，并按规则统计压缩效果。"""
+
+    def __init__(
+        self,
+        rules: List[Rule],
+        level: int,
+        min_gain: float = 0.05,
+        sample_size: int = SAMPLE_SIZE,
+    ):
+        self.rules = rules
+        self.fallback = Rule("其他 (auto)", ["*"], "auto")
+        self.level = level
+        self.min_gain = min_gain
+        self.sample_size = sample_size
+        self.lock = threading.Lock()
+        self.stats: Dict[str, RuleStats] = {}
+
+    def rule_for(self, rel: str) -> Rule:
+        for rule in self.rules:
+            if rule.matches(rel):
+                return rule
+        return self.fallback
+
+    def _sample(self, path: Path, size: int) -> bytes:
+        """
+        读取文件开头的一块；较大的文件再读中间的一块，
+        避免 PyInstaller onefile 这类“可压缩的文件头 + 已压缩的载荷”被误判。
+        """
+        with open(path, "rb") as f:
+            sample = f.read(self.sample_size)
+            if size > self.sample_size * 4:
+                f.seek(size // 2)
+                sample += f.read(self.sample_size)
+        return sample
+
+    def level_for(self, rule: Rule) -> int:
+        """规则使用的压缩级别，没有单独指定时使用全局级别。"""
+        return self.level if rule.level is None else rule.level
+
+    def fixed_type(self, rule: Rule) -> Optional[int]:
+        """不需要采样就能确定的压缩方式，auto 规则返回 None。"""
+        if rule.method == "stored" or self.level_for(rule) == 0:
+            return zipfile.ZIP_STORED
+        if rule.method == "deflated":
+            return zipfile.ZIP_DEFLATED
+        return None
+
+    def decide(self, path: Path, rel: str) -> Tuple[int, int, Rule]:
+        """返回 (compress_type, level, 匹配的规则)。"""
+        rule = self.rule_for(rel)
+        level = self.level_for(rule)
+        fixed = self.fixed_type(rule)
+        if fixed is not None:
+            return fixed, level, rule
+
+        size = path.stat().st_size
+        if size == 0:
+            return zipfile.ZIP_STORED, level, rule
+        sample = self._sample(path, size)
+        # 用最快的级别估算，已压缩的数据在任何级别下都几乎没有收益
+        gain = 1 - len(zlib.compress(sample, 1)) / len(sample)
+        if gain < self.min_gain:
+            return zipfile.ZIP_STORED, level, rule
+        return zipfile.ZIP_DEFLATED, level, rule
+
+    def record(self, rule: Rule, info: zipfile.ZipInfo):
+        with self.lock:
+            stats = self.stats.setdefault(rule.name, RuleStats())
+            stats.files += 1
+            stats.stored += info.compress_type == zipfile.ZIP_STORED
+            stats.raw_bytes += info.file_size
+            stats.compressed_bytes += info.compress_size
+
+    def report(self) -> str:
+        """按规则汇总压缩率。"""
+        mb = 1024 * 1024
+        widths = (16, 10, 10, 11, 14, 10)
+        rows = [
+            _columns(
+                ("规则", "文件数", "未压缩", "原始(MB)", "压缩后(MB)", "压缩率"), widths
+            )
+        ]
+        for name, s in self.stats.items():
+            ratio = s.compressed_bytes / s.raw_bytes if s.raw_bytes else 1.0
+            rows.append(
+                _columns(
+                    (
+                        name,
+                        str(s.files),
+                        str(s.stored),
+                        f"{s.raw_bytes / mb:.1f}",
+                        f"{s.compressed_bytes / mb:.1f}",
+                        f"{ratio:.1%}",
+                    ),
+                    widths,
+                )
+            )
+        return "\n".join(rows)
+
+
+def display_width(text: str) -> int:
+    """终端中的显示宽度，全角和宽字符（如中文）占两列。"""
+    return sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+
+
+def _columns(cells: Tuple[str, ...], widths: Tuple[int, ...]) -> str:
+    """第一列左对齐，其余右对齐，按显示宽度补齐空格。"""
+    parts = []
+    for i, (cell, width) in enumerate(zip(cells, widths)):
+        pad = " " * max(0, width - display_width(cell))
+        parts.append(cell + pad if i == 0 else pad + cell)
+    return "".join(parts)
+
+
+def load_policy(level: int) -> CompressionPolicy:
+    """根据 phis_build.toml 的 [zip] 配置创建压缩策略。"""
+    rules = []
+    for i, item in enumerate(config.ZIP_RULES + DEFAULT_RULES):
+        patterns = item.get("patterns") or item.get("pattern")
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        try:
+            rules.append(
+                Rule(
+                    item.get("name") or f"规则{i + 1}",
+                    patterns or [],
+                    item.get("method", "deflated"),
+                    item.get("level"),
+                )
+            )
+        except ValueError as e:
+            logging.warning(f"{e}，已忽略该规则。")
+    return CompressionPolicy(rules, level, min_gain=config.ZIP_MIN_GAIN)
@@ -1,3 +1,10 @@
+"""
+构建配置。
+
+配置在第一次访问 config.XXX 时才读取并校验 phis_build.toml，
+导入本模块本身不会读写任何文件。
+"""
+
 import sys
 from pathlib import Path
 import os
@@ -13,76 +20,24 @@ def _process_share_path(path_str: Optional[str]) -> Optional[Path]:
     return Path(path_str)
 
 
-try:
-    import tomllib  # type: ignore
-except ImportError:
-    # For Python < 3.11, you might need to pip install tomli
-    import tomli as tomllib  # type: ignore
-
-# --- 基本路径 ---
-PROJECT_ROOT = Path(os.getcwd())
-"""项目根目录"""
-
 # 项目根目录
 ROOT_DIR = Path(__file__).parent.parent.parent
 
 # 配置文件路径
 BUILD_CONFIG_PATH = ROOT_DIR / "phis_build.toml"
-VERSION_FILE = ROOT_DIR / "engine/phis_build/version.txt"
 
-CONFIG_FILE = PROJECT_ROOT / "phis_build.toml"
+SHARED_CACHE_ENV = "PHIS_BUILD_SHARED_CACHE"
+"""设置后覆盖 [cache] shared_dir，批量构建时由主进程设置"""
 
-if not CONFIG_FILE.exists():
-    CONFIG_FILE.write_text(
-        encoding="utf-8",
-        data="""
+EXAMPLE_CONFIG = """
 # 配置文件示例
 # 请根据实际情况修改以下内容
 project_name = "NAME"
 share_path = "//192.168.a.b/11/22/33"
 # share_path2 = "//192.168.c.d/share" # (可选) 第二个备用共享路径
-""",
-    )
-    logging.info(f"配置文件 {CONFIG_FILE} 不存在，已创建示例文件。请根据实际情况修改。")
-    exit(1)
-
-# --- 从 toml 加载配置 ---
-try:
-    with open(CONFIG_FILE, "rb") as f:
-        _config = tomllib.load(f)
-    PROJECT_NAME = _config["project_name"]
-    APP_NAME = PROJECT_NAME
-    SHARE_PATH = _process_share_path(_config["share_path"])
-    SHARE_PATH2 = _process_share_path(_config["share_path"])
-    _linux_share_path_str = _config.get("linux_share_path")
-    LINUX_SHARE_PATH = Path(_linux_share_path_str) if _linux_share_path_str else None
-except (FileNotFoundError, KeyError) as e:
-    logging.info(f"错误: 无法加载或解析 '{CONFIG_FILE.name}' 文件。")
-    logging.info(f"请确保该文件存在于 '{PROJECT_ROOT}' 目录下，")
-    logging.info("并且包含了 'project_name' 和 'share_path' 键。")
-    logging.info(f"详细错误: {e}")
-    sys.exit(1)
-
-# --- 派生路径和常量 ---
-RELEASE_DIR = PROJECT_ROOT / "releases"
-"""存放最终发布版本和压缩包的目录"""
-
-TEMP_DIR = RELEASE_DIR / "temp"
-"""用于构建过程的临时目录"""
-
-DIST_DIR = PROJECT_ROOT / "dist"
-"""PyInstaller 的默认输出目录 (在此脚本中未使用，但作为参考)"""
-
-BUILD_DIR = PROJECT_ROOT / "build"
-"""PyInstaller 的工作目录"""
-
-SPEC_FILE = PROJECT_ROOT / f"{PROJECT_NAME}.spec"
-"""PyInstaller 的 .spec 配置文件路径"""
-
-if not SPEC_FILE.exists():
-    SPEC_FILE.write_text(
-        encoding="utf-8",
-        data=f"""# -*- mode: python ; coding: utf-8 -*-
+"""
+
+SPEC_TEMPLATE = """# -*- mode: python ; coding: utf-8 -*-
 a = Analysis(
     ['{PROJECT_NAME}.py'],
     pathex=[],
@@ -119,14 +74,216 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
-""",
-    )
-    logging.info(f"未找到 {SPEC_FILE}，已创建默认的 PyInstaller 配置文件。")
+"""
+
+
+class Config:
+    """从项目目录下的 phis_build.toml 加载的一份配置。"""
+
+    def __init__(self, project_root: Path, data: dict):
+        # --- 基本路径 ---
+        self.PROJECT_ROOT = project_root
+        """项目根目录"""
+
+        self.CONFIG_FILE = project_root / "phis_build.toml"
+
+        # --- 从 toml 加载配置 ---
+        self.PROJECT_NAME = data["project_name"]
+        self.APP_NAME = self.PROJECT_NAME
+        self.SHARE_PATH = _process_share_path(data["share_path"])
+        self.SHARE_PATH2 = _process_share_path(data.get("share_path2"))
+        _linux_share_path_str = data.get("linux_share_path")
+        self.LINUX_SHARE_PATH = (
+            Path(_linux_share_path_str) if _linux_share_path_str else None
+        )
+        _pyz_config = data.get("pyz", {})
+        self.PYZ_INTERPRETER = _pyz_config.get("interpreter")
+        """写入 pyz 文件头的解释器 (shebang)，为空时不写入"""
+        self.PYZ_COMPILE = _pyz_config.get("compile", False)
+        """是否把模块预编译为 .pyc 放入 pyz"""
+        self.PYZ_OPTIMIZE = _pyz_config.get("optimize", 0)
+        """预编译的优化级别 (0/1/2)，同 python -O / -OO"""
+        self.PYZ_STRIP_SOURCES = _pyz_config.get("strip_sources", False)
+        """预编译后是否不再放入 .py 源码（__main__.py 总是保留）"""
+        self.PYZ_PYTHON = _pyz_config.get("python")
+        """运行 pyz 的 Python 版本，例如 "3.8"；为空时按当前解释器的版本编译"""
+        _zip_config = data.get("zip", {})
+        self.ZIP_WORKERS = _zip_config.get("workers")
+        """压缩发布包的线程数，为空时使用 CPU 核数"""
+        self.ZIP_LEVEL = _zip_config.get("level", 6)
+        """发布包的 deflate 压缩级别 (0-9)"""
+        self.ZIP_STATIC_LAYER = _zip_config.get("static_layer", True)
+        """是否缓存静态资源目录的压缩结果，供之后的发布包直接复用"""
+        self.ZIP_INCREMENTAL = _zip_config.get("incremental", True)
+        """是否从上一个发布包中复用未变化文件的压缩数据"""
+        self.ZIP_RULES = _zip_config.get("rules", [])
+        """压缩规则 [[zip.rules]]: name / patterns / method (stored, deflated, auto) / level"""
+        self.ZIP_MIN_GAIN = _zip_config.get("min_gain", 0.05)
+        """auto 规则下采样压缩后体积减少不到这个比例时不压缩"""
+        _copy_config = data.get("copy", {})
+        self.COPY_WORKERS = _copy_config.get("workers")
+        """复制目录到共享位置时的并发数，为空时使用默认值"""
+        self.COPY_PIPELINE = _copy_config.get("pipeline", False)
+        """是否在压缩发布包的同时上传到目标目录"""
+        self.SHARE_PROBE_TIMEOUT = _copy_config.get("probe_timeout", 5.0)
+        """检测单个共享路径是否可用的超时时间（秒）"""
+        self.SHARE_PROBE_TTL = _copy_config.get("probe_ttl", 300.0)
+        """可用共享路径的检测结果缓存多久（秒），0 表示不缓存"""
+        self.STAGE_MODE = data.get("stage", {}).get("mode", "auto")
+        """暂存目录 (TEMP_DIR) 的方式: auto / reflink / hardlink / copy；发布目录只用 reflink 或复制"""
+        _release_config = data.get("release", {})
+        self.RELEASE_STORE = _release_config.get("store", True)
+        """发布目录中的文件是否以硬链接指向 releases/.store 中按内容保存的对象"""
+        self.RELEASE_COPY_DIRS = _release_config.get("copy_dirs", ["配置文件"])
+        """发布目录中运行时会被修改的目录（相对路径），其中的文件总是复制，不放入仓库"""
+        self.RELEASE_KEEP = _release_config.get("keep", 2)
+        """保留的发布目录数量"""
+        self.RELEASE_KEEP_ZIPS = _release_config.get("keep_zips", 2)
+        """保留的发布包 (.zip) 数量"""
+        _watch_config = data.get("watch", {})
+        self.WATCH_INTERVAL = _watch_config.get("interval", 0.3)
+        """监视模式检查源文件变化的间隔（秒）"""
+        self.WATCH_DEBOUNCE = _watch_config.get("debounce", 0.2)
+        """监视模式下文件静止多久后才重新构建（秒）"""
+        _exe_config = data.get("exe", {})
+        self.EXE_MODE = _exe_config.get("mode", "onefile")
+        """PyInstaller 的输出方式: onefile (单个 exe) 或 onedir (目录，启动更快)"""
+        self.EXE_UPX_EXCLUDE = _exe_config.get("upx_exclude", [])
+        """onedir 下额外不用 UPX 压缩的二进制文件（文件名通配符），追加在默认规则之后"""
+        _launch_config = data.get("launch", {})
+        self.LAUNCH_ARGS = _launch_config.get("args", ["--help"])
+        """测量启动时间时传给程序的参数，程序应在完成启动后立即退出"""
+        self.LAUNCH_RUNS = _launch_config.get("runs", 5)
+        """测量热启动的次数"""
+        self.LAUNCH_TIMEOUT = _launch_config.get("timeout", 120)
+        """单次启动的超时时间（秒）"""
+        self.DELTA_ENABLED = data.get("delta", {}).get("enabled", True)
+        """是否生成相对上一个发布目录的差分更新包"""
+        _metrics_config = data.get("metrics", {})
+        self.METRICS_ENABLED = _metrics_config.get("enabled", True)
+        """是否把每次构建的指标写入 .phis_cache/metrics.sqlite"""
+        self.METRICS_WINDOW = _metrics_config.get("window", 10)
+        """回归检测的基线: 最近多少次成功构建的中位数"""
+        self.METRICS_THRESHOLD = _metrics_config.get("threshold", 0.2)
+        """步骤耗时或产物大小比基线差多少（比例）时警告"""
+        self.METRICS_MIN_SECONDS = _metrics_config.get("min_seconds", 1.0)
+        """基线耗时低于此值（秒）的步骤波动较大，不做回归检测"""
+        _shake_config = data.get("shake", {})
+        self.SHAKE_PYZ = _shake_config.get("pyz", False)
+        """pyz 构建时是否不打包从 __main__.py 不可达的模块"""
+        self.SHAKE_EXE = _shake_config.get("exe", False)
+        """exe 构建时是否把不可达的本地模块写入 PyInstaller 的 excludes"""
+        self.SHAKE_KEEP = _shake_config.get("keep", [])
+        """总是视为可达的模块（通配符），用于动态导入的模块"""
+        self.SHAKE_EXCLUDES = _shake_config.get("excludes", [])
+        """exe 构建时额外排除的模块，例如 tkinter、unittest"""
+
+        # --- 派生路径和常量 ---
+        self.RELEASE_DIR = project_root / "releases"
+        """存放最终发布版本和压缩包的目录"""
+
+        self.TEMP_DIR = self.RELEASE_DIR / "temp"
+        """用于构建过程的临时目录；完整构建期间指向本次构建的工作区 (见 workspace)"""
+
+        self.WORK_DIR: Optional[Path] = None
+        """本次构建的工作区 releases/.work/<id>，只在完整构建期间设置"""
+
+        self.DIST_DIR = project_root / "dist"
+        """PyInstaller 的默认输出目录 (在此脚本中未使用，但作为参考)"""
+
+        self.BUILD_DIR = project_root / "build"
+        """PyInstaller 的工作目录和 app.pyz；完整构建期间指向本次构建的工作区"""
+
+        self.BUILD_CACHE_DIR = project_root / "build"
+        """各次构建共用的 build/ 缓存，构建成功后由工作区中的结果替换"""
+
+        self.CACHE_DIR = project_root / ".phis_cache"
+        """构建缓存目录（内容哈希记录等）"""
+
+        _shared_cache = os.environ.get(SHARED_CACHE_ENV) or data.get("cache", {}).get(
+            "shared_dir"
+        )
+        self.SHARED_CACHE_DIR = (
+            project_root / _shared_cache if _shared_cache else None
+        )
+        """多个项目共用的缓存目录（预压缩层、PyInstaller 缓存），为空时不共享"""
+
+        self.SPEC_FILE = project_root / f"{self.PROJECT_NAME}.spec"
+        """PyInstaller 的 .spec 配置文件路径"""
+
+        self.VERSION_FILE = project_root / "VERSION"
+        """存储版本号的文件"""
+
+        # --- 源目录 ---
+        self.文档目录 = project_root / "文档"
+        self.浏览器配置文件 = project_root / "配置文件"
+        self.浏览器 = project_root / "BIN"
+
+    @classmethod
+    def load(cls, project_root: Optional[Path] = None) -> "Config":
+        """
+        读取并校验 project_root (默认为当前目录) 下的 phis_build.toml。
+        配置文件不存在时创建示例文件并退出。
+        """
+        try:
+            import tomllib  # type: ignore
+        except ImportError:
+            # For Python < 3.11, you might need to pip install tomli
+            import tomli as tomllib  # type: ignore
+
+        project_root = project_root or Path(os.getcwd())
+        config_file = project_root / "phis_build.toml"
+
+        if not config_file.exists():
+            config_file.write_text(encoding="utf-8", data=EXAMPLE_CONFIG)
+            logging.info(
+                f"配置文件 {config_file} 不存在，已创建示例文件。请根据实际情况修改。"
+            )
+            sys.exit(1)
+
+        try:
+            with open(config_file, "rb") as f:
+                data = tomllib.load(f)
+            return cls(project_root, data)
+        except (FileNotFoundError, KeyError) as e:
+            logging.info(f"错误: 无法加载或解析 '{config_file.name}' 文件。")
+            logging.info(f"请确保该文件存在于 '{project_root}' 目录下，")
+            logging.info("并且包含了 'project_name' 和 'share_path' 键。")
+            logging.info(f"详细错误: {e}")
+            sys.exit(1)
+
+    def ensure_spec_file(self):
+        """PyInstaller 的 .spec 文件不存在时创建默认配置。"""
+        if not self.SPEC_FILE.exists():
+            self.SPEC_FILE.write_text(
+                encoding="utf-8",
+                data=SPEC_TEMPLATE.format(PROJECT_NAME=self.PROJECT_NAME),
+            )
+            logging.info(f"未找到 {self.SPEC_FILE}，已创建默认的 PyInstaller 配置文件。")
+
+
+_current: Optional[Config] = None
+
+
+def get() -> Config:
+    """返回当前配置，第一次调用时加载。"""
+    global _current
+    if _current is None:
+        _current = Config.load()
+    return _current
+
+
+def use(cfg: Optional[Config]):
+    """切换当前配置；传入 None 时下次访问会重新加载。"""
+    global _current
+    _current = cfg
 
-VERSION_FILE = PROJECT_ROOT / "VERSION"
-"""存储版本号的文件"""
 
-# --- 源目录 ---
-文档目录 = PROJECT_ROOT / "文档"
-浏览器配置文件 = PROJECT_ROOT / "配置文件"
-浏览器 = PROJECT_ROOT / "BIN"
+def __getattr__(name: str):
+    # 兼容 config.PROJECT_NAME 这样的模块属性访问
+    if name.startswith("__"):
+        raise AttributeError(name)
+    try:
+        return getattr(get(), name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
@@ -0,0 +1,172 @@
+"""
+相邻两个发布版本之间的差分更新包。
+
+差分包 <PROJECT>_delta_<旧版本>_to_<新版本>.zip 只包含新增或变化的文件 (files/...)、
+记录删除文件和各文件期望 sha256 的 delta.json，以及应用脚本。
+每个发布目录中都会放入应用脚本 (应用更新.bat + apply_update.ps1) 和记录版本号的
+.phis_release，现场把差分包拖到 应用更新.bat 上即可校验并更新。
+"""
+
+import json
+import logging
+import os
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import compress_policy, config, zip_tools
+from .cache import sha256_file
+from .filelock import FileLock
+
+MARKER_NAME = ".phis_release"
+"""发布目录中记录当前版本号的文件，应用脚本据此判断差分包是否适用"""
+
+APPLIER_SCRIPT = "apply_update.ps1"
+APPLIER_BAT = "应用更新.bat"
+MANIFEST_NAME = "delta.json"
+FORMAT_VERSION = 1
+DELTA_ATTEMPTS = 3
+"""上一个发布目录在读取中被替换时，生成差分包的最多尝试次数"""
+
+
+def prepare_release_dir(target_dir: Path, version: str):
+    """在发布目录中写入版本标记和差分包应用脚本。"""
+    (target_dir / MARKER_NAME).write_text(version, encoding="utf-8")
+    here = Path(__file__).parent
+    # PowerShell 5 需要 BOM 才能正确读取 UTF-8 脚本中的中文
+    script = (here / APPLIER_SCRIPT).read_text(encoding="utf-8")
+    (target_dir / APPLIER_SCRIPT).write_text(
+        script, encoding="utf-8-sig", newline="\r\n"
+    )
+    bat = (here / "apply_update.bat").read_text(encoding="utf-8")
+    (target_dir / APPLIER_BAT).write_text(bat, encoding="utf-8-sig", newline="\r\n")
+
+
+def _version_key(version: str) -> Optional[Tuple[int, ...]]:
+    try:
+        return tuple(map(int, version.rstrip("b").split(".")))
+    except ValueError:
+        return None
+
+
+def find_previous_release(
+    target_dir: Path, version: str
+) -> Optional[Tuple[Path, str]]:
+    """
+    releases 中版本号低于 version 的最新发布目录及其版本号。
+    只在同一通道内比较（beta 版本只以 beta 版本为基础，正式版本同理）。
+    """
+    prefix = f"{config.APP_NAME}-"
+    current = _version_key(version)
+    if current is None:
+        return None
+    beta = version.endswith("b")
+    candidates = []
+    for d in config.RELEASE_DIR.iterdir():
+        if not d.is_dir() or not d.name.startswith(prefix) or d == target_dir:
+            continue
+        other = d.name[len(prefix) :]
+        key = _version_key(other)
+        if key is not None and key < current and other.endswith("b") == beta:
+            candidates.append((key, d, other))
+    if not candidates:
+        return None
+    _, latest, other = max(candidates)
+    return latest, other
+
+
+def _list_files(root: Path) -> Dict[str, Path]:
+    return {
+        p.relative_to(root).as_posix(): p
+        for p in root.rglob("*")
+        if p.is_file() and p.name != MARKER_NAME
+    }
+
+
+def diff_dirs(old_dir: Path, new_dir: Path) -> Tuple[List[dict], List[dict]]:
+    """
+    比较两个发布目录。
+    返回: (变化或新增的文件 [{path, sha256, base_sha256}], 删除的文件 [{path, base_sha256}])
+    """
+    old = _list_files(old_dir)
+    new = _list_files(new_dir)
+    changed = []
+    for rel, path in sorted(new.items()):
+        base = old.get(rel)
+        # 发布仓库中相同内容的文件是同一个硬链接，不必计算哈希
+        if base is not None and os.path.samefile(base, path):
+            continue
+        digest = sha256_file(path)
+        base_digest = sha256_file(base) if base is not None else None
+        if digest == base_digest:
+            continue
+        changed.append({"path": rel, "sha256": digest, "base_sha256": base_digest})
+    deleted = [
+        {"path": rel, "base_sha256": sha256_file(path)}
+        for rel, path in sorted(old.items())
+        if rel not in new
+    ]
+    return changed, deleted
+
+
+def make_delta(target_dir: Path, version: str) -> Optional[Path]:
+    """生成相对上一个发布目录的差分包，没有上一个版本时返回 None。"""
+    # 与清理旧版本互斥，避免读取中的上一个版本目录被其他构建删除
+    with FileLock(config.CACHE_DIR / "releases.lock"):
+        for attempt in range(DELTA_ATTEMPTS):
+            try:
+                return _make_delta(target_dir, version)
+            except FileNotFoundError:
+                # 上一个版本目录正被其他构建替换（见 workspace.promote），重新查找
+                if attempt == DELTA_ATTEMPTS - 1:
+                    raise
+                logging.info("警告: 上一个发布目录在读取时被替换，重新生成差分包。")
+
+
+def _make_delta(target_dir: Path, version: str) -> Optional[Path]:
+    previous = find_previous_release(target_dir, version)
+    if previous is None:
+        logging.info("没有上一个发布目录，跳过差分包。")
+        return None
+    old_dir, old_version = previous
+    logging.info(f"生成差分包: {old_version} -> {version} ...")
+
+    changed, deleted = diff_dirs(old_dir, target_dir)
+    manifest = {
+        "format": FORMAT_VERSION,
+        "app": config.APP_NAME,
+        "from": old_version,
+        "to": version,
+        "changed": changed,
+        "deleted": deleted,
+    }
+    delta_path = (
+        config.RELEASE_DIR / f"{config.PROJECT_NAME}_delta_{old_version}_to_{version}.zip"
+    )
+    tmp_path = delta_path.with_name(delta_path.name + ".tmp")
+    policy = compress_policy.load_policy(config.ZIP_LEVEL)
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(
+            MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=1)
+        )
+        for item in changed:
+            file = target_dir / item["path"]
+            compress_type, level, _ = policy.decide(file, item["path"])
+            zip_tools.write_raw(
+                zf,
+                *zip_tools.compress_file(
+                    file, f"files/{item['path']}", level, compress_type
+                ),
+            )
+        # 附带应用脚本，旧版本目录中还没有脚本时也能使用
+        for name in (APPLIER_SCRIPT, APPLIER_BAT):
+            if (target_dir / name).exists():
+                zf.write(target_dir / name, name)
+    os.replace(tmp_path, delta_path)
+
+    size = delta_path.stat().st_size
+    logging.info(
+        f"已创建差分包: {delta_path.name} ({size / 1024 / 1024:.2f} MB)，"
+        f"更新 {len(changed)} 个文件，删除 {len(deleted)} 个文件。"
+    )
+    return delta_path
@@ -0,0 +1,80 @@
+"""
+进程间的排他文件锁。
+
+POSIX 使用 fcntl.flock，Windows 使用 msvcrt.locking；锁随文件句柄关闭（包括进程退出）自动释放，
+因此构建进程崩溃后不会留下需要手动删除的锁。
+"""
+
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class FileLock:
+    """
+    with FileLock(path): ...
+    timeout 为 None 时一直等待；获取失败时 acquire 返回 False，with 语句抛出 TimeoutError。
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, path: Path, timeout: Optional[float] = None):
+        self.path = path
+        self.timeout = timeout
+        self.fd: Optional[int] = None
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+    def acquire(self, blocking: bool = True) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        waited = False
+        while not self._try_lock(fd):
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                os.close(fd)
+                return False
+            if not waited:
+                logging.info(f"等待其他构建释放 {self.path.name} ...")
+                waited = True
+            time.sleep(self.POLL_INTERVAL)
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is None:
+            return
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            # POSIX 下关闭句柄即释放 flock
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self) -> "FileLock":
+        if not self.acquire():
+            raise TimeoutError(f"等待文件锁 {self.path} 超时")
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
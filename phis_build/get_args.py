@@ -1,12 +1,17 @@
 import argparse
 from functools import lru_cache as cache
 
-from .args import Args, BuildType
+from typing import TYPE_CHECKING
+
+from .build_type import BuildType
+
+if TYPE_CHECKING:
+    from .args import Args
 
 
 @cache
-def get_args() -> Args:
-    """使用 argparse 解析命令行参数并返回一个 Args pydantic 模型实例。"""
+def get_args() -> "Args":
+    """使用 argparse 解析命令行参数并返回一个 Args 实例。"""
     parser = argparse.ArgumentParser(description="PHIS 自定义构建系统。")
 
     parser.add_argument(
@@ -27,12 +32,99 @@ def get_args() -> Args:
         help="执行beta构建，将产物复制到本地Windows目录并附加'b'到版本号。",
     )
 
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="与 --copy 一起使用：压缩发布包的同时上传到目标目录。",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="忽略构建缓存，强制重新打包。",
+    )
+
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="不复用 PyInstaller 的工作目录和分析缓存，完整重新构建。",
+    )
+    parser.add_argument(
+        "--zip-workers",
+        type=int,
+        default=None,
+        help="压缩发布包的线程数，默认使用 CPU 核数。",
+    )
+    parser.add_argument(
+        "--zip-level",
+        type=int,
+        choices=range(0, 10),
+        default=None,
+        help="发布包的压缩级别 (0-9)，默认读取 phis_build.toml 中的 [zip] level。",
+    )
+    parser.add_argument(
+        "--onedir",
+        action="store_true",
+        help="与 --build exe 一起使用：输出为目录 (onedir) 而不是单个 exe，启动更快。默认读取 [exe] mode。",
+    )
+    parser.add_argument(
+        "--bench-launch",
+        action="store_true",
+        help="测量程序的冷启动和热启动时间；与 --build 一起使用时测量本次构建的结果，否则测量最新的发布目录。",
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        type=int,
+        const=20,
+        default=None,
+        metavar="N",
+        help="输出最近 N 次 (默认 20) 构建的步骤耗时、产物大小等指标及其趋势，不构建。",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="常驻运行，源码变化时增量重新构建 app.pyz 并刷新 releases/temp。",
+    )
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help="只分析导入图，列出不可达的模块及其大小，不构建。--build exe 时从 spec 入口分析。",
+    )
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        const=".",
+        default=None,
+        metavar="ROOT",
+        help="与 --build 一起使用：并行构建 ROOT (默认当前目录) 下所有包含 phis_build.toml 的项目。",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="批量构建时同时构建的项目数，默认为 CPU 核数的一半。",
+    )
+
     parsed_args = parser.parse_args()
 
-    # 从解析的参数创建 Args 模型实例
+    from .args import Args
+
+    # 从解析的参数创建 Args 实例
     args_model = Args(
         build=BuildType(parsed_args.build) if parsed_args.build else None,
         copy_=parsed_args.copy,
         beta=parsed_args.beta,
+        pipeline=parsed_args.pipeline,
+        no_cache=parsed_args.no_cache,
+        clean=parsed_args.clean,
+        zip_workers=parsed_args.zip_workers,
+        zip_level=parsed_args.zip_level,
+        onedir=parsed_args.onedir,
+        bench_launch=parsed_args.bench_launch,
+        stats=parsed_args.stats,
+        watch=parsed_args.watch,
+        analyze=parsed_args.analyze,
+        batch=parsed_args.batch,
+        jobs=parsed_args.jobs,
     )
     return args_model
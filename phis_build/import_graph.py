@@ -0,0 +1,290 @@
+"""
+项目内模块的静态导入图。
+
+从入口脚本（pyz 的 __main__.py 或 spec 中的入口脚本）出发，按 import 语句找出
+可达的本地模块，其余模块视为不可达：pyz 构建时可以不打包，exe 构建时可以写入
+PyInstaller 的 excludes。
+
+只分析字面量形式的导入（import / from ... import / importlib.import_module("...")），
+通过字符串拼接等方式动态导入的模块需要写入 [shake] keep。
+"""
+
+import ast
+import fnmatch
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import config
+
+SKIP_DIRS = {
+    ".git",
+    ".venv",
+    "venv",
+    "__pycache__",
+    ".phis_cache",
+    "releases",
+    "build",
+    "dist",
+}
+
+
+def module_name(arcname: str) -> str:
+    """归档内路径转为模块名: app/sub/__init__.py -> app.sub，helper.py -> helper。"""
+    parts = arcname[: -len(".py")].split("/")
+    if parts[-1] == "__init__" and len(parts) > 1:
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _is_package(arcname: str) -> bool:
+    return arcname.endswith("/__init__.py")
+
+
+def find_imports(source: bytes, module: str, is_package: bool) -> Set[str]:
+    """返回模块源码中以字面量形式导入的全部模块名（含可能是子模块的名字）。"""
+    tree = ast.parse(source)
+    package = module if is_package else module.rpartition(".")[0]
+    found: Set[str] = set()
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package.split(".") if package else []
+                if node.level > 1:
+                    base_parts = base_parts[: -(node.level - 1)]
+                target = ".".join(base_parts + ([node.module] if node.module else []))
+            else:
+                target = node.module or ""
+            if target:
+                found.add(target)
+            for alias in node.names:
+                # from pkg import name 中的 name 可能是子模块
+                found.add(f"{target}.{alias.name}" if target else alias.name)
+        elif isinstance(node, ast.Call):
+            func = node.func
+            name = None
+            if isinstance(func, ast.Attribute):
+                name = func.attr
+            elif isinstance(func, ast.Name):
+                name = func.id
+            if (
+                name in ("import_module", "__import__")
+                and node.args
+                and isinstance(node.args[0], ast.Constant)
+                and isinstance(node.args[0].value, str)
+            ):
+                found.add(node.args[0].value)
+    return found
+
+
+class ImportGraph:
+    """一组本地模块 {模块名: 源文件} 及其可达性分析。"""
+
+    def __init__(self, modules: Dict[str, Path], packages: Set[str]):
+        self.modules = modules
+        self.packages = packages
+        self.edges: Dict[str, Set[str]] = {}
+        for name, path in modules.items():
+            try:
+                imported = find_imports(path.read_bytes(), name, name in packages)
+            except (SyntaxError, ValueError) as e:
+                logging.warning(f"警告: 无法解析 {path}，按无导入处理: {e}")
+                imported = set()
+            self.edges[name] = self._resolve(imported)
+
+    def _resolve(self, names: Iterable[str]) -> Set[str]:
+        """只保留本地模块；导入 a.b.c 同时会执行 a 和 a.b 的 __init__。"""
+        resolved = set()
+        for name in names:
+            parts = name.split(".")
+            for i in range(1, len(parts) + 1):
+                prefix = ".".join(parts[:i])
+                if prefix in self.modules:
+                    resolved.add(prefix)
+        return resolved
+
+    def reachable(self, roots: Iterable[str], keep: Iterable[str] = ()) -> Set[str]:
+        keep = list(keep)
+        start = [m for m in roots if m in self.modules] + [
+            m for m in self.modules if any(fnmatch.fnmatch(m, p) for p in keep)
+        ]
+        seen: Set[str] = set()
+        stack = list(start)
+        while stack:
+            name = stack.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            stack.extend(self.edges.get(name, ()))
+            # 模块所在的包也会被导入
+            parent = name.rpartition(".")[0]
+            if parent in self.modules:
+                stack.append(parent)
+        return seen
+
+    def unreachable(self, roots: Iterable[str], keep: Iterable[str] = ()) -> List[str]:
+        seen = self.reachable(roots, keep)
+        return sorted(m for m in self.modules if m not in seen)
+
+    def report(self, unreachable: List[str], limit: int = 30) -> str:
+        """不可达模块及其大小，按大小降序。"""
+        sizes = sorted(
+            ((self.modules[m].stat().st_size, m) for m in unreachable), reverse=True
+        )
+        total = sum(size for size, _ in sizes)
+        rows = [
+            f"共 {len(self.modules)} 个本地模块，不可达 {len(unreachable)} 个"
+            f" ({total / 1024:.1f} KB):"
+        ]
+        for size, name in sizes[:limit]:
+            rows.append(f"  {size / 1024:8.1f} KB  {name}")
+        if len(sizes) > limit:
+            rows.append(f"  ... 另有 {len(sizes) - limit} 个")
+        return "\n".join(rows)
+
+
+def graph_for_entries(entries: List[Tuple[str, Path]]) -> ImportGraph:
+    """由 pyz 的打包条目构建导入图。"""
+    modules = {}
+    packages = set()
+    for arcname, path in entries:
+        if arcname.endswith(".py"):
+            name = module_name(arcname)
+            modules[name] = path
+            if _is_package(arcname):
+                packages.add(name)
+    return ImportGraph(modules, packages)
+
+
+def shake_entries(entries: List[Tuple[str, Path]]) -> List[Tuple[str, Path]]:
+    """去掉从 __main__.py 不可达的模块，非 .py 文件保持不变。"""
+    graph = graph_for_entries(entries)
+    unreachable = set(graph.unreachable(["__main__"], config.SHAKE_KEEP))
+    if unreachable:
+        logging.info("pyz 不打包不可达的模块，" + graph.report(sorted(unreachable)))
+    return [
+        (arcname, path)
+        for arcname, path in entries
+        if not (arcname.endswith(".py") and module_name(arcname) in unreachable)
+    ]
+
+
+def _find_analysis(tree: ast.AST) -> Optional[ast.Call]:
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id == "Analysis"
+        ):
+            return node
+    return None
+
+
+def spec_entry_script(spec_file: Path) -> Optional[Path]:
+    """读取 spec 中 Analysis 的第一个入口脚本（相对路径以 spec 所在目录为准）。"""
+    call = _find_analysis(ast.parse(spec_file.read_bytes()))
+    if not call or not call.args or not isinstance(call.args[0], ast.List):
+        return None
+    first = call.args[0].elts[0] if call.args[0].elts else None
+    if not isinstance(first, ast.Constant) or not isinstance(first.value, str):
+        return None
+    return spec_file.parent / first.value
+
+
+def local_modules(root: Path) -> ImportGraph:
+    """项目根目录下的本地模块：顶层 py 文件和带 __init__.py 的包。"""
+    modules = {}
+    packages = set()
+
+    def add_package(directory: Path, prefix: str):
+        packages.add(prefix)
+        modules[prefix] = directory / "__init__.py"
+        for p in sorted(directory.iterdir()):
+            if p.is_dir() and p.name not in SKIP_DIRS and (p / "__init__.py").exists():
+                add_package(p, f"{prefix}.{p.name}")
+            elif p.suffix == ".py" and p.name != "__init__.py":
+                modules[f"{prefix}.{p.stem}"] = p
+
+    for p in sorted(root.iterdir()):
+        if p.is_dir() and p.name not in SKIP_DIRS and (p / "__init__.py").exists():
+            add_package(p, p.name)
+        elif p.suffix == ".py" and p.stem != "__main__":
+            # __main__ 是 pyz 的入口，不能写入 excludes
+            modules[p.stem] = p
+    return ImportGraph(modules, packages)
+
+
+def exe_excludes() -> Tuple[List[str], Optional[ImportGraph], List[str]]:
+    """
+    计算 exe 构建的 excludes: 从 spec 入口不可达的本地模块加上 [shake] excludes。
+    返回: (excludes, 导入图, 不可达模块)
+    """
+    entry = spec_entry_script(config.SPEC_FILE)
+    if entry is None or not entry.exists():
+        logging.warning(
+            f"警告: 无法从 {config.SPEC_FILE.name} 确定入口脚本，只使用 [shake] excludes。"
+        )
+        return list(config.SHAKE_EXCLUDES), None, []
+    graph = local_modules(config.PROJECT_ROOT)
+    unreachable = graph.unreachable([entry.stem], config.SHAKE_KEEP)
+    return sorted(set(unreachable) | set(config.SHAKE_EXCLUDES)), graph, unreachable
+
+
+def write_shaken_spec(excludes: List[str]) -> Path:
+    """
+    生成把 excludes 合并进 Analysis(excludes=...) 的 spec 副本，返回其路径。
+    副本放在原 spec 旁边，spec 中的相对路径仍然有效。
+    """
+    source = config.SPEC_FILE.read_text(encoding="utf-8")
+    call = _find_analysis(ast.parse(source))
+    if call is None:
+        raise ValueError(f"{config.SPEC_FILE.name} 中没有 Analysis(...)")
+
+    lines = source.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line.encode("utf-8")))
+    data = source.encode("utf-8")
+
+    def pos(lineno: int, col: int) -> int:
+        return offsets[lineno - 1] + col
+
+    keyword = next((k for k in call.keywords if k.arg == "excludes"), None)
+    if keyword is not None:
+        try:
+            existing = list(ast.literal_eval(keyword.value))
+        except ValueError:
+            raise ValueError(f"{config.SPEC_FILE.name} 中的 excludes 不是字面量列表") from None
+        merged = sorted(set(existing) | set(excludes))
+        start = pos(keyword.value.lineno, keyword.value.col_offset)
+        end = pos(keyword.value.end_lineno, keyword.value.end_col_offset)
+        data = data[:start] + repr(merged).encode("utf-8") + data[end:]
+    else:
+        last = (call.args + [k.value for k in call.keywords])[-1]
+        end = pos(last.end_lineno, last.end_col_offset)
+        data = data[:end] + f", excludes={sorted(excludes)!r}".encode("utf-8") + data[end:]
+
+    shaken = config.SPEC_FILE.with_name(f"{config.SPEC_FILE.stem}.shaken.spec")
+    header = f"# 由 phis_build 根据 {config.SPEC_FILE.name} 生成，请勿手动修改\n"
+    shaken.write_bytes(header.encode("utf-8") + data)
+    return shaken
+
+
+def analyze(use_spec: bool) -> str:
+    """生成不可达模块报告；use_spec 时从 spec 入口分析，否则从 pyz 的 __main__.py。"""
+    if use_spec:
+        excludes, graph, unreachable = exe_excludes()
+        if graph is None:
+            return "无法确定 spec 的入口脚本。"
+        text = graph.report(unreachable)
+        if excludes:
+            text += f"\n生成的 PyInstaller excludes: {excludes}"
+        return text
+
+    from .build_zipapp import get_entries
+
+    graph = graph_for_entries(get_entries())
+    return graph.report(graph.unreachable(["__main__"], config.SHAKE_KEEP))
@@ -0,0 +1,140 @@
+"""
+测量发布目录中程序的启动时间，用于比较 onefile、onedir 和 pyz。
+
+每次运行以 [launch] args（默认 --help）启动程序并等待其退出。工作目录为临时目录，
+程序运行时写出的文件不会混入发布目录。
+冷启动: 第一次运行前把程序文件从系统文件缓存中移除（Linux 上用 posix_fadvise；
+Windows 上普通权限无法清除缓存，冷启动即第一次运行，刚构建的文件通常仍在缓存中）。
+热启动: 之后连续运行 [launch] runs 次，取中位数。
+onefile 每次启动都会解压到临时目录，因此它的热启动也比 onedir 慢得多。
+
+各输出方式最近一次的结果保存在缓存 launch_bench 中，日志中一起列出以便对比。
+"""
+
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from . import cache, config
+
+
+def detect_artifact(release_dir: Path) -> Optional[Tuple[str, List[str], List[Path]]]:
+    """
+    识别发布目录中的程序。
+    返回: (输出方式 onefile/onedir/pyz, 启动命令, 冷启动前要移出缓存的文件)
+    """
+    exes = sorted(release_dir.glob(f"{config.PROJECT_NAME}_v*.exe"))
+    if exes:
+        internal = release_dir / "_internal"
+        if internal.is_dir():
+            files = [exes[0]] + [p for p in internal.rglob("*") if p.is_file()]
+            return "onedir", [str(exes[0])], files
+        return "onefile", [str(exes[0])], [exes[0]]
+    pyz = release_dir / "app.pyz"
+    if pyz.exists():
+        return "pyz", [sys.executable, str(pyz)], [pyz]
+    return None
+
+
+def _evict(files: List[Path]) -> bool:
+    """尽量把文件从系统文件缓存中移除，不支持时返回 False。"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in files:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            # 脏页不会被丢弃，先写回
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def _launch(command: List[str], cwd: Path) -> float:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        command + list(config.LAUNCH_ARGS),
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        timeout=config.LAUNCH_TIMEOUT,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        logging.warning(f"警告: 启动测量中程序的退出码为 {proc.returncode}")
+    return elapsed
+
+
+def measure(release_dir: Path, runs: Optional[int] = None) -> Optional[dict]:
+    """测量 release_dir 中程序的冷启动和热启动时间，并与其他输出方式的上次结果对比。"""
+    runs = config.LAUNCH_RUNS if runs is None else runs
+    artifact = detect_artifact(release_dir)
+    if artifact is None:
+        logging.error(f"错误: {release_dir} 中没有可测量的程序 (exe 或 app.pyz)。")
+        return None
+    mode, command, files = artifact
+    logging.info(f"测量 {release_dir.name} 的启动时间 ({mode}，热启动 {runs} 次) ...")
+
+    evicted = _evict(files)
+    try:
+        with tempfile.TemporaryDirectory(prefix="phis_launch_") as cwd:
+            cold = _launch(command, Path(cwd))
+            warm = [_launch(command, Path(cwd)) for _ in range(runs)]
+    except subprocess.TimeoutExpired:
+        logging.error(
+            f"错误: 程序在 {config.LAUNCH_TIMEOUT} 秒内没有退出，请检查 [launch] args。"
+        )
+        return None
+    result = {
+        "version": release_dir.name,
+        "cold": round(cold, 3),
+        "cold_evicted": evicted,
+        "warm_median": round(statistics.median(warm), 3) if warm else None,
+        "warm_min": round(min(warm), 3) if warm else None,
+        "size": sum(p.stat().st_size for p in files),
+    }
+
+    history = cache.load_entry("launch_bench") or {}
+    history[mode] = result
+    cache.save_entry("launch_bench", history)
+    logging.info("启动时间:\n" + report(history, current=mode))
+    return result
+
+
+def report(history: dict, current: Optional[str] = None) -> str:
+    rows = [
+        f"{'方式':<10}{'版本':<26}{'冷启动(s)':>10}{'热启动中位数(s)':>16}{'程序大小(MB)':>14}"
+    ]
+    for mode in ("onefile", "onedir", "pyz"):
+        r = history.get(mode)
+        if not r:
+            continue
+        mark = " *" if mode == current else ""
+        cold = f"{r['cold']:.3f}" + ("" if r["cold_evicted"] else "~")
+        warm = f"{r['warm_median']:.3f}" if r["warm_median"] is not None else "-"
+        rows.append(
+            f"{mode + mark:<10}{r['version']:<26}{cold:>10}{warm:>16}"
+            f"{r['size'] / 1024 / 1024:>14.1f}"
+        )
+    rows.append("(* 本次测量；~ 表示冷启动前未能清除文件缓存)")
+    return "\n".join(rows)
+
+
+def latest_release_dir() -> Optional[Path]:
+    if not config.RELEASE_DIR.exists():
+        return None
+    prefix = f"{config.APP_NAME}-"
+    dirs = [
+        d
+        for d in config.RELEASE_DIR.iterdir()
+        if d.is_dir() and d.name.startswith(prefix)
+    ]
+    return max(dirs, key=lambda d: d.stat().st_mtime) if dirs else None
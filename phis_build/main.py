@@ -1,11 +1,15 @@
 import logging
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-from . import build_steps, build_zipapp, config
-from .args import Args, BuildType
+from . import config, tracing
+from .build_type import BuildType
 from .get_args import get_args
-from .version import read_and_update_version
+
+if TYPE_CHECKING:
+    from .args import Args
+    from .share_probe import ShareProbe
 
 try:
     from phis_logging.logging_config import setup_logging
@@ -13,48 +17,149 @@ except ImportError:
     from .logging_config import setup_logging
 
 
-def run_full_build(args: Args):
-    """执行完整的构建、打包和复制流程。"""
+def _resolve_destination(
+    args: "Args", action: str, probe: Optional["ShareProbe"] = None
+) -> Optional[Path]:
+    """
+    确定复制目标目录：beta 为本地 Windows 目录，否则为第一个可用的共享路径。
+    probe 为提前在后台开始的共享路径检测，没有时现在开始检测。
+    """
+    from . import share_probe
+
+    destination = None
+    if args.beta:
+        destination = Path.home() / "Windows"
+        logging.info(f"Beta {action}: 目标目录为 {destination}")
+    else:
+        with tracing.step("share_probe"):
+            probe = probe or share_probe.start(use_cache=not args.no_cache)
+            destination = probe.result()
+        if destination:
+            logging.info(f"Release {action}: 目标目录为 {destination}")
+    return destination
+
+
+def _tree_size(directory: Path) -> int:
+    return sum(p.stat().st_size for p in directory.rglob("*") if p.is_file())
+
+
+def finish_run(args: "Args", ok: bool):
+    """写出追踪结果；完整构建还会记录构建指标并检查回归，见 metrics。"""
+    # 只有执行过步骤（配置已加载）时才写出追踪结果
+    if not tracing.tracer.spans:
+        return
+    tracing.tracer.finish(config.BUILD_DIR / "phis_build_trace.json")
+    if args.build:
+        from . import metrics
+
+        metrics.record_and_check(tracing.tracer, args.build.value, ok)
+
+
+def _exe_mode(args: "Args") -> str:
+    """exe 构建的输出方式: --onedir 优先，否则读取 [exe] mode。"""
+    if args.onedir:
+        return "onedir"
+    if config.EXE_MODE not in ("onefile", "onedir"):
+        logging.warning(f"未知的 exe 输出方式 {config.EXE_MODE!r}，改为 onefile。")
+        return "onefile"
+    return config.EXE_MODE
+
+
+def run_full_build(args: "Args"):
+    """
+    执行完整的构建、打包和复制流程。
+    每次构建在独立的工作区中进行，同一项目的多个构建可以同时运行。
+    """
+    from . import workspace
+
     logging.info("开始完整构建流程...")
-    build_steps.clean_temp_dir()
     config.RELEASE_DIR.mkdir(parents=True, exist_ok=True)
+    with tracing.step("workspace"):
+        ws = workspace.create()
+    with ws:
+        _build_in_workspace(args)
+
+
+def _build_in_workspace(args: "Args"):
+    from . import build_steps, build_zipapp, delta, share_probe
+    from .version import read_and_update_version
 
-    version = read_and_update_version(beta=args.beta)
+    # 共享路径检测在后台进行，耗时被构建过程掩盖
+    probe = (
+        share_probe.start(use_cache=not args.no_cache)
+        if args.copy_ and not args.beta
+        else None
+    )
+    with tracing.step("version"):
+        version = read_and_update_version(beta=args.beta)
+        tracing.annotate(version=version)
 
+    # 打包在工作区的 build/ 中进行，只在读取和替换共用的 build/ 缓存时短暂加锁
     if args.build == BuildType.PYZ:
         logging.info("使用 zipapp 进行打包...")
-        build_zipapp.make_package()
-        build_steps.rename_pyz(version)
+        with tracing.step("zipapp"):
+            build_zipapp.make_package(use_cache=not args.no_cache)
+            build_steps.rename_pyz(version)
+            tracing.annotate(artifact_bytes=_tree_size(config.TEMP_DIR))
     else:  # 默认为 BuildType.EXE
-        build_steps.build()
-        build_steps.rename_executable(version)
+        mode = _exe_mode(args)
+        with tracing.step("pyinstaller"):
+            tracing.annotate(mode=mode)
+            build_steps.build(force_clean=args.clean or args.no_cache, mode=mode)
+            build_steps.rename_executable(version, mode=mode)
+            tracing.annotate(artifact_bytes=_tree_size(config.TEMP_DIR))
+
+    with tracing.step("copy_dirs"):
+        build_steps.copy_dirs(use_pyz=(args.build == BuildType.PYZ))
+    with tracing.step("copy_to_release_dir"):
+        target_dir = build_steps.copy_to_release_dir(version)
+
+    if args.bench_launch:
+        from . import launch_bench
+
+        with tracing.step("bench_launch"):
+            launch_bench.measure(target_dir)
+
+    # 流水线模式下先确定目标目录，压缩的同时上传
+    pipeline = args.copy_ and (args.pipeline or config.COPY_PIPELINE)
+    destination = _resolve_destination(args, "build", probe) if pipeline else None
+    with tracing.step("make_zip"):
+        zip_path = build_steps.make_zip(
+            target_dir,
+            version,
+            workers=args.zip_workers,
+            level=args.zip_level,
+            share_path=destination,
+        )
 
-    build_steps.copy_dirs(use_pyz=(args.build == BuildType.PYZ))
-    target_dir = build_steps.copy_to_release_dir(version)
-    zip_path = build_steps.make_zip(target_dir, version)
+    delta_path = None
+    if config.DELTA_ENABLED:
+        with tracing.step("delta"):
+            delta_path = delta.make_delta(target_dir, version)
 
     if args.copy_:
-        destination = None
-        if args.beta:
-            destination = Path.home() / "Windows"
-            logging.info(f"Beta build: 目标目录为 {destination}")
-        else:
-            destination = build_steps.get_available_share_path()
-            if destination:
-                logging.info(f"Release build: 目标目录为 {destination}")
+        if not pipeline:
+            destination = _resolve_destination(args, "build", probe)
 
         if destination:
             destination.mkdir(parents=True, exist_ok=True)
-            build_steps.copy_to_share(zip_path, destination)
+            # 流水线上传成功时这里只做一次哈希比对
+            with tracing.step("upload"):
+                build_steps.copy_to_share(zip_path, destination)
+                if delta_path:
+                    build_steps.copy_to_share(delta_path, destination)
         else:
             logging.warning("未找到可用的复制目标目录，跳过复制步骤。")
 
-    build_steps.clean_old_releases(keep=2)
+    with tracing.step("cleanup"):
+        build_steps.clean_old_releases()
     logging.info("\n构建完成！")
 
 
-def run_copy_only(args: Args):
+def run_copy_only(args: "Args"):
     """仅执行将最新构建产物复制到目标位置的操作。"""
+    from . import build_steps
+
     logging.info("仅执行复制操作...")
     try:
         # 总是处理 .zip 文件，因为这是标准的构建产物
@@ -68,18 +173,12 @@ def run_copy_only(args: Args):
         latest_item = max(release_items, key=lambda p: p.stat().st_mtime)
         logging.info(f"找到最新的构建产物: {latest_item.name}")
 
-        destination = None
-        if args.beta:
-            destination = Path.home() / "Windows"
-            logging.info(f"Beta copy: 目标目录为 {destination}")
-        else:
-            destination = build_steps.get_available_share_path()
-            if destination:
-                logging.info(f"Release copy: 目标目录为 {destination}")
+        destination = _resolve_destination(args, "copy")
 
         if destination:
             destination.mkdir(parents=True, exist_ok=True)
-            build_steps.copy_to_share(latest_item, destination)
+            with tracing.step("upload"):
+                build_steps.copy_to_share(latest_item, destination)
         else:
             logging.error("错误: 所有目标路径均不可用，无法执行复制操作。")
             sys.exit(1)
@@ -94,15 +193,66 @@ def main():
     setup_logging()
     args = get_args()
 
-    if args.build:
-        run_full_build(args)
-    elif args.copy_:
-        run_copy_only(args)
-        build_steps.clean_old_releases()
-    else:
-        logging.warning(
-            "没有指定任何操作 (例如 --build 或 --copy)。请使用 --help 查看可用选项。"
+    if args.watch:
+        if args.build not in (None, BuildType.PYZ):
+            logging.error("错误: --watch 只支持 pyz 构建。")
+            sys.exit(2)
+        from . import watch
+
+        watch.run_watch()
+        return
+
+    if args.analyze:
+        from . import import_graph
+
+        use_spec = args.build == BuildType.EXE or (
+            args.build is None and not (config.PROJECT_ROOT / "__main__.py").exists()
         )
+        if use_spec:
+            config.ensure_spec_file()
+        logging.info(import_graph.analyze(use_spec))
+        return
+
+    if args.stats is not None:
+        from . import metrics
+
+        logging.info(metrics.report(args.stats))
+        return
+
+    if args.bench_launch and not args.build:
+        from . import launch_bench
+
+        release_dir = launch_bench.latest_release_dir()
+        if release_dir is None:
+            logging.error(f"错误: {config.RELEASE_DIR} 中没有发布目录。")
+            sys.exit(1)
+        sys.exit(0 if launch_bench.measure(release_dir) else 1)
+
+    if args.batch is not None:
+        if not args.build:
+            logging.error("错误: --batch 需要与 --build 一起使用。")
+            sys.exit(2)
+        from . import batch
+
+        sys.exit(0 if batch.run_batch(args.batch, args, jobs=args.jobs) else 1)
+
+    ok = False
+    try:
+        if args.build:
+            run_full_build(args)
+        elif args.copy_:
+            from . import build_steps
+
+            run_copy_only(args)
+            with tracing.step("cleanup"):
+                build_steps.clean_old_releases()
+        else:
+            logging.warning(
+                "没有指定任何操作 (例如 --build 或 --copy)。请使用 --help 查看可用选项。"
+            )
+        ok = True
+    finally:
+        finish_run(args, ok)
 
 
 if __name__ == "__main__":
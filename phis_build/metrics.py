@@ -0,0 +1,281 @@
+"""
+构建指标的历史记录和回归检测。
+
+每次完整构建结束后，把各步骤的耗时、CPU 时间、读写字节数以及步骤补充的数值
+（产物大小、文件数、压缩率、上传速度等，见 tracing.annotate）写入项目下的
+.phis_cache/metrics.sqlite。
+
+成功的构建会与同类构建（exe / pyz）最近 [metrics] window 次成功构建的中位数比较，
+步骤耗时或产物大小变差超过 [metrics] threshold 时在日志中警告。
+phis_build --stats 输出最近的构建和各指标的趋势。
+"""
+
+import logging
+import socket
+import sqlite3
+import statistics
+import time
+from contextlib import closing
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from . import config
+
+if TYPE_CHECKING:
+    from .tracing import Tracer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    version TEXT,
+    build_type TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    wall REAL NOT NULL,
+    host TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    build_id INTEGER NOT NULL REFERENCES builds(id),
+    name TEXT NOT NULL,
+    wall REAL NOT NULL,
+    cpu REAL,
+    read_bytes INTEGER,
+    write_bytes INTEGER,
+    peak_rss INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS build_values (
+    build_id INTEGER NOT NULL REFERENCES builds(id),
+    key TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS steps_build ON steps(build_id);
+CREATE INDEX IF NOT EXISTS values_build ON build_values(build_id);
+"""
+
+WATCHED_VALUES = {
+    "artifact_bytes": 1,
+    "zip_bytes": 1,
+    "ratio": 1,
+    "mb_per_s": -1,
+}
+"""参与回归检测的步骤数值及其方向：1 表示越大越差，-1 表示越小越差"""
+
+MIN_BASELINE = 3
+"""基线至少需要的历史构建数"""
+
+SPARK = "▁▂▃▄▅▆▇█"
+
+
+def connect() -> sqlite3.Connection:
+    config.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # 并行的构建可能同时写入，等待而不是立即报错
+    conn = sqlite3.connect(config.CACHE_DIR / "metrics.sqlite", timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record(tracer: "Tracer", build_type: str, ok: bool) -> Optional[int]:
+    """把本次构建的追踪结果写入历史，返回构建记录的 id。"""
+    version = next(
+        (s.args["version"] for s in tracer.spans if "version" in s.args), None
+    )
+    started = time.time() - (time.perf_counter() - tracer.origin)
+    with closing(connect()) as conn, conn:
+        cur = conn.execute(
+            "INSERT INTO builds (started, version, build_type, ok, wall, host)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                started,
+                version,
+                build_type,
+                int(ok),
+                sum(s.wall for s in tracer.spans),
+                socket.gethostname(),
+            ),
+        )
+        build_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    build_id,
+                    s.name,
+                    s.wall,
+                    s.cpu,
+                    s.read_bytes,
+                    s.write_bytes,
+                    s.peak_rss,
+                    s.error,
+                )
+                for s in tracer.spans
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO build_values VALUES (?, ?, ?)",
+            [
+                (build_id, f"{s.name}.{k}", float(v))
+                for s in tracer.spans
+                for k, v in s.args.items()
+                if isinstance(v, (int, float)) and not isinstance(v, bool)
+            ],
+        )
+    return build_id
+
+
+def _series(
+    conn: sqlite3.Connection, build_type: str, limit: int, before: Optional[int] = None
+) -> Tuple[List[int], Dict[str, Dict[int, float]]]:
+    """
+    最近 limit 次同类成功构建 (id 小于 before) 的各项指标。
+    返回: (构建 id 列表，从旧到新, {指标名: {构建 id: 值}})
+    指标名为 "<步骤>" (耗时)、"<步骤>.<数值>" 和 "total" (总耗时)。
+    """
+    rows = conn.execute(
+        "SELECT id, wall FROM builds WHERE build_type = ? AND ok = 1 AND id < ?"
+        " ORDER BY id DESC LIMIT ?",
+        (build_type, before if before is not None else 2**62, limit),
+    ).fetchall()
+    ids = [r[0] for r in reversed(rows)]
+    series: Dict[str, Dict[int, float]] = {"total": {r[0]: r[1] for r in rows}}
+    if not ids:
+        return ids, series
+    marks = ",".join("?" * len(ids))
+    # 同名步骤在一次构建中出现多次时（例如上传 zip 和差分包）合计
+    for build_id, name, wall in conn.execute(
+        f"SELECT build_id, name, SUM(wall) FROM steps WHERE build_id IN ({marks})"
+        " GROUP BY build_id, name",
+        ids,
+    ):
+        series.setdefault(name, {})[build_id] = wall
+    for build_id, key, value in conn.execute(
+        f"SELECT build_id, key, value FROM build_values WHERE build_id IN ({marks})",
+        ids,
+    ):
+        series.setdefault(key, {})[build_id] = value
+    return ids, series
+
+
+def _direction(key: str) -> int:
+    """指标变差的方向；0 表示不参与回归检测。"""
+    if "." not in key:
+        return 1
+    return WATCHED_VALUES.get(key.rpartition(".")[2], 0)
+
+
+def find_regressions(build_id: int, build_type: str) -> List[str]:
+    """与滚动基线（之前 window 次成功构建的中位数）比较，返回变差超过阈值的指标说明。"""
+    with closing(connect()) as conn:
+        _, current = _series(conn, build_type, 1, before=build_id + 1)
+        ids, history = _series(conn, build_type, config.METRICS_WINDOW, before=build_id)
+
+    regressions = []
+    for key, values in current.items():
+        direction = _direction(key)
+        if not direction or build_id not in values:
+            continue
+        baseline_values = list(history.get(key, {}).values())
+        if len(baseline_values) < MIN_BASELINE:
+            continue
+        value = values[build_id]
+        baseline = statistics.median(baseline_values)
+        # 很短的步骤波动太大，不参与比较
+        if "." not in key and baseline < config.METRICS_MIN_SECONDS:
+            continue
+        if baseline <= 0:
+            continue
+        change = (value - baseline) / baseline * direction
+        if change > config.METRICS_THRESHOLD:
+            regressions.append(
+                f"{key}: {_fmt(key, value)}，基线 {_fmt(key, baseline)}"
+                f" ({(value - baseline) / baseline:+.0%}，基于 {len(baseline_values)} 次构建)"
+            )
+    return regressions
+
+
+def record_and_check(tracer: "Tracer", build_type: str, ok: bool):
+    """记录本次构建；成功时检查回归并在日志中警告。记录失败不影响构建结果。"""
+    if not config.METRICS_ENABLED:
+        return
+    try:
+        build_id = record(tracer, build_type, ok)
+        if not ok or build_id is None:
+            return
+        regressions = find_regressions(build_id, build_type)
+    except (sqlite3.Error, OSError) as e:
+        # 在 finally 中调用，异常不能掩盖构建本身的错误
+        logging.warning(f"警告: 写入构建指标失败: {e}")
+        return
+    if regressions:
+        logging.warning(
+            f"构建指标相对最近的构建变差超过 {config.METRICS_THRESHOLD:.0%}:\n  "
+            + "\n  ".join(regressions)
+        )
+
+
+def _fmt(key: str, value: float) -> str:
+    name = key.rpartition(".")[2]
+    if name.endswith("_bytes"):
+        if value < 1024 * 1024:
+            return f"{value / 1024:.1f} KB"
+        return f"{value / 1024 / 1024:.2f} MB"
+    if name == "ratio":
+        return f"{value:.1%}"
+    if name == "mb_per_s":
+        return f"{value:.1f} MB/s"
+    if "." in key:
+        return f"{value:g}"
+    return f"{value:.2f}s"
+
+
+def _sparkline(values: List[Optional[float]]) -> str:
+    present = [v for v in values if v is not None]
+    if not present:
+        return ""
+    low, high = min(present), max(present)
+    span = (high - low) or 1.0
+    return "".join(
+        " " if v is None else SPARK[int((v - low) / span * (len(SPARK) - 1))]
+        for v in values
+    )
+
+
+def report(limit: int = 20) -> str:
+    """最近 limit 次构建的列表和各指标的趋势（每种构建类型分别统计）。"""
+    with closing(connect()) as conn:
+        builds = conn.execute(
+            "SELECT id, started, version, build_type, ok, wall FROM builds"
+            " ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        if not builds:
+            return "还没有构建记录。"
+        types = sorted({b[3] for b in builds})
+        trends = {t: _series(conn, t, limit) for t in types}
+
+    rows = [f"最近 {len(builds)} 次构建:"]
+    rows.append(f"  {'时间':<18}{'类型':<6}{'版本':<18}{'结果':<6}{'耗时(s)':>9}")
+    for _, started, version, build_type, ok, wall in reversed(builds):
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(started))
+        rows.append(
+            f"  {when:<18}{build_type:<6}{version or '-':<18}"
+            f"{'成功' if ok else '失败':<6}{wall:>9.2f}"
+        )
+
+    for build_type, (ids, series) in trends.items():
+        if not ids:
+            continue
+        rows.append(f"\n{build_type} 构建的趋势（最近 {len(ids)} 次成功构建，从旧到新）:")
+        rows.append(f"  {'指标':<34}{'最近':>12}{'中位数':>12}  趋势")
+        keys = ["total"] + sorted(k for k in series if k != "total" and _direction(k))
+        for key in keys:
+            values = [series[key].get(i) for i in ids]
+            present = [v for v in values if v is not None]
+            if not present:
+                continue
+            latest = values[-1]
+            rows.append(
+                f"  {key:<34}"
+                f"{_fmt(key, latest) if latest is not None else '-':>12}"
+                f"{_fmt(key, statistics.median(present)):>12}  {_sparkline(values)}"
+            )
+    return "\n".join(rows)
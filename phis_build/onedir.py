@@ -0,0 +1,151 @@
+"""
+PyInstaller 的 onedir 输出方式。
+
+onefile 的 exe 每次启动都要先把整个程序解压到临时目录，在配置较低的电脑上很慢；
+onedir 直接从发布目录加载，启动时没有解压的开销。
+构建时根据 spec 生成 <name>.onedir.spec：EXE 不再包含二进制文件和数据，改由 COLLECT 输出到目录，
+并按 UPX_EXCLUDE 规则不用 UPX 压缩部分 DLL（UPX 压缩的 DLL 每次加载都要在内存中解压，
+也无法在进程间共享，运行库和大型 DLL 尤其明显）。
+
+输出目录的内容会移到暂存目录的顶层，exe 仍与浏览器、配置文件目录位于同一目录。
+"""
+
+import ast
+import logging
+import os
+from pathlib import Path
+from typing import List
+
+from . import config
+
+DEFAULT_UPX_EXCLUDE = [
+    "vcruntime*.dll",
+    "msvcp*.dll",
+    "ucrtbase.dll",
+    "api-ms-win-*.dll",
+    "python*.dll",
+    "qt*.dll",
+    "libcrypto*.dll",
+    "libssl*.dll",
+    "*.pyd",
+]
+"""默认不用 UPX 压缩的二进制文件（文件名通配符，不区分大小写），[exe] upx_exclude 中的规则追加在后面"""
+
+COLLECT_ARGS = ("binaries", "datas", "zipfiles")
+"""onefile 的 EXE 中改为交给 COLLECT 的参数 (a.binaries 等)"""
+
+UPX_EXCLUDE_CODE = """\
+# 由 phis_build 添加: 按文件名规则不用 UPX 压缩的二进制文件
+import fnmatch as _fnmatch
+import os as _os
+_upx_patterns = {patterns!r}
+_upx_exclude = sorted({{
+    _os.path.basename(entry[0])
+    for entry in {analysis}.binaries
+    if any(_fnmatch.fnmatch(_os.path.basename(entry[0]).lower(), p) for p in _upx_patterns)
+}})
+"""
+
+
+def upx_patterns() -> List[str]:
+    return DEFAULT_UPX_EXCLUDE + [p.lower() for p in config.EXE_UPX_EXCLUDE]
+
+
+def _find_exe_assign(tree: ast.Module) -> ast.Assign:
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign)
+            and isinstance(node.value, ast.Call)
+            and isinstance(node.value.func, ast.Name)
+            and node.value.func.id == "EXE"
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+        ):
+            return node
+    raise ValueError("spec 中没有 exe = EXE(...)")
+
+
+def _has_collect(tree: ast.Module) -> bool:
+    return any(
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "COLLECT"
+        for node in ast.walk(tree)
+    )
+
+
+def _is_collect_arg(node: ast.expr) -> bool:
+    return isinstance(node, ast.Attribute) and node.attr in COLLECT_ARGS
+
+
+def to_onedir(source: str) -> str:
+    """把 onefile 的 spec 源码改写为 onedir；已经是 onedir (有 COLLECT) 时原样返回。"""
+    tree = ast.parse(source)
+    if _has_collect(tree):
+        return source
+    assign = _find_exe_assign(tree)
+    call = assign.value
+    target = assign.targets[0].id
+
+    def seg(node: ast.AST) -> str:
+        return ast.get_source_segment(source, node)
+
+    analysis = "a"
+    for arg in call.args:
+        if _is_collect_arg(arg) and isinstance(arg.value, ast.Name):
+            analysis = arg.value.id
+            break
+
+    exe_args = [seg(a) for a in call.args if not _is_collect_arg(a)]
+    collect_args = [target] + [seg(a) for a in call.args if _is_collect_arg(a)]
+    keywords = {k.arg: seg(k.value) for k in call.keywords if k.arg}
+    for name in ("exclude_binaries", "upx_exclude"):
+        keywords.pop(name, None)
+
+    exe_lines = exe_args + ["exclude_binaries=True"]
+    exe_lines += [f"{k}={v}" for k, v in keywords.items()]
+    exe_lines.append("upx_exclude=_upx_exclude")
+    collect_lines = collect_args + [
+        f"strip={keywords.get('strip', 'False')}",
+        f"upx={keywords.get('upx', 'True')}",
+        "upx_exclude=_upx_exclude",
+        f"name={keywords.get('name', repr(config.PROJECT_NAME))}",
+    ]
+
+    def call_text(func: str, lines: List[str]) -> str:
+        return f"{func}(\n" + "".join(f"    {line},\n" for line in lines) + ")\n"
+
+    replacement = (
+        UPX_EXCLUDE_CODE.format(patterns=upx_patterns(), analysis=analysis)
+        + f"{target} = "
+        + call_text("EXE", exe_lines)
+        + "coll = "
+        + call_text("COLLECT", collect_lines)
+    )
+    lines = source.splitlines(keepends=True)
+    before = "".join(lines[: assign.lineno - 1])
+    after = "".join(lines[assign.end_lineno :])
+    return before + replacement + after
+
+
+def write_onedir_spec(spec_file: Path) -> Path:
+    """根据 spec_file 生成 onedir 的 spec，放在原 spec 旁边，返回其路径。"""
+    source = spec_file.read_text(encoding="utf-8")
+    onedir = spec_file.with_name(f"{spec_file.stem}.onedir.spec")
+    header = f"# 由 phis_build 根据 {spec_file.name} 生成，请勿手动修改\n"
+    onedir.write_text(header + to_onedir(source), encoding="utf-8")
+    return onedir
+
+
+def flatten_output(dist_dir: Path) -> Path:
+    """
+    把 PyInstaller 输出的 dist_dir/<name>/ 的内容移到 dist_dir 顶层，返回 exe 的路径。
+    """
+    output = dist_dir / config.PROJECT_NAME
+    if not output.is_dir():
+        raise FileNotFoundError(f"未找到 onedir 输出目录 {output}")
+    for child in output.iterdir():
+        os.replace(child, dist_dir / child.name)
+    output.rmdir()
+    logging.info(f"已将 onedir 输出 {output.name}/ 移到 {dist_dir}")
+    return dist_dir / f"{config.PROJECT_NAME}.exe"
@@ -0,0 +1,56 @@
+"""
+把 pyz 中的模块预编译为 .pyc。
+
+zipimport 不会把编译结果写回归档，每次启动都要重新编译所有导入的模块；
+预先放入 .pyc 可以省去这一步。生成的是不检查源码的基于哈希的 pyc (PEP 552)，
+内容与时间戳无关，同样的输入得到同样的归档。
+
+字节码只能由相同版本的解释器生成，目标版本与当前解释器不同时，
+本文件会作为脚本交给目标解释器执行，因此这里只能使用标准库。
+"""
+
+import importlib.util
+import json
+import sys
+from importlib import _bootstrap_external  # type: ignore
+from typing import Dict, List
+
+
+def compile_source(source: bytes, dfile: str, optimize: int = 0) -> bytes:
+    """编译一个模块的源码，返回 .pyc 文件内容。dfile 为回溯中显示的文件名。"""
+    code = compile(source, dfile, "exec", dont_inherit=True, optimize=optimize)
+    return bytes(
+        _bootstrap_external._code_to_hash_pyc(
+            code, importlib.util.source_hash(source), checked=False
+        )
+    )
+
+
+def compile_files(jobs: List[Dict[str, str]], optimize: int) -> Dict[str, str]:
+    """
+    jobs: [{"src": 源文件, "dfile": 显示名, "dst": 输出的 .pyc}]
+    返回编译失败的 {src: 错误信息}。
+    """
+    errors = {}
+    for job in jobs:
+        try:
+            with open(job["src"], "rb") as f:
+                data = compile_source(f.read(), job["dfile"], optimize)
+            with open(job["dst"], "wb") as f:
+                f.write(data)
+        except SyntaxError as e:
+            errors[job["src"]] = f"{type(e).__name__}: {e}"
+    return errors
+
+
+def main():
+    # 由其他版本的解释器调用: 从标准输入读取任务，向标准输出写入版本和错误
+    request = json.load(sys.stdin)
+    errors = compile_files(request["jobs"], request["optimize"])
+    json.dump(
+        {"version": "%d.%d" % sys.version_info[:2], "errors": errors}, sys.stdout
+    )
+
+
+if __name__ == "__main__":
+    main()
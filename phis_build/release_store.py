@@ -0,0 +1,129 @@
+"""
+releases/ 下按内容寻址的文件仓库。
+
+每个文件按 sha256 在 releases/.store/objects 中只保存一份，各版本目录中的文件都是指向
+仓库对象的硬链接，因此保留很多个版本也只占用大约一个版本的磁盘空间。
+版本目录被删除后，硬链接数只剩 1（仅仓库自身引用）的对象会在清理时删除。
+
+仓库对象总是复制（或 reflink）自暂存目录，而不是硬链接到源目录，
+因此之后修改源目录中的文件不会影响已经生成的版本。
+硬链接的文件被原地修改时，仓库对象和所有引用它的版本都会一起改变，
+因此运行时会写入的目录（[release] copy_dirs，默认是浏览器的配置文件）不放入仓库，总是复制；
+复用已有对象前也会核对其哈希（修改时间未变时使用缓存），被改动过的对象换成新的副本。
+放入文件和清理对象由仓库目录中的 .lock 互斥，避免并行的构建刚放入的对象被另一个构建清理掉。
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from . import config
+from .filelock import FileLock
+from .fileutil import StageStats, stage_file
+from .zip_layer import HashCache
+
+
+class ReleaseStore:
+    def __init__(self, root: Path, hashes_file: Path):
+        self.root = root
+        self.objects = root / "objects"
+        self.hashes = HashCache(hashes_file)
+        self.lock = threading.Lock()
+        self.file_lock = FileLock(root / ".lock")
+        self.can_link = True
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    @staticmethod
+    def _object_key(digest: str) -> str:
+        """对象在哈希缓存中的键，与暂存目录中的相对路径区分开。"""
+        return f".store/{digest}"
+
+    def add(self, path: Path, key: str, stats: Optional[StageStats] = None) -> Path:
+        """把文件放入仓库（已有相同内容时不再复制），返回对象路径。"""
+        digest = self.hashes.sha256(path, key)
+        obj = self._object_path(digest)
+        object_key = self._object_key(digest)
+        reuse = obj.exists()
+        if reuse and self.hashes.sha256(obj, object_key) != digest:
+            # 对象被某个版本目录中的硬链接原地修改过（修改时间变化后才会重新计算哈希），
+            # 换成新的对象，之后的版本不再引用被修改的内容
+            logging.warning(f"警告: 发布仓库中的对象 {digest[:12]} 已被修改，重新保存。")
+            reuse = False
+        if not reuse:
+            tmp = obj.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+            method = stage_file(path, tmp, "reflink")
+            os.replace(tmp, obj)
+            self.hashes.remember(obj, object_key, digest)
+            if stats is not None:
+                stats.add(method, obj.stat().st_size)
+        elif stats is not None:
+            stats.add("hardlink", obj.stat().st_size)
+        return obj
+
+    def _link(self, obj: Path, dst: Path):
+        if self.can_link:
+            try:
+                os.link(obj, dst)
+                return
+            except OSError as e:
+                # 文件系统不支持硬链接时退回到复制，仓库仍然可用但不再节省空间
+                logging.warning(f"警告: 无法在 {dst.parent} 创建硬链接，改为复制: {e}")
+                self.can_link = False
+        stage_file(obj, dst, "copy")
+
+    def materialize(
+        self, src_dir: Path, dst_dir: Path, copy_dirs: Iterable[str] = ()
+    ) -> StageStats:
+        """
+        把 src_dir 的内容放入仓库，并在 dst_dir 中以硬链接的形式生成同样的目录。
+        copy_dirs（相对路径）中的文件不放入仓库，直接复制（或 reflink）到 dst_dir。
+        """
+        copy_prefixes = tuple(f"{d.strip('/')}/" for d in copy_dirs)
+        stats = StageStats()
+        with self.file_lock:
+            for dirpath, dirnames, filenames in os.walk(src_dir):
+                rel = Path(dirpath).relative_to(src_dir)
+                (dst_dir / rel).mkdir(parents=True, exist_ok=True)
+                for name in filenames:
+                    src = Path(dirpath) / name
+                    key = (rel / name).as_posix()
+                    dst = dst_dir / rel / name
+                    if key.startswith(copy_prefixes):
+                        stage_file(src, dst, "reflink", stats)
+                        continue
+                    obj = self.add(src, key, stats)
+                    if dst.exists():
+                        dst.unlink()
+                    self._link(obj, dst)
+            self.hashes.save()
+        return stats
+
+    def gc(self) -> Tuple[int, int]:
+        """删除不再被任何版本目录引用的对象，返回 (文件数, 字节数)。"""
+        removed = 0
+        freed = 0
+        if not self.objects.exists():
+            return removed, freed
+        with self.file_lock:
+            for obj in self.objects.glob("*/*"):
+                try:
+                    st = obj.stat()
+                    if obj.name.endswith(".tmp") or st.st_nlink <= 1:
+                        obj.unlink()
+                        self.hashes.forget(self._object_key(obj.name))
+                        removed += 1
+                        freed += st.st_size
+                except OSError as e:
+                    logging.info(f"警告: 无法删除仓库对象 {obj.name}: {e}")
+            self.hashes.save()
+        return removed, freed
+
+
+def open_store() -> ReleaseStore:
+    return ReleaseStore(
+        config.RELEASE_DIR / ".store", config.CACHE_DIR / "release_store_hashes.json"
+    )
@@ -0,0 +1,19 @@
+@echo off
+chcp 65001 > nul
+setlocal
+
+:: Digital Worker RPA Platform - Executable Runner
+:: Version: {VERSION}
+
+cd /d "%~dp0"
+IF NOT EXIST "{EXE}" (
+    echo.
+    echo "错误：未找到应用程序 ({EXE})。"
+    echo 应用程序可能已损坏，请尝试重新安装。
+    echo.
+    pause
+    exit /b 1
+)
+
+"{EXE}" {ARGS}
+exit /b %ERRORLEVEL%
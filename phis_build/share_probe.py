@@ -0,0 +1,143 @@
+"""
+共享路径可用性检测。
+
+无法访问的 SMB 主机可能让一次 is_dir() 阻塞几十秒，因此所有候选路径在后台线程中
+同时检测，每个检测都有超时；检测到的可用路径会缓存一段时间，重复 --copy 时直接使用。
+"""
+
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from . import cache, config
+
+CACHE_NAME = "share_probe"
+
+
+def candidate_paths() -> List[Path]:
+    """按优先级返回需要检测的共享路径。"""
+    if sys.platform == "linux" and config.LINUX_SHARE_PATH:
+        return [config.LINUX_SHARE_PATH]
+    paths = []
+    for path in [config.SHARE_PATH, config.SHARE_PATH2]:
+        if not path or path in paths:
+            continue
+        if sys.platform == "win32" and not str(path).startswith("\\"):
+            logging.info(f"路径 {path} 不是一个有效的 UNC 路径，跳过检查。")
+            continue
+        paths.append(path)
+    return paths
+
+
+def _load_cached(paths: List[Path]) -> Optional[Path]:
+    entry = cache.load_entry(CACHE_NAME)
+    if not entry or entry.get("candidates") != [str(p) for p in paths]:
+        return None
+    if time.time() - entry.get("time", 0) > config.SHARE_PROBE_TTL:
+        return None
+    path = Path(entry["path"])
+    return path if path in paths else None
+
+
+def _save_cached(paths: List[Path], path: Path):
+    try:
+        cache.save_entry(
+            CACHE_NAME,
+            {"candidates": [str(p) for p in paths], "path": str(path), "time": time.time()},
+        )
+    except OSError as e:
+        logging.info(f"警告: 无法保存共享路径检测结果: {e}")
+
+
+class ShareProbe:
+    """
+    在后台线程中同时检测所有候选路径。
+    result() 按配置顺序返回第一个可用的路径：前面的路径都已失败或超时后，
+    后面可用的路径立即胜出，不必等所有检测结束。
+    """
+
+    def __init__(self, paths: List[Path], timeout: float, cached: Optional[Path] = None):
+        self.paths = paths
+        self.timeout = timeout
+        self.cached = cached
+        self.started = time.monotonic()
+        self.cond = threading.Condition()
+        self.status: List[Optional[bool]] = [None] * len(paths)
+        """每个路径的检测结果: None 表示仍在检测"""
+        self._result: Optional[Path] = None
+        self._resolved = False
+        if cached:
+            return
+        for i, path in enumerate(paths):
+            # 守护线程: 卡在网络文件系统上的检测不会阻止进程退出
+            threading.Thread(
+                target=self._probe, args=(i, path), name=f"probe-{i}", daemon=True
+            ).start()
+
+    def _probe(self, index: int, path: Path):
+        try:
+            ok = path.is_dir()
+            if not ok:
+                logging.info(f"警告: 共享路径 {path} 不存在或不是一个目录。")
+        except Exception as e:
+            logging.info(f"警告: 无法访问网络共享路径 {path}。错误: {e}")
+            ok = False
+        with self.cond:
+            self.status[index] = ok
+            self.cond.notify_all()
+
+    def _winner(self, timed_out: bool = False) -> Optional[Path]:
+        for path, ok in zip(self.paths, self.status):
+            if ok:
+                return path
+            if ok is None and not timed_out:
+                # 优先级更高的路径还没有结果
+                return None
+        return None
+
+    def _done(self) -> bool:
+        return self._winner() is not None or None not in self.status
+
+    def _wait(self) -> Optional[Path]:
+        deadline = self.started + self.timeout
+        with self.cond:
+            while not self._done():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            for path, ok in zip(self.paths, self.status):
+                if ok is None and not self._done():
+                    logging.info(
+                        f"警告: 检测共享路径 {path} 超过 {self.timeout:g} 秒，视为不可用。"
+                    )
+            return self._winner(timed_out=True)
+
+    def result(self) -> Optional[Path]:
+        """等待检测结束（最多到超时），返回可用路径或 None。"""
+        if self._resolved:
+            return self._result
+        if self.cached:
+            logging.info(f"使用缓存的共享路径检测结果: {self.cached}")
+            self._result = self.cached
+        else:
+            self._result = self._wait()
+            if self._result:
+                logging.info(f"网络共享路径 {self._result} 可访问。")
+                _save_cached(self.paths, self._result)
+            else:
+                logging.info("所有配置的共享路径均不可用。")
+        self._resolved = True
+        return self._result
+
+
+def start(use_cache: bool = True) -> ShareProbe:
+    """开始检测（不阻塞），之后调用 result() 取得结果。"""
+    paths = candidate_paths()
+    cached = _load_cached(paths) if use_cache and paths else None
+    if paths and not cached:
+        logging.info(f"正在检查网络共享路径 {', '.join(map(str, paths))} ...")
+    return ShareProbe(paths, config.SHARE_PROBE_TIMEOUT, cached)
@@ -0,0 +1,83 @@
+"""
+检查命令行启动时的导入耗时是否超出预算。
+
+用法: python -m phis_build.startup [--repeat N]
+通过 `python -X importtime` 分别测量 `phis_build --help` 和仅复制 (--copy) 路径
+所需的模块导入时间，超出预算时以非零状态退出。
+--copy 场景从 phis_build.main 开始并解析命令行参数，与实际运行时导入的模块相同。
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+COPY_ENTRY = """\
+import sys
+sys.argv = ["phis_build", "--copy"]
+from phis_build import main
+args = main.get_args()
+assert args.copy_
+import phis_build.build_steps
+"""
+"""与 `phis_build --copy` 相同的入口和参数解析（包括 Args 模型），在读取配置、开始复制之前停止"""
+
+SCENARIOS: Dict[str, List[str]] = {
+    "help": ["-m", "phis_build", "--help"],
+    "copy": ["-c", COPY_ENTRY],
+}
+"""场景名 -> 传给解释器的参数"""
+
+BUDGET_MS: Dict[str, float] = {
+    "help": 100.0,
+    "copy": 150.0,
+}
+"""各场景的导入耗时预算（毫秒）"""
+
+
+def measure(args: List[str]) -> Tuple[float, List[Tuple[float, str]]]:
+    """
+    运行一次 `python -X importtime <args>`。
+    返回: (总导入耗时毫秒, [(累计毫秒, 顶层模块名)])
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    top_level = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # 嵌套导入的模块名带有缩进，只统计顶层
+        if not name.startswith("  "):
+            top_level.append((int(cumulative) / 1000, name.strip()))
+    total = sum(ms for ms, _ in top_level)
+    return total, sorted(top_level, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查 phis_build 启动导入耗时。")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="每个场景测量次数，取最小值。"
+    )
+    opts = parser.parse_args()
+
+    failed = False
+    for scenario, args in SCENARIOS.items():
+        runs = [measure(args) for _ in range(max(1, opts.repeat))]
+        total, modules = min(runs, key=lambda r: r[0])
+        budget = BUDGET_MS[scenario]
+        status = "OK" if total <= budget else "超出预算"
+        failed = failed or total > budget
+        print(f"[{scenario}] 导入耗时 {total:.1f} ms / 预算 {budget:.0f} ms  {status}")
+        for ms, name in modules[:5]:
+            print(f"    {ms:8.1f} ms  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .cache import sha256_file
+from .filelock import FileLock
+
+MANIFEST_NAME = ".phis_manifest.json"
+"""保存在目标目录中的清单文件名；同名前缀的临时文件和锁文件不参与同步"""
+
+MTIME_TOLERANCE = 2.0
+"""比较修改时间时允许的误差（秒），兼容 FAT/SMB 的时间精度"""
+
+
+def build_manifest(source_dir: Path) -> Dict[str, dict]:
+    """为源目录生成清单: {相对路径: {size, mtime, sha256}}。"""
+    manifest = {}
+    for p in sorted(source_dir.rglob("*")):
+        if p.is_file():
+            st = p.stat()
+            manifest[p.relative_to(source_dir).as_posix()] = {
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "sha256": sha256_file(p),
+            }
+    return manifest
+
+
+def load_manifest(dest_dir: Path) -> Dict[str, dict]:
+    """读取目标目录中的清单，不存在或损坏时返回空字典。"""
+    try:
+        return json.loads((dest_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.info(f"警告: 目标清单无法读取，将重新比对: {e}")
+        return {}
+
+
+def save_manifest(dest_dir: Path, manifest: Dict[str, dict]):
+    """先写临时文件再重命名，避免留下半个清单。"""
+    path = dest_dir / MANIFEST_NAME
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def scan_dir(dest_dir: Path) -> Dict[str, Tuple[int, float]]:
+    """
+    列出目标目录中的文件及其 (大小, 修改时间)。
+    使用 os.scandir，SMB 上目录列表本身就带有这些信息，不需要逐个 stat。
+    """
+    listing = {}
+    if not dest_dir.is_dir():
+        return listing
+    stack = [(dest_dir, "")]
+    while stack:
+        current, prefix = stack.pop()
+        with os.scandir(current) as it:
+            for entry in it:
+                rel = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), rel + "/"))
+                elif not rel.startswith(MANIFEST_NAME):
+                    st = entry.stat(follow_symlinks=False)
+                    listing[rel] = (st.st_size, st.st_mtime)
+    return listing
+
+
+def _dest_matches(
+    src: dict, recorded: Optional[dict], actual: Optional[Tuple[int, float]]
+) -> bool:
+    """判断目标文件是否与源文件一致。"""
+    if actual is None:
+        return False
+    size, mtime = actual
+    if recorded is not None:
+        # 清单中哈希一致，且目标文件自上次同步后没有被改动
+        return (
+            recorded.get("sha256") == src["sha256"]
+            and recorded.get("size") == size
+            and abs(recorded.get("mtime", 0) - mtime) < MTIME_TOLERANCE
+        )
+    # 没有清单（例如旧版本直接复制的目录），copy2 会保留修改时间，按大小和时间判断
+    return size == src["size"] and abs(src["mtime"] - mtime) < MTIME_TOLERANCE
+
+
+def plan_sync(
+    source: Dict[str, dict],
+    recorded: Dict[str, dict],
+    actual: Dict[str, Tuple[int, float]],
+) -> Tuple[List[str], List[str]]:
+    """
+    比较源清单、目标清单和目标目录实际内容。
+    返回: (需要复制的相对路径, 需要删除的相对路径)
+    """
+    to_copy = [
+        rel
+        for rel, src in source.items()
+        if not _dest_matches(src, recorded.get(rel), actual.get(rel))
+    ]
+    to_delete = sorted(rel for rel in actual if rel not in source)
+    return to_copy, to_delete
+
+
+def remove_empty_dirs(root: Path):
+    """自底向上删除空目录（保留 root 本身）。"""
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if Path(dirpath) != root and not dirnames and not filenames:
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+
+def file_is_current(
+    file: Path, share_path: Path, sha256: Optional[str] = None
+) -> bool:
+    """检查共享目录中是否已有大小和哈希都一致的同名文件。"""
+    recorded = load_manifest(share_path).get(file.name)
+    if not recorded:
+        return False
+    dest = share_path / file.name
+    try:
+        st = dest.stat()
+    except OSError:
+        return False
+    if st.st_size != file.stat().st_size:
+        return False
+    src = {"sha256": sha256 or sha256_file(file)}
+    return _dest_matches(src, recorded, (st.st_size, st.st_mtime))
+
+
+def record_file(file: Path, share_path: Path, sha256: Optional[str] = None):
+    """
+    复制完成后把文件记录到共享目录的清单中。
+    多个构建可能同时上传到同一个共享目录，在锁内重新读取清单后合并，不会丢失其他构建的记录。
+    """
+    st = (share_path / file.name).stat()
+    entry = {
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": sha256 or sha256_file(file),
+    }
+    with FileLock(share_path / f"{MANIFEST_NAME}.lock"):
+        manifest = load_manifest(share_path)
+        manifest[file.name] = entry
+        save_manifest(share_path, manifest)
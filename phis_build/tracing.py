@@ -0,0 +1,252 @@
+"""
+构建步骤的耗时追踪。
+
+每个步骤记录墙钟时间、CPU 时间（含子进程）、读写字节数、峰值内存以及步骤自己补充的
+文件数等信息，结束时写出 Chrome trace 格式的 JSON（可在 chrome://tracing 或
+https://ui.perfetto.dev 中打开），并在日志中输出汇总表。
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def _cpu_seconds() -> float:
+    """本进程及已结束子进程（如 PyInstaller）的 CPU 时间。"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _io_bytes() -> Optional[Tuple[int, int]]:
+    """本进程累计读写字节数 (读, 写)，平台不支持时返回 None。"""
+    if sys.platform.startswith("linux"):
+        try:
+            counters = {}
+            with open("/proc/self/io", encoding="ascii") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    counters[key] = int(value)
+            return counters["rchar"], counters["wchar"]
+        except (OSError, KeyError, ValueError):
+            return None
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class IO_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                (name, ctypes.c_ulonglong)
+                for name in (
+                    "ReadOperationCount",
+                    "WriteOperationCount",
+                    "OtherOperationCount",
+                    "ReadTransferCount",
+                    "WriteTransferCount",
+                    "OtherTransferCount",
+                )
+            ]
+
+        counters = IO_COUNTERS()
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        if kernel32.GetProcessIoCounters(
+            kernel32.GetCurrentProcess(), ctypes.byref(counters)
+        ):
+            return counters.ReadTransferCount, counters.WriteTransferCount
+    return None
+
+
+def _peak_rss() -> Optional[int]:
+    """本进程到目前为止的峰值内存（字节），平台不支持时返回 None。"""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        try:
+            get_info = ctypes.windll.psapi.GetProcessMemoryInfo
+        except (AttributeError, OSError):
+            return None
+        if get_info(
+            kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+        ):
+            return counters.PeakWorkingSetSize
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Span:
+    """一个步骤的测量结果。"""
+
+    def __init__(self, name: str, start: float):
+        self.name = name
+        self.start = start
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.read_bytes: Optional[int] = None
+        self.write_bytes: Optional[int] = None
+        self.peak_rss: Optional[int] = None
+        self.args: Dict[str, object] = {}
+        """步骤补充的信息，例如文件数、产物大小"""
+        self.error: Optional[str] = None
+
+    def set(self, **kwargs):
+        self.args.update(kwargs)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "read_bytes": self.read_bytes,
+            "write_bytes": self.write_bytes,
+            "peak_rss": self.peak_rss,
+            "error": self.error,
+            **self.args,
+        }
+
+
+class Tracer:
+    """按顺序记录构建步骤。"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self._stack: List[Span] = []
+
+    @contextmanager
+    def step(self, name: str):
+        span = Span(name, time.perf_counter())
+        cpu0 = _cpu_seconds()
+        io0 = _io_bytes()
+        self._stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._stack.pop()
+            span.wall = time.perf_counter() - span.start
+            span.cpu = _cpu_seconds() - cpu0
+            io1 = _io_bytes()
+            if io0 and io1:
+                span.read_bytes = io1[0] - io0[0]
+                span.write_bytes = io1[1] - io0[1]
+            span.peak_rss = _peak_rss()
+            self.spans.append(span)
+
+    def annotate(self, **kwargs):
+        """给当前正在执行的步骤补充信息；不在任何步骤中时忽略。"""
+        if self._stack:
+            self._stack[-1].set(**kwargs)
+
+    def to_chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = []
+        for span in self.spans:
+            args = {
+                k: v for k, v in span.to_dict().items() if k not in ("name", "wall")
+            }
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "build",
+                    "ph": "X",
+                    "ts": round((span.start - self.origin) * 1e6),
+                    "dur": round(span.wall * 1e6),
+                    "pid": pid,
+                    "tid": 1,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(self.to_chrome_trace(), ensure_ascii=False, indent=1),
+            encoding="utf-8",
+        )
+
+    def summary(self) -> str:
+        """生成步骤耗时汇总表。"""
+
+        def mb(n: Optional[int]) -> str:
+            return "-" if n is None else f"{n / 1024 / 1024:.1f}"
+
+        total = sum(s.wall for s in self.spans) or 1.0
+        rows = [
+            f"{'步骤':<22}{'耗时(s)':>9}{'占比':>7}{'CPU(s)':>9}"
+            f"{'读(MB)':>10}{'写(MB)':>10}{'峰值内存(MB)':>14}  其他"
+        ]
+        for s in self.spans:
+            extra = ", ".join(f"{k}={v}" for k, v in s.args.items())
+            if s.error:
+                extra = f"失败: {s.error}" + (f"; {extra}" if extra else "")
+            rows.append(
+                f"{s.name:<24}{s.wall:>9.2f}{s.wall / total:>8.0%}{s.cpu:>9.2f}"
+                f"{mb(s.read_bytes):>10}{mb(s.write_bytes):>10}{mb(s.peak_rss):>14}"
+                f"  {extra}"
+            )
+        rows.append(f"{'合计':<22}{sum(s.wall for s in self.spans):>9.2f}")
+        return "\n".join(rows)
+
+    def finish(self, path: Path):
+        """写出 trace 文件并在日志中输出汇总表。"""
+        if not self.spans:
+            return
+        try:
+            self.write(path)
+        except OSError as e:
+            logging.warning(f"写入构建追踪文件失败: {e}")
+        else:
+            logging.info(f"构建追踪已写入 {path}")
+        logging.info("步骤耗时汇总:\n" + self.summary())
+
+
+tracer = Tracer()
+"""本次运行使用的追踪器"""
+
+
+def step(name: str):
+    """在当前追踪器中记录一个步骤: with tracing.step("make_zip"): ..."""
+    return tracer.step(name)
+
+
+def annotate(**kwargs):
+    tracer.annotate(**kwargs)
+
+
+def reset():
+    """开始新的一次构建时丢弃之前的记录。"""
+    global tracer
+    tracer = Tracer()
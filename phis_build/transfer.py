@@ -0,0 +1,366 @@
+import errno
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .cache import sha256_file
+
+DEFAULT_WORKERS = 8
+"""默认并发复制数。网络共享上小文件的耗时主要是往返延迟，适当并发即可摊薄"""
+
+
+class TransferResult:
+    """一次批量复制的统计结果。"""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.dest_stats: Dict[Path, os.stat_result] = {}
+        """复制完成后目标文件的 stat，供清单记录使用"""
+
+    @property
+    def mb_per_second(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        return self.bytes / 1024 / 1024 / self.seconds
+
+
+def _copy_one(src: Path, dst: Path) -> Tuple[Path, int, os.stat_result]:
+    shutil.copy2(src, dst)
+    return dst, src.stat().st_size, dst.stat()
+
+
+def copy_files(
+    pairs: List[Tuple[Path, Path]], workers: Optional[int] = None, desc: str = "复制"
+) -> TransferResult:
+    """
+    在有上限的线程池中并发复制 (源, 目标) 文件对。
+    目标目录会事先一次性创建好，进度条显示所有文件的总字节数。
+    """
+    workers = max(1, workers or DEFAULT_WORKERS)
+    result = TransferResult()
+
+    # 1. 一次性创建所有目标目录
+    for d in sorted({dst.parent for _, dst in pairs}):
+        d.mkdir(parents=True, exist_ok=True)
+
+    total_size = sum(src.stat().st_size for src, _ in pairs)
+    start = time.perf_counter()
+
+    from tqdm import tqdm
+
+    # 2. 并发复制，由主线程汇总进度
+    with tqdm(total=total_size, unit="B", unit_scale=True, desc=desc) as pbar:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_copy_one, src, dst) for src, dst in pairs]
+            for future in as_completed(futures):
+                dst, size, st = future.result()
+                result.files += 1
+                result.bytes += size
+                result.dest_stats[dst] = st
+                pbar.update(size)
+
+    result.seconds = time.perf_counter() - start
+    logging.info(
+        f"已复制 {result.files} 个文件，共 {result.bytes / 1024 / 1024:.1f} MB，"
+        f"耗时 {result.seconds:.1f} 秒，平均 {result.mb_per_second:.1f} MB/s"
+        f"（并发 {workers}）。"
+    )
+    return result
+
+
+CHECKPOINT_SIZE = 32 * 1024 * 1024
+"""大文件复制时每写入这么多字节就落盘并记录一次断点"""
+
+MIN_BUFFER = 256 * 1024
+MAX_BUFFER = 16 * 1024 * 1024
+
+_OFFLOAD_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+}
+
+
+class _RangeCopier:
+    """
+    把源文件的一段复制到目标文件的相同偏移处。
+    优先使用内核复制 (copy_file_range / sendfile)，不支持时退回到自适应大小的缓冲区。
+    """
+
+    def __init__(self):
+        self.use_copy_file_range = hasattr(os, "copy_file_range")
+        self.use_sendfile = hasattr(os, "sendfile") and sys.platform != "win32"
+        self.buffer_size = 1024 * 1024
+        self.method = None
+
+    def copy(self, fsrc, fdst, offset: int, length: int, progress=None):
+        end = offset + length
+        while offset < end:
+            n = self._copy_chunk(fsrc, fdst, offset, end - offset)
+            if n == 0:
+                raise EOFError(f"源文件在偏移 {offset} 处意外结束")
+            offset += n
+            if progress:
+                progress(n)
+
+    def _copy_chunk(self, fsrc, fdst, offset: int, remaining: int) -> int:
+        count = min(remaining, MAX_BUFFER)
+        if self.use_copy_file_range:
+            try:
+                n = os.copy_file_range(
+                    fsrc.fileno(), fdst.fileno(), count, offset, offset
+                )
+                self.method = "copy_file_range"
+                return n
+            except OSError as e:
+                if e.errno not in _OFFLOAD_ERRNOS:
+                    raise
+                self.use_copy_file_range = False
+        if self.use_sendfile:
+            try:
+                os.lseek(fdst.fileno(), offset, os.SEEK_SET)
+                n = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, count)
+                self.method = "sendfile"
+                return n
+            except OSError as e:
+                if e.errno not in _OFFLOAD_ERRNOS:
+                    raise
+                self.use_sendfile = False
+
+        # 普通读写：根据每块耗时调整缓冲区大小
+        self.method = "buffer"
+        fsrc.seek(offset)
+        fdst.seek(offset)
+        started = time.perf_counter()
+        chunk = fsrc.read(min(remaining, self.buffer_size))
+        fdst.write(chunk)
+        elapsed = time.perf_counter() - started
+        if elapsed < 0.25 and self.buffer_size < MAX_BUFFER:
+            self.buffer_size *= 2
+        elif elapsed > 2 and self.buffer_size > MIN_BUFFER:
+            self.buffer_size //= 2
+        return len(chunk)
+
+
+def _load_state(state_file: Path, src_stat: os.stat_result) -> int:
+    """读取断点记录，源文件未变化时返回已确认写入的偏移。"""
+    try:
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return 0
+    if (
+        state.get("size") != src_stat.st_size
+        or state.get("mtime") != src_stat.st_mtime
+    ):
+        return 0
+    return int(state.get("offset", 0))
+
+
+def _save_state(state_file: Path, src_stat: os.stat_result, offset: int):
+    state_file.write_text(
+        json.dumps(
+            {"size": src_stat.st_size, "mtime": src_stat.st_mtime, "offset": offset}
+        ),
+        encoding="utf-8",
+    )
+
+
+def _verify_tail(src: Path, part: Path, offset: int) -> int:
+    """
+    续传前核对断点前最后一块数据，不一致时退回到这一块的起点。
+    返回可以安全续传的偏移。
+    """
+    if offset == 0:
+        return 0
+    try:
+        if part.stat().st_size < offset:
+            return 0
+    except OSError:
+        return 0
+    start = max(0, offset - CHECKPOINT_SIZE)
+    with open(src, "rb") as fs, open(part, "rb") as fp:
+        fs.seek(start)
+        fp.seek(start)
+        if fs.read(offset - start) == fp.read(offset - start):
+            return offset
+    logging.info("断点前的数据与源文件不一致，回退一个数据块后续传。")
+    return start
+
+
+def copy_large_file(
+    src: Path,
+    dst: Path,
+    progress=None,
+    retries: int = 3,
+    verify: bool = True,
+    src_hash: Optional[str] = None,
+) -> str:
+    """
+    可续传、带校验的大文件复制。
+    先写入 dst.part，并定期在 dst.part.json 中记录已落盘的偏移；
+    中断后（包括下次运行时）从最后确认的偏移继续。
+    复制完成后对目标文件做一次完整的 sha256 校验，通过后再原子地重命名为 dst。
+    src_hash 为已知的源文件 sha256，可省去一次读取。返回源文件的 sha256。
+    """
+    part = dst.with_name(f"{dst.name}.part")
+    state_file = dst.with_name(f"{dst.name}.part.json")
+    src_stat = src.stat()
+    src_hash = src_hash or sha256_file(src)
+    copier = _RangeCopier()
+    reported = 0
+
+    def report(n: int):
+        nonlocal reported
+        reported += n
+        if progress:
+            progress(n)
+
+    attempt = 0
+    while True:
+        offset = _verify_tail(src, part, _load_state(state_file, src_stat))
+        if offset:
+            logging.info(f"从断点 {offset / 1024 / 1024:.1f} MB 处继续复制 {src.name}")
+            report(offset)
+        try:
+            mode = "r+b" if offset and part.exists() else "wb"
+            with open(src, "rb") as fsrc, open(part, mode) as fdst:
+                fdst.truncate(offset)
+                while offset < src_stat.st_size:
+                    length = min(CHECKPOINT_SIZE, src_stat.st_size - offset)
+                    copier.copy(fsrc, fdst, offset, length, report)
+                    fdst.flush()
+                    os.fsync(fdst.fileno())
+                    offset += length
+                    _save_state(state_file, src_stat, offset)
+            break
+        except OSError as e:
+            attempt += 1
+            if attempt > retries:
+                raise
+            wait = 2**attempt
+            logging.info(f"复制中断 ({e})，{wait} 秒后第 {attempt} 次重试...")
+            # 进度条回到断点处，续传时重新计算
+            report(-reported)
+            time.sleep(wait)
+
+    logging.info(f"复制方式: {copier.method or 'buffer'}")
+    if verify:
+        dst_hash = sha256_file(part)
+        if dst_hash != src_hash:
+            part.unlink()
+            state_file.unlink(missing_ok=True)
+            raise IOError(f"{dst} 校验失败: 期望 {src_hash}，实际 {dst_hash}")
+    os.replace(part, dst)
+    state_file.unlink(missing_ok=True)
+    return src_hash
+
+
+class TeeWriter:
+    """
+    供 zipfile 写入的文件对象：数据写入本地文件的同时，
+    经有上限的队列交给后台线程写入共享目录中的 <name>.part。
+    网络写入失败不会影响本地文件，finish() 会返回 False，由调用方退回普通复制。
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(
+        self, local: Path, remote: Path, buffer_size: int = 64 * 1024 * 1024
+    ):
+        self.local_path = local
+        self.remote = remote
+        self.remote_part = remote.with_name(f"{remote.name}.part")
+        self.local = open(local, "wb")
+        self.hash = hashlib.sha256()
+        self.position = 0
+        self.pending = bytearray()
+        self.error: Optional[BaseException] = None
+        self.queue: "queue.Queue[Optional[bytes]]" = queue.Queue(
+            maxsize=max(1, buffer_size // self.CHUNK_SIZE)
+        )
+        self.thread = threading.Thread(target=self._upload, daemon=True)
+        self.thread.start()
+
+    def _upload(self):
+        received_end = False
+        try:
+            with open(self.remote_part, "wb") as f:
+                while True:
+                    chunk = self.queue.get()
+                    if chunk is None:
+                        received_end = True
+                        break
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException as e:
+            self.error = e
+            # 继续取走队列中的数据，避免压缩线程阻塞；
+            # 已经收到结束标记（例如 fsync 或关闭文件时出错）时队列中不会再有数据
+            while not received_end:
+                received_end = self.queue.get() is None
+
+    def write(self, data) -> int:
+        self.local.write(data)
+        self.hash.update(data)
+        self.position += len(data)
+        self.pending += data
+        if len(self.pending) >= self.CHUNK_SIZE:
+            self.queue.put(bytes(self.pending))
+            self.pending.clear()
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        self.local.flush()
+
+    def finish(self) -> bool:
+        """
+        结束写入并等待上传完成。
+        上传成功且目标文件哈希一致时原子地重命名到位，返回 True。
+        """
+        if self.pending:
+            self.queue.put(bytes(self.pending))
+            self.pending.clear()
+        self.queue.put(None)
+        self.local.close()
+        self.thread.join()
+
+        if self.error is None:
+            digest = sha256_file(self.remote_part)
+            if digest == self.hash.hexdigest():
+                os.replace(self.remote_part, self.remote)
+                return True
+            self.error = IOError(f"{self.remote} 校验失败")
+        logging.warning(f"边压缩边上传失败，稍后改为普通复制: {self.error}")
+        try:
+            self.remote_part.unlink(missing_ok=True)
+        except OSError:
+            pass
+        return False
+
+    def abort(self):
+        """放弃写入：关闭本地文件并删除共享目录中的临时文件。"""
+        self.pending.clear()
+        self.queue.put(None)
+        self.local.close()
+        self.thread.join()
+        try:
+            self.remote_part.unlink(missing_ok=True)
+        except OSError:
+            pass
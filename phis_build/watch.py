@@ -0,0 +1,87 @@
+"""
+监视模式：常驻进程，源码变化后增量重新构建 pyz。
+
+轮询 get_entries() 列出的全部文件（包目录、顶层 py 文件、__main__.py）和 pyproject.toml
+的修改时间与大小；一连串的修改在静止 debounce 秒后合并为一次构建。
+每次构建只重新压缩变化的文件，并刷新 build/app.pyz、项目目录和 releases/temp 中的 app.pyz。
+"""
+
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from . import build_zipapp, config
+
+Snapshot = Dict[str, Tuple[int, int]]
+"""{归档名: (mtime_ns, 大小)}"""
+
+
+def snapshot() -> Optional[Snapshot]:
+    """记录当前源文件状态；文件正在被移动或删除等导致列举失败时返回 None。"""
+    try:
+        snap = {}
+        for arcname, path in build_zipapp.get_entries():
+            st = path.stat()
+            snap[arcname] = (st.st_mtime_ns, st.st_size)
+        pyproject = config.PROJECT_ROOT / "pyproject.toml"
+        st = pyproject.stat()
+        snap["<pyproject.toml>"] = (st.st_mtime_ns, st.st_size)
+        return snap
+    except (OSError, ValueError) as e:
+        logging.debug(f"列举源文件失败，稍后重试: {e}")
+        return None
+
+
+def _changes(old: Snapshot, new: Snapshot) -> str:
+    added = new.keys() - old.keys()
+    removed = old.keys() - new.keys()
+    modified = {k for k in new.keys() & old.keys() if new[k] != old[k]}
+    parts = []
+    for label, names in (("新增", added), ("修改", modified), ("删除", removed)):
+        if names:
+            shown = ", ".join(sorted(names)[:5])
+            more = f" 等 {len(names)} 个" if len(names) > 5 else ""
+            parts.append(f"{label} {shown}{more}")
+    return "；".join(parts)
+
+
+def run_watch(interval: Optional[float] = None, debounce: Optional[float] = None):
+    """一直运行到 Ctrl+C。"""
+    interval = config.WATCH_INTERVAL if interval is None else interval
+    debounce = config.WATCH_DEBOUNCE if debounce is None else debounce
+    pyc_cache: Dict[str, Tuple[Tuple[int, int], bytes]] = {}
+
+    def rebuild():
+        start = time.perf_counter()
+        try:
+            build_zipapp.rebuild_package(pyc_cache)
+        except Exception as e:
+            logging.error(f"重新构建失败: {e}", exc_info=True)
+            return
+        logging.info(f"已更新 app.pyz ({time.perf_counter() - start:.2f}s)")
+
+    last = snapshot()
+    while last is None:
+        time.sleep(interval)
+        last = snapshot()
+    rebuild()
+    logging.info(f"正在监视 {config.PROJECT_ROOT} 的源码变化 (Ctrl+C 退出) ...")
+
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot()
+            if current is None or current == last:
+                continue
+            # 去抖: 等到文件在 debounce 秒内不再变化
+            while True:
+                time.sleep(debounce)
+                newer = snapshot()
+                if newer is not None and newer == current:
+                    break
+                current = newer
+            logging.info(f"检测到变化: {_changes(last, current)}")
+            last = current
+            rebuild()
+    except KeyboardInterrupt:
+        logging.info("已停止监视。")
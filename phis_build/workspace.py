@@ -0,0 +1,139 @@
+"""
+每次构建独立的工作区。
+
+工作区位于 releases/.work/<时间>-<pid>/，本次构建的暂存目录 (config.TEMP_DIR)、
+PyInstaller 工作目录和 app.pyz (config.BUILD_DIR)、生成中的发布目录和压缩包都放在其中，
+完成后用原子重命名放入 releases/。
+因此同一项目的多个构建（例如同时进行的 beta 和正式构建）不会互相覆盖，
+releases/ 中也不会出现只写了一半的结果。
+共用的 build/ 缓存 (config.BUILD_CACHE_DIR) 只在复制出和替换时持有 build.lock，
+打包本身可以并行。
+
+工作区在构建期间持有其中的 .lock，进程崩溃后锁随之释放，
+下一次创建工作区时会删除这些残留的目录。
+"""
+
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+from . import config
+from .filelock import FileLock
+
+WORK_DIR_NAME = ".work"
+LOCK_NAME = ".lock"
+
+
+def _work_root() -> Path:
+    return config.RELEASE_DIR / WORK_DIR_NAME
+
+
+def build_cache_lock() -> FileLock:
+    """读取或替换共用的 build/ 缓存时持有的锁。"""
+    return FileLock(config.CACHE_DIR / "build.lock")
+
+
+def clean_stale(root: Path):
+    """删除没有被任何构建持有的工作区。调用方需持有 root/.lock。"""
+    if not root.exists():
+        return
+    for d in root.iterdir():
+        if not d.is_dir():
+            continue
+        lock = FileLock(d / LOCK_NAME)
+        try:
+            if not lock.acquire(blocking=False):
+                continue
+        except OSError:
+            # 工作区正在被其所属的构建删除
+            continue
+        lock.release()
+        logging.info(f"删除残留的工作区 {d.name}")
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def active_since() -> Optional[float]:
+    """其他正在进行的构建中最早的开始时间，没有时返回 None。清理旧版本时不删除此后生成的结果。"""
+    root = _work_root()
+    if not root.exists():
+        return None
+    started = []
+    for d in root.iterdir():
+        if not d.is_dir() or d == config.WORK_DIR:
+            continue
+        lock = FileLock(d / LOCK_NAME)
+        try:
+            if lock.acquire(blocking=False):
+                lock.release()
+                continue
+            # .lock 在创建工作区时写入，之后不再修改
+            started.append((d / LOCK_NAME).stat().st_mtime)
+        except OSError:
+            continue
+    return min(started) if started else None
+
+
+class Workspace:
+    """
+    with workspace.create() as ws: ... 期间 config.TEMP_DIR、config.BUILD_DIR
+    和 config.WORK_DIR 指向本工作区。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.temp_dir = path / "temp"
+        self.build_dir = path / "build"
+        self.lock = FileLock(path / LOCK_NAME)
+        self._saved_temp_dir: Optional[Path] = None
+        self._saved_build_dir: Optional[Path] = None
+
+    def __enter__(self) -> "Workspace":
+        cfg = config.get()
+        self._saved_temp_dir = cfg.TEMP_DIR
+        self._saved_build_dir = cfg.BUILD_DIR
+        cfg.TEMP_DIR = self.temp_dir
+        cfg.BUILD_DIR = self.build_dir
+        cfg.WORK_DIR = self.path
+        return self
+
+    def __exit__(self, *exc):
+        cfg = config.get()
+        cfg.TEMP_DIR = self._saved_temp_dir
+        cfg.BUILD_DIR = self._saved_build_dir
+        cfg.WORK_DIR = None
+        self.lock.release()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def create() -> Workspace:
+    """清理残留的工作区并创建本次构建的工作区。"""
+    root = _work_root()
+    # 创建和清理互斥，避免刚创建、还没加锁的工作区被其他构建当作残留删除
+    with FileLock(root / LOCK_NAME):
+        clean_stale(root)
+        path = root / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        path.mkdir()
+        ws = Workspace(path)
+        ws.lock.acquire()
+    ws.temp_dir.mkdir()
+    logging.info(f"本次构建的工作区: {path}")
+    return ws
+
+
+def promote(src: Path, dst: Path):
+    """
+    把工作区中完成的目录或文件放到 dst，其他构建不会看到写了一半的内容。
+    文件和不存在的 dst 只需一次原子的重命名。dst 是已存在的目录时先把它移回工作区，
+    再放入新目录，两次重命名之间 dst 短暂不存在；读取方（上一个发布包、上一个发布目录）
+    要跳过不存在的路径或重新查找。
+    """
+    if dst.is_dir():
+        replaced = config.WORK_DIR / f"replaced-{dst.name}"
+        os.replace(dst, replaced)
+        os.replace(src, dst)
+        shutil.rmtree(replaced)
+    else:
+        os.replace(src, dst)
@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional
+
+from . import cache, config, zip_tools
+from .fileutil import link_or_copy
+from .zip_tools import Member
+
+BLOB_MAX_AGE = 30 * 24 * 3600
+"""超过这么久没有被使用的压缩块会在清理时删除（秒）"""
+
+LEVEL_COMMENT = b"level="
+"""deflate 成员的注释中记录的压缩级别，下一次增量压缩时据此判断能否复用"""
+
+
+def tag_level(info: zipfile.ZipInfo, level: int):
+    """在 deflate 成员的注释中记录压缩级别。"""
+    if info.compress_type == zipfile.ZIP_DEFLATED:
+        info.comment = LEVEL_COMMENT + str(level).encode()
+
+
+def member_level(info: zipfile.ZipInfo) -> Optional[int]:
+    """成员注释中记录的压缩级别，没有记录（旧版本生成的发布包）时返回 None。"""
+    if not info.comment.startswith(LEVEL_COMMENT):
+        return None
+    try:
+        return int(info.comment[len(LEVEL_COMMENT) :])
+    except ValueError:
+        return None
+
+
+class HashCache:
+    """
+    以 (键, 大小, 修改时间) 记录文件的 sha256，避免每次构建都重新读取不变的大文件。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.changed = False
+        try:
+            self.entries: Dict[str, list] = json.loads(
+                path.read_text(encoding="utf-8")
+            )
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def sha256(self, path: Path, key: str) -> str:
+        st = path.stat()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        digest = cache.sha256_file(path)
+        with self.lock:
+            self.entries[key] = [st.st_size, st.st_mtime_ns, digest]
+            self.changed = True
+        return digest
+
+    def remember(self, path: Path, key: str, digest: str):
+        """记录已知内容的文件（例如刚从哈希已知的文件复制而来），下次不再读取。"""
+        st = path.stat()
+        with self.lock:
+            self.entries[key] = [st.st_size, st.st_mtime_ns, digest]
+            self.changed = True
+
+    def forget(self, key: str):
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.entries), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.changed = False
+
+
+class StaticLayer:
+    """
+    静态资源（浏览器、配置文件等）的预压缩层。
+    每个文件按内容 sha256 和压缩级别保存一份压缩后的数据，
+    之后的发布包直接复制这些数据，不再重复压缩。
+    压缩数据按内容寻址，可以放在多个项目共用的目录中；
+    哈希缓存以项目内的相对路径为键，因此单独保存在各项目自己的缓存目录。
+    """
+
+    def __init__(self, root: Path, level: int, hashes_file: Optional[Path] = None):
+        self.root = root
+        self.level = level
+        self.hashes = HashCache(hashes_file or root / "hashes.json")
+        self.lock = threading.Lock()
+        self.reused_files = 0
+        self.reused_bytes = 0
+        self.compressed_files = 0
+        self.compressed_bytes = 0
+
+    def _blob_path(self, digest: str, variant: str) -> Path:
+        return self.root / "blobs" / digest[:2] / f"{digest}-{variant}"
+
+    def _load(self, path: Path, arcname: str, blob: Path) -> Member:
+        meta = json.loads(blob.with_suffix(".json").read_text(encoding="utf-8"))
+        data = blob.read_bytes()
+        info = zipfile.ZipInfo.from_file(path, arcname)
+        info.compress_type = meta["compress_type"]
+        info.CRC = meta["crc"]
+        info.file_size = meta["file_size"]
+        info.compress_size = len(data)
+        # 记录使用时间，供清理时判断
+        os.utime(blob)
+        return info, data
+
+    def _store(self, blob: Path, info: zipfile.ZipInfo, data: bytes):
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp_blob = blob.with_name(blob.name + suffix)
+        tmp_blob.write_bytes(data)
+        os.replace(tmp_blob, blob)
+        meta = blob.with_suffix(".json")
+        tmp_meta = meta.with_name(meta.name + suffix)
+        tmp_meta.write_text(
+            json.dumps(
+                {
+                    "compress_type": info.compress_type,
+                    "crc": info.CRC,
+                    "file_size": info.file_size,
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_meta, meta)
+
+    def member(
+        self,
+        path: Path,
+        arcname: str,
+        key: str,
+        compress_type: int = zipfile.ZIP_DEFLATED,
+        level: Optional[int] = None,
+    ) -> Member:
+        """返回 path 的压缩成员，层中已有相同内容和压缩方式的数据时直接复用。"""
+        level = self.level if level is None else level
+        digest = self.hashes.sha256(path, key)
+        variant = str(level) if compress_type == zipfile.ZIP_DEFLATED else "stored"
+        blob = self._blob_path(digest, variant)
+        if blob.exists() and blob.with_suffix(".json").exists():
+            try:
+                info, data = self._load(path, arcname, blob)
+            except (OSError, ValueError, KeyError) as e:
+                logging.info(f"警告: 预压缩数据 {blob.name} 损坏，重新压缩: {e}")
+            else:
+                with self.lock:
+                    self.reused_files += 1
+                    self.reused_bytes += info.file_size
+                return info, data
+
+        info, data = zip_tools.compress_file(path, arcname, level, compress_type)
+        if not info.is_dir():
+            self._store(blob, info, data)
+        with self.lock:
+            self.compressed_files += 1
+            self.compressed_bytes += info.file_size
+        return info, data
+
+    def finish(self):
+        """保存哈希缓存，清理长期未使用的压缩数据，并输出统计。"""
+        self.hashes.save()
+        self.prune()
+        if not self.reused_files and not self.compressed_files:
+            return
+        mb = 1024 * 1024
+        logging.info(
+            f"静态资源预压缩层: 复用 {self.reused_files} 个文件"
+            f" ({self.reused_bytes / mb:.1f} MB)，"
+            f"新压缩 {self.compressed_files} 个文件"
+            f" ({self.compressed_bytes / mb:.1f} MB)。"
+        )
+
+    def prune(self, max_age: float = BLOB_MAX_AGE):
+        blobs = self.root / "blobs"
+        if not blobs.exists():
+            return
+        deadline = time.time() - max_age
+        for meta in blobs.rglob("*.json"):
+            blob = meta.with_suffix("")
+            try:
+                if not blob.exists() or blob.stat().st_mtime < deadline:
+                    blob.unlink(missing_ok=True)
+                    meta.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+
+def open_layer(level: int) -> StaticLayer:
+    shared = config.SHARED_CACHE_DIR or config.CACHE_DIR
+    return StaticLayer(
+        shared / "zip_layer", level, config.CACHE_DIR / "zip_layer" / "hashes.json"
+    )
+
+
+class PreviousArchive:
+    """
+    上一个发布包。新发布目录中路径、大小和 CRC 都与其中成员一致的文件，
+    直接复制其原始压缩数据，不再重新压缩。
+    """
+
+    def __init__(self, zip_path: Path):
+        self.zip_path = zip_path
+        self.lock = threading.Lock()
+        self.reused_files = 0
+        self.reused_bytes = 0
+        self.members: Dict[str, zipfile.ZipInfo] = {}
+        with zipfile.ZipFile(zip_path) as zf:
+            for info in zf.infolist():
+                # 去掉顶层的 <APP>-<version>/ 目录，按发布目录内的相对路径匹配
+                _, _, rel = info.filename.partition("/")
+                if rel and not info.is_dir() and not info.flag_bits & 0x1:
+                    self.members[rel] = info
+
+    def member(
+        self,
+        path: Path,
+        arcname: str,
+        rel: str,
+        compress_type: Optional[int] = None,
+        level: Optional[int] = None,
+    ) -> Optional[Member]:
+        """
+        内容未变化时返回复用的成员，否则返回 None。
+        指定 compress_type 时，压缩方式不同的成员也不复用（压缩策略改变后生效）；
+        指定 level 时，压缩级别不同或未记录级别的 deflate 成员也不复用（压缩级别改变后生效）。
+        """
+        old = self.members.get(rel)
+        if old is None or old.file_size != path.stat().st_size:
+            return None
+        if compress_type is not None and old.compress_type != compress_type:
+            return None
+        if (
+            level is not None
+            and old.compress_type == zipfile.ZIP_DEFLATED
+            and member_level(old) != level
+        ):
+            return None
+        if zip_tools.file_crc32(path) != old.CRC:
+            return None
+        data = zip_tools.read_raw(self.zip_path, old)
+        info = zipfile.ZipInfo.from_file(path, arcname)
+        info.compress_type = old.compress_type
+        info.CRC = old.CRC
+        info.file_size = old.file_size
+        info.compress_size = old.compress_size
+        info.comment = old.comment
+        with self.lock:
+            self.reused_files += 1
+            self.reused_bytes += old.file_size
+        return info, data
+
+    def finish(self):
+        logging.info(
+            f"增量压缩: 从 {self.zip_path.name} 复用 {self.reused_files} 个文件"
+            f" ({self.reused_bytes / 1024 / 1024:.1f} MB)。"
+        )
+
+
+def find_previous_archive(exclude: Path) -> Optional[PreviousArchive]:
+    """
+    找到 releases 中最新的上一个发布包，没有或无法读取时返回 None。
+    查找之后被其他构建删除的发布包跳过，改用更早的一个。
+    """
+    candidates = []
+    for p in config.RELEASE_DIR.glob(f"{config.PROJECT_NAME}_v*.zip"):
+        if p == exclude:
+            continue
+        try:
+            candidates.append((p.stat().st_mtime, p))
+        except FileNotFoundError:
+            continue
+    for _, latest in sorted(candidates, reverse=True):
+        try:
+            if config.WORK_DIR:
+                # 链接到工作区，压缩期间被其他构建的清理删除也不受影响
+                pinned = config.WORK_DIR / latest.name
+                link_or_copy(latest, pinned)
+                latest = pinned
+            return PreviousArchive(latest)
+        except FileNotFoundError:
+            continue
+        except (OSError, zipfile.BadZipFile) as e:
+            logging.info(f"警告: 无法读取上一个发布包 {latest.name}，将完整压缩: {e}")
+            return None
+    return None
+    latest = max(candidates, key=lambda p: p.stat().st_mtime)
+    try:
+        if config.WORK_DIR:
+            # 链接到工作区，压缩期间被其他构建的清理删除也不受影响
+            pinned = config.WORK_DIR / latest.name
+            link_or_copy(latest, pinned)
+            latest = pinned
+        return PreviousArchive(latest)
+    except (OSError, zipfile.BadZipFile) as e:
+        logging.info(f"警告: 无法读取上一个发布包 {latest.name}，将完整压缩: {e}")
+        return None
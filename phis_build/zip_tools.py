@@ -0,0 +1,141 @@
+import os
+import struct
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple
+
+Member = Tuple[zipfile.ZipInfo, bytes]
+"""(ZipInfo, 已压缩的数据)，ZipInfo 中的 CRC 和大小均已填好"""
+
+READ_CHUNK = 1024 * 1024
+
+
+def default_workers() -> int:
+    """默认压缩线程数：CPU 核数。"""
+    return os.cpu_count() or 1
+
+
+def compress_file(
+    path: Path,
+    arcname: str,
+    level: int = 6,
+    compress_type: int = zipfile.ZIP_DEFLATED,
+) -> Member:
+    """
+    读取并压缩单个文件（或目录条目），返回可直接写入归档的成员。
+    compress_type 为 ZIP_STORED 时只计算 CRC，原样保存。
+    zlib 在压缩时会释放 GIL，因此可以放在线程池中并行执行。
+    """
+    info = zipfile.ZipInfo.from_file(path, arcname)
+    if info.is_dir():
+        info.compress_type = zipfile.ZIP_STORED
+        info.CRC = 0
+        info.file_size = info.compress_size = 0
+        return info, b""
+
+    info.compress_type = compress_type
+    compressor = (
+        zlib.compressobj(level, zlib.DEFLATED, -15)
+        if compress_type == zipfile.ZIP_DEFLATED
+        else None
+    )
+    crc = 0
+    size = 0
+    chunks = []
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            chunks.append(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        chunks.append(compressor.flush())
+    data = b"".join(chunks)
+
+    info.CRC = crc
+    info.file_size = size
+    info.compress_size = len(data)
+    return info, data
+
+
+def read_raw(zip_path: Path, info: zipfile.ZipInfo) -> bytes:
+    """
+    从已有归档中读取成员的原始压缩数据（不解压）。
+    info 应来自该归档的中央目录，例如 ZipFile(zip_path).infolist()。
+    """
+    with open(zip_path, "rb") as f:
+        f.seek(info.header_offset)
+        header = f.read(zipfile.sizeFileHeader)
+        if (
+            len(header) != zipfile.sizeFileHeader
+            or header[:4] != zipfile.stringFileHeader
+        ):
+            raise zipfile.BadZipFile(f"{info.filename} 的本地文件头无效")
+        # 本地文件头中文件名长度和扩展字段长度位于最后两个字段
+        name_len, extra_len = struct.unpack(zipfile.structFileHeader, header)[-2:]
+        f.seek(name_len + extra_len, os.SEEK_CUR)
+        data = f.read(info.compress_size)
+    if len(data) != info.compress_size:
+        raise zipfile.BadZipFile(f"{info.filename} 的数据不完整")
+    return data
+
+
+def file_crc32(path: Path) -> int:
+    """计算文件的 CRC32，与 zip 中记录的 CRC 比较用。"""
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def write_raw(zf: zipfile.ZipFile, info: zipfile.ZipInfo, data: bytes):
+    """
+    将已压缩好的成员原样写入 zf，不再经过压缩器。
+    info 的 CRC、file_size、compress_size 必须与 data 一致。
+    """
+    # 数据长度已知，不需要数据描述符
+    info.flag_bits &= ~0x08
+    if not info.external_attr:
+        info.external_attr = 0o600 << 16
+    info.header_offset = zf.fp.tell()
+    zf._writecheck(info)
+    zf._didModify = True
+    zf.fp.write(info.FileHeader())
+    zf.fp.write(data)
+    zf.filelist.append(info)
+    zf.NameToInfo[info.filename] = info
+    zf.start_dir = zf.fp.tell()
+
+
+def write_members(
+    zf: zipfile.ZipFile,
+    jobs: Iterable[Callable[[], Member]],
+    workers: Optional[int] = None,
+) -> int:
+    """
+    在线程池中执行 jobs（每个 job 返回一个成员），并按 jobs 的顺序写入 zf。
+    同时在途的成员数量有上限，避免一次性把整个目录读进内存。
+    返回写入的成员数量。
+    """
+    workers = max(1, workers or default_workers())
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for job in jobs:
+            pending.append(executor.submit(job))
+            if len(pending) >= workers * 2:
+                write_raw(zf, *pending.popleft().result())
+                count += 1
+        while pending:
+            write_raw(zf, *pending.popleft().result())
+            count += 1
+    return count
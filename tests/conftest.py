@@ -0,0 +1,18 @@
+from pathlib import Path
+
+import pytest
+
+from phis_build import config
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> config.Config:
+    """tmp_path 下的一个最小项目，测试期间作为当前配置。"""
+    root = tmp_path / "proj"
+    root.mkdir()
+    cfg = config.Config(
+        root, {"project_name": "Demo", "share_path": str(tmp_path / "share")}
+    )
+    config.use(cfg)
+    yield cfg
+    config.use(None)
@@ -0,0 +1,33 @@
+import zipfile
+
+from phis_build.build_zipapp import ZIP_EPOCH, write_pyz
+
+
+def _sources(root):
+    (root / "pkg").mkdir()
+    (root / "pkg" / "__init__.py").write_text("", encoding="utf-8")
+    (root / "pkg" / "mod.py").write_text("VALUE = 1\n" * 100, encoding="utf-8")
+    (root / "__main__.py").write_text("import pkg.mod\n", encoding="utf-8")
+    return [
+        ("__main__.py", root / "__main__.py"),
+        ("pkg/mod.py", root / "pkg" / "mod.py"),
+        ("pkg/__init__.py", root / "pkg" / "__init__.py"),
+    ]
+
+
+def test_write_pyz_is_reproducible(tmp_path):
+    entries = _sources(tmp_path)
+    first = tmp_path / "a" / "app.pyz"
+    second = tmp_path / "b" / "app.pyz"
+    write_pyz(entries, first, interpreter="/usr/bin/env python3")
+    # 修改时间和条目顺序不应影响结果
+    for _, path in entries:
+        path.touch()
+    write_pyz(list(reversed(entries)), second, interpreter="/usr/bin/env python3")
+
+    assert first.read_bytes() == second.read_bytes()
+    assert first.read_bytes().startswith(b"#!/usr/bin/env python3\n")
+    with zipfile.ZipFile(first) as zf:
+        assert zf.namelist() == ["pkg/", "__main__.py", "pkg/__init__.py", "pkg/mod.py"]
+        assert all(i.date_time == ZIP_EPOCH for i in zf.infolist())
+
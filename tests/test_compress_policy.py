@@ -0,0 +1,73 @@
+import os
+import zipfile
+
+import pytest
+
+from phis_build import compress_policy
+from phis_build.compress_policy import CompressionPolicy, Rule, display_width
+
+
+@pytest.fixture
+def policy(project):
+    project.ZIP_RULES = [
+        {"name": "日志", "patterns": ["logs/*.txt"], "method": "stored"},
+        {"name": "资源", "pattern": "*.pak", "method": "auto", "level": 9},
+    ]
+    return compress_policy.load_policy(6)
+
+
+def test_rule_order(policy):
+    # 用户规则优先于内置规则；含 / 的模式匹配相对路径
+    assert policy.rule_for("logs/a.txt").name == "日志"
+    assert policy.rule_for("a.txt").name == "脚本和文本"
+    assert policy.rule_for("BIN/resources.pak").name == "资源"
+    assert policy.rule_for("BIN/icon.PNG").name == "其他 (auto)"
+    assert policy.rule_for("BIN/icon.png").name == "已压缩格式"
+
+
+def test_decide_fixed_methods(tmp_path, policy):
+    f = tmp_path / "x"
+    f.write_bytes(b"x" * 1000)
+    assert policy.decide(f, "logs/a.txt")[0] == zipfile.ZIP_STORED
+    assert policy.decide(f, "a.png")[0] == zipfile.ZIP_STORED
+    assert policy.decide(f, "main.py")[:2] == (zipfile.ZIP_DEFLATED, 6)
+
+
+def test_decide_auto_samples(tmp_path, policy):
+    text = tmp_path / "text.pak"
+    text.write_bytes(b"compressible " * 10000)
+    noise = tmp_path / "noise.pak"
+    noise.write_bytes(os.urandom(100_000))
+    empty = tmp_path / "empty.dll"
+    empty.write_bytes(b"")
+
+    assert policy.decide(text, "text.pak")[:2] == (zipfile.ZIP_DEFLATED, 9)
+    assert policy.decide(noise, "noise.pak")[0] == zipfile.ZIP_STORED
+    assert policy.decide(empty, "empty.dll")[0] == zipfile.ZIP_STORED
+
+
+def test_level_zero_stores_everything(tmp_path):
+    policy = CompressionPolicy([Rule("文本", ["*.txt"], "deflated")], level=0)
+    f = tmp_path / "a.txt"
+    f.write_bytes(b"a" * 1000)
+    assert policy.decide(f, "a.txt")[0] == zipfile.ZIP_STORED
+
+
+def test_invalid_rule_is_ignored(project):
+    project.ZIP_RULES = [{"name": "坏规则", "patterns": ["*"], "method": "lzma"}]
+    policy = compress_policy.load_policy(6)
+    assert all(r.name != "坏规则" for r in policy.rules)
+
+
+def test_report_columns_line_up():
+    policy = CompressionPolicy([], level=6)
+    info = zipfile.ZipInfo("a.txt")
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.file_size = 3 * 1024 * 1024
+    info.compress_size = 1024 * 1024
+    policy.record(policy.fallback, info)
+
+    header, row = policy.report().splitlines()
+    assert display_width(header) == display_width(row)
+    assert display_width(row) == len(row) + 2  # 规则名“其他”的两个字各占两列
+    assert row.endswith("33.3%")
@@ -0,0 +1,81 @@
+import os
+
+from phis_build import delta
+from phis_build.cache import sha256_file
+
+
+def _write(root, rel, data: bytes):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_diff_dirs(tmp_path):
+    old = tmp_path / "Demo-2025.1.1.0"
+    new = tmp_path / "Demo-2025.1.1.1"
+    _write(old, "same.txt", b"same")
+    _write(new, "same.txt", b"same")
+    _write(old, "BIN/changed.dll", b"v1")
+    changed = _write(new, "BIN/changed.dll", b"v2")
+    added = _write(new, "BIN/added.dll", b"new")
+    removed = _write(old, "old.txt", b"old")
+    # 版本标记不参与比较
+    _write(old, delta.MARKER_NAME, b"2025.1.1.0")
+    _write(new, delta.MARKER_NAME, b"2025.1.1.1")
+
+    changes, deleted = delta.diff_dirs(old, new)
+
+    assert changes == [
+        {"path": "BIN/added.dll", "sha256": sha256_file(added), "base_sha256": None},
+        {
+            "path": "BIN/changed.dll",
+            "sha256": sha256_file(changed),
+            "base_sha256": sha256_file(old / "BIN/changed.dll"),
+        },
+    ]
+    assert deleted == [{"path": "old.txt", "base_sha256": sha256_file(removed)}]
+
+
+def test_diff_dirs_hardlinked_files_are_unchanged(tmp_path):
+    old = tmp_path / "old"
+    new = tmp_path / "new"
+    source = _write(old, "BIN/big.dll", b"x" * 1000)
+    (new / "BIN").mkdir(parents=True)
+    os.link(source, new / "BIN" / "big.dll")
+    assert delta.diff_dirs(old, new) == ([], [])
+
+
+def test_find_previous_release_same_channel(project):
+    for version in ("2025.1.1.0", "2025.1.2.0b", "2025.1.2.1", "2025.1.3.0"):
+        (project.RELEASE_DIR / f"Demo-{version}").mkdir(parents=True)
+    (project.RELEASE_DIR / "Demo-broken").mkdir()
+
+    target = project.RELEASE_DIR / "Demo-2025.1.2.5"
+    assert delta.find_previous_release(target, "2025.1.2.5") == (
+        project.RELEASE_DIR / "Demo-2025.1.2.1",
+        "2025.1.2.1",
+    )
+    assert delta.find_previous_release(target, "2025.1.3.0b")[1] == "2025.1.2.0b"
+    assert delta.find_previous_release(target, "2025.1.1.0") is None
+
+
+def test_make_delta_retries_when_previous_release_is_replaced(project, monkeypatch):
+    old = project.RELEASE_DIR / "Demo-2025.1.1.0"
+    new = project.RELEASE_DIR / "Demo-2025.1.2.0"
+    _write(old, "app.exe", b"old")
+    _write(new, "app.exe", b"new")
+
+    diff_dirs = delta.diff_dirs
+    calls = []
+
+    def replaced_once(old_dir, new_dir):
+        calls.append(old_dir)
+        if len(calls) == 1:
+            raise FileNotFoundError(old_dir / "app.exe")
+        return diff_dirs(old_dir, new_dir)
+
+    monkeypatch.setattr(delta, "diff_dirs", replaced_once)
+    delta_path = delta.make_delta(new, "2025.1.2.0")
+    assert delta_path.name == "Demo_delta_2025.1.1.0_to_2025.1.2.0.zip"
+    assert len(calls) == 2
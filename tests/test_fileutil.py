@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from phis_build import build_steps, config
+from phis_build.fileutil import StageStats, stage_file, stage_tree
+
+
+@pytest.fixture
+def tree(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.txt").write_bytes(b"a" * 100)
+    (src / "sub" / "b.txt").write_bytes(b"b" * 200)
+    return src
+
+
+def _same_inode(a, b):
+    return os.stat(a).st_ino == os.stat(b).st_ino
+
+
+def test_stage_tree_hardlink(tmp_path, tree):
+    stats = stage_tree(tree, tmp_path / "dst", "hardlink")
+    assert stats.files == 2
+    assert stats.linked_bytes == 300
+    assert _same_inode(tree / "sub" / "b.txt", tmp_path / "dst" / "sub" / "b.txt")
+
+
+@pytest.mark.parametrize("mode", ["reflink", "copy"])
+def test_stage_tree_never_links(tmp_path, tree, mode):
+    stats = stage_tree(tree, tmp_path / "dst", mode)
+    assert stats.linked_bytes == 0
+    assert stats.copied_bytes + stats.cloned_bytes == 300
+    dst = tmp_path / "dst" / "a.txt"
+    assert not _same_inode(tree / "a.txt", dst)
+    dst.write_bytes(b"changed")
+    assert (tree / "a.txt").read_bytes() == b"a" * 100
+
+
+def test_stage_file_replaces_existing(tmp_path, tree):
+    dst = tmp_path / "a.txt"
+    dst.write_bytes(b"old")
+    stats = StageStats()
+    assert stage_file(tree / "a.txt", dst, "copy", stats) == "copy"
+    assert dst.read_bytes() == b"a" * 100
+    assert stats.copied_bytes == 100
+
+
+def test_release_dir_does_not_share_project_files(project, monkeypatch):
+    project.RELEASE_STORE = False
+    project.DELTA_ENABLED = False
+    project.WORK_DIR = project.RELEASE_DIR / ".work" / "test"
+    project.WORK_DIR.mkdir(parents=True)
+    profile = project.浏览器配置文件
+    profile.mkdir()
+    (profile / "prefs.json").write_text("{}", encoding="utf-8")
+
+    build_steps.copy_dirs()
+    staged = config.TEMP_DIR / profile.name / "prefs.json"
+    # 暂存目录可以硬链接项目中的文件
+    assert staged.read_text(encoding="utf-8") == "{}"
+
+    release = build_steps.copy_to_release_dir("2025.1.1.0")
+    released = release / profile.name / "prefs.json"
+    assert not _same_inode(profile / "prefs.json", released)
+    released.write_text('{"edited": true}', encoding="utf-8")
+    assert (profile / "prefs.json").read_text(encoding="utf-8") == "{}"
@@ -0,0 +1,66 @@
+import ast
+
+import pytest
+
+from phis_build import config, import_graph
+
+
+def _analysis_excludes(path):
+    call = import_graph._find_analysis(ast.parse(path.read_bytes()))
+    keyword = next(k for k in call.keywords if k.arg == "excludes")
+    return ast.literal_eval(keyword.value)
+
+
+def test_write_shaken_spec_merges_excludes(project):
+    project.SPEC_FILE.write_text(
+        config.SPEC_TEMPLATE.format(PROJECT_NAME="演示").replace(
+            "excludes=[]", "excludes=['tkinter']"
+        ),
+        encoding="utf-8",
+    )
+    shaken = import_graph.write_shaken_spec(["tools.debug", "tkinter"])
+
+    assert shaken.name == "Demo.shaken.spec"
+    assert _analysis_excludes(shaken) == ["tkinter", "tools.debug"]
+    # 其余内容保持不变（包括中文入口脚本名）
+    text = shaken.read_text(encoding="utf-8")
+    assert "['演示.py']" in text
+    assert text.splitlines()[0].startswith("# 由 phis_build 根据 Demo.spec 生成")
+    assert project.SPEC_FILE.read_text(encoding="utf-8").count("excludes=['tkinter']")
+
+
+def test_write_shaken_spec_adds_keyword(project):
+    project.SPEC_FILE.write_text(
+        "# 注释\na = Analysis(\n    ['主程序.py'],\n    pathex=[],\n)\n",
+        encoding="utf-8",
+    )
+    shaken = import_graph.write_shaken_spec(["b", "a"])
+    assert _analysis_excludes(shaken) == ["a", "b"]
+
+
+def test_write_shaken_spec_rejects_dynamic_excludes(project):
+    project.SPEC_FILE.write_text(
+        "a = Analysis(['main.py'], excludes=EXCLUDES)\n", encoding="utf-8"
+    )
+    with pytest.raises(ValueError):
+        import_graph.write_shaken_spec(["x"])
+
+
+def test_exe_excludes(project):
+    root = project.PROJECT_ROOT
+    project.SPEC_FILE.write_text(
+        config.SPEC_TEMPLATE.format(PROJECT_NAME="Demo"), encoding="utf-8"
+    )
+    (root / "Demo.py").write_text("from app import core\n", encoding="utf-8")
+    (root / "app").mkdir()
+    (root / "app" / "__init__.py").write_text("", encoding="utf-8")
+    (root / "app" / "core.py").write_text("from . import util\n", encoding="utf-8")
+    (root / "app" / "util.py").write_text("", encoding="utf-8")
+    (root / "app" / "unused.py").write_text("", encoding="utf-8")
+    (root / "scratch.py").write_text("import app.unused\n", encoding="utf-8")
+    project.SHAKE_EXCLUDES = ["pytest"]
+
+    excludes, graph, unreachable = import_graph.exe_excludes()
+
+    assert unreachable == ["app.unused", "scratch"]
+    assert excludes == ["app.unused", "pytest", "scratch"]
@@ -0,0 +1,78 @@
+import logging
+import os
+import random
+import zipfile
+
+import pytest
+
+from phis_build import build_steps, zip_layer
+
+
+@pytest.fixture
+def release(project):
+    project.ZIP_STATIC_LAYER = False
+    project.WORK_DIR = project.RELEASE_DIR / ".work" / "test"
+    project.WORK_DIR.mkdir(parents=True)
+    target = project.RELEASE_DIR / "Demo-1"
+    target.mkdir()
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(500)]
+    (target / "data.txt").write_text(
+        " ".join(rng.choice(words) for _ in range(50_000)), encoding="utf-8"
+    )
+    return target
+
+
+def _members(zip_path):
+    with zipfile.ZipFile(zip_path) as zf:
+        return {i.filename.partition("/")[2]: i for i in zf.infolist()}
+
+
+def test_level_change_recompresses(release, caplog):
+    caplog.set_level(logging.INFO)
+    first = _members(build_steps.make_zip(release, "1", workers=1, level=1))
+    assert zip_layer.member_level(first["data.txt"]) == 1
+
+    caplog.clear()
+    second = _members(build_steps.make_zip(release, "2", workers=1, level=9))
+    assert zip_layer.member_level(second["data.txt"]) == 9
+    assert second["data.txt"].compress_size < first["data.txt"].compress_size
+    assert "复用 0 个文件" in caplog.text
+
+    # 级别不变时复用上一个发布包的压缩数据
+    caplog.clear()
+    third = _members(build_steps.make_zip(release, "3", workers=1, level=9))
+    assert "复用 1 个文件" in caplog.text
+    assert third["data.txt"].compress_size == second["data.txt"].compress_size
+    assert zip_layer.member_level(third["data.txt"]) == 9
+
+
+def test_members_without_level_are_not_reused(tmp_path):
+    src = tmp_path / "a.txt"
+    src.write_bytes(b"abc" * 1000)
+    old = tmp_path / "Demo_v1.zip"
+    with zipfile.ZipFile(old, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(src, "Demo-1/a.txt")
+    previous = zip_layer.PreviousArchive(old)
+    assert previous.member(src, "Demo-2/a.txt", "a.txt", None, 6) is None
+    assert previous.member(src, "Demo-2/a.txt", "a.txt") is not None
+
+
+def test_previous_archive_skips_deleted_release(release, monkeypatch):
+    older = build_steps.make_zip(release, "1")
+    newer = older.with_name("Demo_v2.zip")
+    newer.write_bytes(older.read_bytes())
+    os.utime(older, (1, 1))
+
+    link_or_copy = zip_layer.link_or_copy
+
+    def deleted_newer(src, dst):
+        # 模拟查找之后最新的发布包被其他构建的清理删除
+        if src == newer:
+            raise FileNotFoundError(src)
+        link_or_copy(src, dst)
+
+    monkeypatch.setattr(zip_layer, "link_or_copy", deleted_newer)
+    previous = zip_layer.find_previous_archive(exclude=release / "none.zip")
+    assert previous is not None
+    assert previous.zip_path.name == older.name
@@ -0,0 +1,78 @@
+import logging
+
+from phis_build import metrics
+from phis_build.tracing import Span, Tracer
+
+
+def _tracer(**steps) -> Tracer:
+    """steps: {步骤名: (耗时, {数值})}"""
+    tracer = Tracer()
+    for name, (wall, args) in steps.items():
+        span = Span(name, tracer.origin)
+        span.wall = wall
+        span.set(**args)
+        tracer.spans.append(span)
+    return tracer
+
+
+def _record(wall=10.0, artifact=1000, speed=50.0, short=0.1, ok=True, build_type="exe"):
+    tracer = _tracer(
+        pyinstaller=(wall, {"artifact_bytes": artifact, "mode": "onefile"}),
+        upload=(2.0, {"mb_per_s": speed}),
+        version=(short, {}),
+    )
+    return metrics.record(tracer, build_type, ok)
+
+
+def test_no_regressions_without_baseline(project):
+    _record()
+    _record()
+    build_id = _record(wall=100.0)
+    assert metrics.find_regressions(build_id, "exe") == []
+
+
+def test_find_regressions(project):
+    for _ in range(3):
+        _record()
+    # 失败的构建和其他类型的构建不计入基线
+    _record(wall=1.0, ok=False)
+    _record(wall=1.0, build_type="pyz")
+    build_id = _record(wall=15.0, artifact=1100, speed=20.0, short=0.5)
+
+    found = metrics.find_regressions(build_id, "exe")
+    keys = sorted(r.split(":")[0] for r in found)
+    # 产物大小 +10% 在阈值内；很短的步骤不比较
+    assert keys == ["pyinstaller", "total", "upload.mb_per_s"]
+
+
+def test_improvements_are_not_regressions(project):
+    for _ in range(3):
+        _record()
+    build_id = _record(wall=5.0, artifact=500, speed=100.0)
+    assert metrics.find_regressions(build_id, "exe") == []
+
+
+def test_record_and_check_warns(project, caplog):
+    for _ in range(3):
+        _record()
+    tracer = _tracer(pyinstaller=(20.0, {"artifact_bytes": 1000}))
+    with caplog.at_level(logging.WARNING):
+        metrics.record_and_check(tracer, "exe", True)
+    assert "pyinstaller" in caplog.text
+
+
+def test_record_and_check_never_raises(project, caplog):
+    # 缓存目录无法创建（例如同名文件已存在）时只警告
+    project.PROJECT_ROOT.joinpath(".phis_cache").write_text("", encoding="utf-8")
+    with caplog.at_level(logging.WARNING):
+        metrics.record_and_check(_tracer(pyinstaller=(1.0, {})), "exe", True)
+    assert "写入构建指标失败" in caplog.text
+
+
+def test_report(project):
+    assert metrics.report() == "还没有构建记录。"
+    for wall in (10.0, 12.0, 11.0):
+        _record(wall=wall)
+    text = metrics.report()
+    assert "exe 构建的趋势（最近 3 次成功构建" in text
+    assert "pyinstaller.artifact_bytes" in text
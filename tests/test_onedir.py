@@ -0,0 +1,91 @@
+import ast
+
+import pytest
+
+from phis_build import build_steps, config, onedir
+
+
+def _calls(source):
+    tree = ast.parse(source)
+    return {
+        node.func.id: node
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+    }
+
+
+def _keywords(call):
+    return {k.arg: ast.unparse(k.value) for k in call.keywords}
+
+
+def test_to_onedir(project):
+    source = config.SPEC_TEMPLATE.format(PROJECT_NAME="Demo")
+    result = onedir.to_onedir(source)
+    calls = _calls(result)
+
+    exe = calls["EXE"]
+    assert [ast.unparse(a) for a in exe.args] == ["pyz", "a.scripts", "[]"]
+    exe_kw = _keywords(exe)
+    assert exe_kw["exclude_binaries"] == "True"
+    assert exe_kw["upx_exclude"] == "_upx_exclude"
+    assert exe_kw["name"] == "'Demo'"
+    assert exe_kw["console"] == "True"
+
+    collect = calls["COLLECT"]
+    assert [ast.unparse(a) for a in collect.args] == [
+        "exe",
+        "a.binaries",
+        "a.datas",
+    ]
+    assert _keywords(collect) == {
+        "strip": "False",
+        "upx": "True",
+        "upx_exclude": "_upx_exclude",
+        "name": "'Demo'",
+    }
+    # Analysis 等其余内容保持不变
+    assert result.startswith(source[: source.index("exe = EXE(")])
+    assert "_upx_patterns = [" in result
+
+
+def test_to_onedir_keeps_existing_onedir_spec(project):
+    source = onedir.to_onedir(config.SPEC_TEMPLATE.format(PROJECT_NAME="Demo"))
+    assert onedir.to_onedir(source) == source
+
+
+def test_to_onedir_upx_exclude_patterns(project):
+    project.EXE_UPX_EXCLUDE = ["Big*.DLL"]
+    result = onedir.to_onedir(config.SPEC_TEMPLATE.format(PROJECT_NAME="Demo"))
+    code = result[result.index("# 由 phis_build 添加") : result.index("exe = EXE(")]
+
+    class Analysis:
+        binaries = [
+            ("BigLib.dll", "x", "BINARY"),
+            ("vcruntime140.dll", "x", "BINARY"),
+            ("other.dll", "x", "BINARY"),
+        ]
+
+    namespace = {"a": Analysis}
+    exec(code, namespace)
+    assert namespace["_upx_exclude"] == ["BigLib.dll", "vcruntime140.dll"]
+
+
+def test_to_onedir_without_exe():
+    with pytest.raises(ValueError):
+        onedir.to_onedir("a = Analysis(['main.py'])\n")
+
+
+def test_rename_executable_onedir(project):
+    output = project.TEMP_DIR / "Demo"
+    (output / "_internal").mkdir(parents=True)
+    (output / "Demo.exe").write_bytes(b"MZ")
+    build_steps.rename_executable("2025.1.1.0", mode="onedir")
+    assert (project.TEMP_DIR / "Demo_v2025.1.1.0.exe").exists()
+    assert (project.TEMP_DIR / "_internal").is_dir()
+    assert not output.exists()
+
+
+def test_rename_executable_onedir_missing_output(project):
+    project.TEMP_DIR.mkdir(parents=True)
+    with pytest.raises(FileNotFoundError):
+        build_steps.rename_executable("2025.1.1.0", mode="onedir")
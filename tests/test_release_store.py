@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from phis_build import build_steps, release_store
+
+
+@pytest.fixture
+def store(project):
+    return release_store.open_store()
+
+
+@pytest.fixture
+def staged(tmp_path):
+    src = tmp_path / "temp"
+    (src / "BIN").mkdir(parents=True)
+    (src / "配置文件").mkdir()
+    (src / "BIN" / "chrome.dll").write_bytes(b"dll" * 1000)
+    (src / "BIN" / "copy.dll").write_bytes(b"dll" * 1000)
+    (src / "配置文件" / "Preferences").write_bytes(b"{}")
+    return src
+
+
+def _nlink(path):
+    return os.stat(path).st_nlink
+
+
+def test_materialize_links_identical_files(project, store, staged):
+    v1 = project.RELEASE_DIR / "Demo-1"
+    stats = store.materialize(staged, v1)
+    assert stats.files == 3
+    # 内容相同的两个文件共用一个对象
+    assert os.stat(v1 / "BIN" / "chrome.dll").st_ino == os.stat(v1 / "BIN" / "copy.dll").st_ino
+    assert len(list(store.objects.glob("*/*"))) == 2
+
+
+def test_copy_dirs_are_not_linked(project, store, staged):
+    v1 = project.RELEASE_DIR / "Demo-1"
+    v2 = project.RELEASE_DIR / "Demo-2"
+    store.materialize(staged, v1, ["配置文件"])
+    store.materialize(staged, v2, ["配置文件"])
+
+    assert _nlink(v1 / "配置文件" / "Preferences") == 1
+    (v1 / "配置文件" / "Preferences").write_bytes(b'{"edited": true}')
+    assert (v2 / "配置文件" / "Preferences").read_bytes() == b"{}"
+    assert len(list(store.objects.glob("*/*"))) == 1
+
+
+def test_modified_object_is_not_reused(project, store, staged):
+    v1 = project.RELEASE_DIR / "Demo-1"
+    store.materialize(staged, v1)
+    # 通过版本目录中的硬链接原地修改，仓库对象随之改变
+    with open(v1 / "BIN" / "chrome.dll", "r+b") as f:
+        f.write(b"DLL")
+
+    v2 = project.RELEASE_DIR / "Demo-2"
+    store.materialize(staged, v2)
+    assert (v2 / "BIN" / "chrome.dll").read_bytes() == b"dll" * 1000
+    assert (v2 / "BIN" / "copy.dll").read_bytes() == b"dll" * 1000
+
+
+def test_gc(project, store, staged):
+    v1 = project.RELEASE_DIR / "Demo-1"
+    v2 = project.RELEASE_DIR / "Demo-2"
+    store.materialize(staged, v1)
+    (staged / "BIN" / "new.dll").write_bytes(b"new")
+    store.materialize(staged, v2)
+    (store.objects / "ab").mkdir(exist_ok=True)
+    (store.objects / "ab" / "abcd.1.2.tmp").write_bytes(b"partial")
+
+    assert store.gc() == (1, len(b"partial"))
+    assert len(list(store.objects.glob("*/*"))) == 3
+
+    for d in (v2 / "BIN" / "new.dll",):
+        d.unlink()
+    assert store.gc() == (1, 3)
+    # 仍被 v1 引用的对象保留
+    assert (v1 / "BIN" / "chrome.dll").read_bytes() == b"dll" * 1000
+    assert len(list(store.objects.glob("*/*"))) == 2
+
+
+def test_clean_old_releases_skips_gc_without_store(project, store, staged, monkeypatch):
+    store.materialize(staged, project.RELEASE_DIR / "Demo-1")
+    project.RELEASE_STORE = False
+    monkeypatch.setattr(
+        release_store.ReleaseStore, "gc", lambda self: pytest.fail("gc 不应被调用")
+    )
+    build_steps.clean_old_releases(keep=0)
+    assert not (project.RELEASE_DIR / "Demo-1").exists()
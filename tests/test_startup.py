@@ -0,0 +1,48 @@
+import subprocess
+import sys
+
+import pytest
+
+from phis_build.args import Args
+
+# 只在构建/打包函数中导入的模块，仅复制 (--copy) 时不应加载
+LAZY_MODULES = [
+    "delta",
+    "import_graph",
+    "onedir",
+    "release_store",
+    "share_probe",
+    "compress_policy",
+    "zip_layer",
+    "workspace",
+    "tracing",
+    "transfer",
+]
+
+
+def test_build_steps_defers_heavy_imports():
+    # 其他测试已经导入过这些模块，需要在新的解释器中检查
+    code = (
+        "import sys, phis_build.build_steps\n"
+        "print(' '.join(m for m in sys.modules if m.startswith('phis_build.')))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.split()
+    assert not [m for m in out if m.split(".", 1)[1] in LAZY_MODULES]
+
+
+def test_args_does_not_import_pydantic():
+    code = "import sys, phis_build.args; print('pydantic' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert out.strip() == "False"
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"zip_level": 10}, {"zip_level": -1}, {"stats": 0}, {"jobs": 0}]
+)
+def test_args_rejects_out_of_range(kwargs):
+    with pytest.raises(ValueError):
+        Args(**kwargs)
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from phis_build import sync
+
+
+def _src(sha, size=10, mtime=1000.0):
+    return {"size": size, "mtime": mtime, "sha256": sha}
+
+
+def test_plan_sync_with_manifest():
+    source = {"same": _src("1"), "changed": _src("2"), "new": _src("3")}
+    recorded = {"same": _src("1"), "changed": _src("old"), "gone": _src("4")}
+    actual = {"same": (10, 1000.0), "changed": (10, 1000.0), "gone": (10, 1000.0)}
+
+    to_copy, to_delete = sync.plan_sync(source, recorded, actual)
+
+    assert sorted(to_copy) == ["changed", "new"]
+    assert to_delete == ["gone"]
+
+
+def test_plan_sync_detects_edits_on_share():
+    source = {"f": _src("1")}
+    recorded = {"f": _src("1")}
+    # 同步后共享目录中的文件被改动过（大小或时间不同）
+    assert sync.plan_sync(source, recorded, {"f": (11, 1000.0)})[0] == ["f"]
+    assert sync.plan_sync(source, recorded, {"f": (10, 1100.0)})[0] == ["f"]
+    # 时间误差在 FAT/SMB 精度以内视为一致
+    assert sync.plan_sync(source, recorded, {"f": (10, 1001.0)})[0] == []
+
+
+def test_plan_sync_without_manifest():
+    source = {"a": _src("1"), "b": _src("2")}
+    actual = {"a": (10, 1000.0), "b": (10, 900.0), "extra": (1, 0.0)}
+
+    to_copy, to_delete = sync.plan_sync(source, {}, actual)
+
+    assert to_copy == ["b"]
+    assert to_delete == ["extra"]
+
+
+def test_plan_sync_missing_file_is_copied_even_if_recorded():
+    source = {"a": _src("1")}
+    assert sync.plan_sync(source, {"a": _src("1")}, {}) == (["a"], [])
+
+
+def test_manifest_round_trip(tmp_path):
+    src = tmp_path / "src"
+    (src / "d").mkdir(parents=True)
+    (src / "d" / "x.txt").write_text("x", encoding="utf-8")
+    manifest = sync.build_manifest(src)
+    assert list(manifest) == ["d/x.txt"]
+
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    sync.save_manifest(dest, manifest)
+    assert sync.load_manifest(dest) == manifest
+    assert sync.scan_dir(dest) == {}
+
+
+def test_record_file_keeps_concurrent_entries(tmp_path):
+    share = tmp_path / "share"
+    share.mkdir()
+    files = []
+    for i in range(16):
+        f = tmp_path / f"Demo_v{i}.zip"
+        f.write_bytes(b"x" * i)
+        (share / f.name).write_bytes(f.read_bytes())
+        files.append(f)
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda f: sync.record_file(f, share), files))
+
+    manifest = sync.load_manifest(share)
+    assert sorted(manifest) == sorted(f.name for f in files)
+    assert all(sync.file_is_current(f, share) for f in files)
+    # 锁文件和临时文件不算目标目录的内容
+    assert sorted(sync.scan_dir(share)) == sorted(f.name for f in files)
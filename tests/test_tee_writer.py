@@ -0,0 +1,50 @@
+import os
+import threading
+
+from phis_build import transfer
+
+
+def _write(writer, size):
+    data = os.urandom(size)
+    for i in range(0, size, 100_000):
+        writer.write(data[i : i + 100_000])
+    return data
+
+
+def test_tee_writer_uploads(tmp_path):
+    remote = tmp_path / "share" / "release.zip"
+    remote.parent.mkdir()
+    writer = transfer.TeeWriter(tmp_path / "release.zip", remote)
+    data = _write(writer, 3 * 1024 * 1024 + 5)
+    assert writer.finish()
+    assert remote.read_bytes() == data
+    assert (tmp_path / "release.zip").read_bytes() == data
+
+
+def test_tee_writer_fsync_failure_does_not_hang(tmp_path, monkeypatch):
+    remote = tmp_path / "release.zip.remote"
+    writer = transfer.TeeWriter(tmp_path / "release.zip", remote)
+    data = _write(writer, 2 * 1024 * 1024)
+
+    def fail(fd):
+        raise OSError("fsync failed")
+
+    monkeypatch.setattr(transfer.os, "fsync", fail)
+    result = []
+    t = threading.Thread(target=lambda: result.append(writer.finish()), daemon=True)
+    t.start()
+    t.join(10)
+    assert not t.is_alive(), "finish() hung"
+    assert result == [False]
+    assert not remote.exists()
+    assert not remote.with_name(f"{remote.name}.part").exists()
+    # 本地文件不受影响，调用方可以改为普通复制
+    assert (tmp_path / "release.zip").read_bytes() == data
+
+
+def test_tee_writer_write_failure_keeps_draining(tmp_path):
+    # 共享目录不存在，上传线程一开始就失败，写入方仍不能被阻塞
+    remote = tmp_path / "missing" / "release.zip"
+    writer = transfer.TeeWriter(tmp_path / "release.zip", remote, buffer_size=1)
+    _write(writer, 4 * 1024 * 1024)
+    assert not writer.finish()
@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+from phis_build import transfer
+from phis_build.cache import sha256_file
+
+
+@pytest.fixture
+def src(tmp_path, monkeypatch):
+    monkeypatch.setattr(transfer, "CHECKPOINT_SIZE", 4096)
+    path = tmp_path / "release.zip"
+    path.write_bytes(os.urandom(4096 * 4 + 100))
+    return path
+
+
+def _interrupt_after(monkeypatch, calls: int):
+    """让第 calls + 1 次分段复制失败，模拟网络中断。"""
+    original = transfer._RangeCopier.copy
+    count = 0
+
+    def copy(self, *args, **kwargs):
+        nonlocal count
+        count += 1
+        if count > calls:
+            raise OSError("network gone")
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(transfer._RangeCopier, "copy", copy)
+
+
+def test_copy_large_file(tmp_path, src):
+    dst = tmp_path / "share" / "release.zip"
+    dst.parent.mkdir()
+    assert transfer.copy_large_file(src, dst) == sha256_file(src)
+    assert dst.read_bytes() == src.read_bytes()
+    assert not dst.with_name("release.zip.part").exists()
+    assert not dst.with_name("release.zip.part.json").exists()
+
+
+def test_copy_large_file_resumes(tmp_path, src, monkeypatch):
+    dst = tmp_path / "release.zip.copy"
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 2)
+        with pytest.raises(OSError):
+            transfer.copy_large_file(src, dst, retries=0)
+    state = json.loads(dst.with_name(f"{dst.name}.part.json").read_text())
+    assert state["offset"] == 2 * 4096
+    assert not dst.exists()
+
+    copied = []
+    transfer.copy_large_file(src, dst, progress=copied.append)
+    # 先报告断点之前的部分，之后只复制剩余的数据
+    assert copied[0] == 2 * 4096
+    assert sum(copied) == src.stat().st_size
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_copy_large_file_rewinds_corrupt_tail(tmp_path, src, monkeypatch):
+    dst = tmp_path / "release.zip.copy"
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 3)
+        with pytest.raises(OSError):
+            transfer.copy_large_file(src, dst, retries=0)
+    part = dst.with_name(f"{dst.name}.part")
+    with open(part, "r+b") as f:
+        f.seek(3 * 4096 - 1)
+        f.write(b"\0" if src.read_bytes()[3 * 4096 - 1] else b"\1")
+
+    copied = []
+    transfer.copy_large_file(src, dst, progress=copied.append)
+    assert copied[0] == 2 * 4096
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_copy_large_file_restarts_when_source_changed(tmp_path, src, monkeypatch):
+    dst = tmp_path / "release.zip.copy"
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 2)
+        with pytest.raises(OSError):
+            transfer.copy_large_file(src, dst, retries=0)
+    src.write_bytes(os.urandom(5000))
+
+    copied = []
+    transfer.copy_large_file(src, dst, progress=copied.append)
+    assert sum(copied) == 5000
+    assert dst.read_bytes() == src.read_bytes()
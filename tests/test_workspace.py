@@ -0,0 +1,119 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+from phis_build import build_steps, build_zipapp, cache, config, version, workspace
+from phis_build.filelock import FileLock
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = tmp_path / "locks" / "build.lock"
+    with FileLock(path):
+        other = FileLock(path, timeout=0.2)
+        assert not other.acquire(blocking=False)
+        with pytest.raises(TimeoutError):
+            with other:
+                pass
+    assert other.acquire(blocking=False)
+    other.release()
+
+
+def test_versions_are_unique_across_concurrent_builds(project):
+    with ThreadPoolExecutor(8) as executor:
+        versions = list(
+            executor.map(lambda i: version.read_and_update_version(i % 2 == 1), range(16))
+        )
+    assert len(set(v.rstrip("b") for v in versions)) == 16
+    today = date.today()
+    revs = sorted(int(v.rstrip("b").split(".")[-1]) for v in versions)
+    assert revs == list(range(16))
+    assert all(v.startswith(f"{today.year}.{today.month}.{today.day}.") for v in versions)
+    assert not list(project.PROJECT_ROOT.glob("VERSION.*.tmp"))
+
+
+def test_version_starts_over_on_a_new_day(project):
+    project.VERSION_FILE.write_text("2000.1.1.7b", encoding="utf-8")
+    today = date.today()
+    assert version.read_and_update_version() == f"{today.year}.{today.month}.{today.day}.0"
+
+
+def test_workspace_redirects_build_dirs(project):
+    project.RELEASE_DIR.mkdir()
+    shared_build = project.BUILD_DIR
+    with workspace.create() as ws:
+        assert config.TEMP_DIR == ws.temp_dir
+        assert config.BUILD_DIR == ws.build_dir
+        assert config.BUILD_CACHE_DIR == shared_build
+        assert config.WORK_DIR == ws.path
+        path = ws.path
+    assert config.BUILD_DIR == shared_build
+    assert config.WORK_DIR is None
+    assert not path.exists()
+
+
+@pytest.fixture
+def pyz_project(project):
+    root = project.PROJECT_ROOT
+    (root / "pyproject.toml").write_text(
+        '[tool.hatch.build.targets.sdist]\npackages = ["mypkg"]\n', encoding="utf-8"
+    )
+    (root / "mypkg").mkdir()
+    (root / "mypkg" / "__init__.py").write_text("", encoding="utf-8")
+    (root / "__main__.py").write_text("import mypkg\n", encoding="utf-8")
+    project.RELEASE_DIR.mkdir()
+    return project
+
+
+def test_make_package_in_workspace(pyz_project):
+    cached = pyz_project.BUILD_CACHE_DIR / "app.pyz"
+    with workspace.create() as ws:
+        build_zipapp.make_package()
+        built = ws.build_dir / "app.pyz"
+        assert built.exists()
+        assert cached.read_bytes() == built.read_bytes()
+    assert (pyz_project.PROJECT_ROOT / "app.pyz").read_bytes() == cached.read_bytes()
+
+    # 第二次构建命中缓存，从共用的 build/ 取得 app.pyz
+    os.utime(cached, (0, 0))
+    with workspace.create() as ws:
+        build_zipapp.make_package()
+        assert (ws.build_dir / "app.pyz").stat().st_mtime == 0
+
+
+def test_pyinstaller_workpath_is_copied_and_promoted(project):
+    project.RELEASE_DIR.mkdir()
+    key = {"spec": "1", "python": "x", "uv.lock": None}
+    cached = project.BUILD_CACHE_DIR / "Demo"
+    cached.mkdir(parents=True)
+    (cached / "PYZ-00.pyz").write_bytes(b"old")
+    cache.save_entry("pyinstaller", key)
+
+    with workspace.create() as ws:
+        assert build_steps._seed_workpath("Demo", {**key, "spec": "2"}) == ["spec 已变化"]
+        assert build_steps._seed_workpath("Demo", key) == []
+        work = ws.build_dir / "Demo" / "PYZ-00.pyz"
+        # PyInstaller 原地改写工作目录中的文件，不能影响共用缓存
+        with open(work, "r+b") as f:
+            f.write(b"new")
+        assert (cached / "PYZ-00.pyz").read_bytes() == b"old"
+
+        build_steps._promote_workpath("Demo", {**key, "spec": "3"})
+        assert (cached / "PYZ-00.pyz").read_bytes() == b"new"
+        assert not (ws.build_dir / "Demo").exists()
+    assert cache.load_entry("pyinstaller")["spec"] == "3"
+
+
+def test_watch_rebuild_holds_build_cache_lock(pyz_project):
+    cached = pyz_project.BUILD_CACHE_DIR / "app.pyz"
+    with ThreadPoolExecutor(1) as executor:
+        with workspace.build_cache_lock():
+            future = executor.submit(build_zipapp.rebuild_package, {})
+            time.sleep(0.3)
+            assert not future.done()
+            assert not cached.exists()
+        future.result(timeout=10)
+    assert (pyz_project.TEMP_DIR / "app.pyz").read_bytes() == cached.read_bytes()
+    assert (pyz_project.PROJECT_ROOT / "app.pyz").read_bytes() == cached.read_bytes()
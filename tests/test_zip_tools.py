@@ -0,0 +1,129 @@
+import io
+import zipfile
+
+import pytest
+
+from phis_build import zip_tools
+
+
+class NonSeekable(io.RawIOBase):
+    """只能顺序写入的流，例如管道或边写边上传的文件。"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.buffer += b
+        return len(b)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.txt").write_bytes(b"hello " * 1000)
+    (src / "sub" / "b.bin").write_bytes(bytes(range(256)) * 10)
+    (src / "empty.txt").write_bytes(b"")
+    return src
+
+
+def _members(src, compress_type=zipfile.ZIP_DEFLATED):
+    paths = [src / "sub"] + sorted(p for p in src.rglob("*") if p.is_file())
+    return [
+        zip_tools.compress_file(p, p.relative_to(src).as_posix(), 6, compress_type)
+        for p in paths
+    ]
+
+
+def _assert_contents(zf, src):
+    assert zf.testzip() is None
+    for p in src.rglob("*"):
+        if p.is_file():
+            assert zf.read(p.relative_to(src).as_posix()) == p.read_bytes()
+
+
+@pytest.mark.parametrize("compress_type", [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_write_raw(tmp_path, sources, compress_type):
+    path = tmp_path / "out.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        for info, data in _members(sources, compress_type):
+            zip_tools.write_raw(zf, info, data)
+    with zipfile.ZipFile(path) as zf:
+        assert "sub/" in zf.namelist()
+        _assert_contents(zf, sources)
+
+
+def test_write_raw_non_seekable(sources):
+    stream = NonSeekable()
+    with zipfile.ZipFile(stream, "w") as zf:
+        for info, data in _members(sources):
+            zip_tools.write_raw(zf, info, data)
+    with zipfile.ZipFile(io.BytesIO(bytes(stream.buffer))) as zf:
+        _assert_contents(zf, sources)
+
+
+def test_write_raw_after_shebang(tmp_path, sources):
+    path = tmp_path / "app.pyz"
+    with open(path, "wb") as f:
+        f.write(b"#!/usr/bin/env python3\n")
+        with zipfile.ZipFile(f, "w") as zf:
+            zf.writestr("first.txt", b"written by zipfile")
+            for info, data in _members(sources):
+                zip_tools.write_raw(zf, info, data)
+    with zipfile.ZipFile(path) as zf:
+        assert zf.read("first.txt") == b"written by zipfile"
+        _assert_contents(zf, sources)
+
+
+def test_write_members_keeps_order(tmp_path, sources):
+    files = sorted(p for p in sources.rglob("*") if p.is_file())
+    jobs = [
+        (lambda p=p: zip_tools.compress_file(p, p.relative_to(sources).as_posix()))
+        for p in files
+    ]
+    path = tmp_path / "out.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        assert zip_tools.write_members(zf, jobs, workers=2) == len(files)
+    with zipfile.ZipFile(path) as zf:
+        assert zf.namelist() == [p.relative_to(sources).as_posix() for p in files]
+        _assert_contents(zf, sources)
+
+
+@pytest.mark.parametrize("prefix", [b"", b"#!/usr/bin/env python3\n"])
+def test_read_raw_round_trip(tmp_path, sources, prefix):
+    old = tmp_path / "old.zip"
+    with open(old, "wb") as f:
+        f.write(prefix)
+        with zipfile.ZipFile(f, "w") as zf:
+            for info, data in _members(sources):
+                zip_tools.write_raw(zf, info, data)
+
+    new = tmp_path / "new.zip"
+    stream = NonSeekable()
+    with zipfile.ZipFile(old) as src, zipfile.ZipFile(stream, "w") as dst:
+        for info in src.infolist():
+            data = zip_tools.read_raw(old, info)
+            assert len(data) == info.compress_size
+            zip_tools.write_raw(dst, info, data)
+    new.write_bytes(bytes(stream.buffer))
+
+    with zipfile.ZipFile(new) as zf:
+        _assert_contents(zf, sources)
+        for info in zf.infolist():
+            if not info.is_dir():
+                assert info.CRC == zip_tools.file_crc32(sources / info.filename)
+
+
+def test_read_raw_rejects_bad_offset(tmp_path, sources):
+    path = tmp_path / "out.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        for info, data in _members(sources):
+            zip_tools.write_raw(zf, info, data)
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo("a.txt")
+    info.header_offset += 1
+    with pytest.raises(zipfile.BadZipFile):
+        zip_tools.read_raw(path, info)